@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# QuantraVision: encoder tiers + APK size / decode-memory budget report for generated assets.
+# Shared by generate_patterns.py (drawables) and the *_ref template writers
+# (generate_pattern_images.py, generate_all_108_patterns.py).
+#
+# Tiers:
+#   png   24-bit PNG, optimize=True; the historical output, byte for byte. A caller that values
+#         encode time over size passes png_level (plain zlib level, no optimize search)
+#   png8  palette PNG: median cut to <= 256 colours, no dithering. Exact when the image already
+#         has <= 256 colours (all template art); drawables are lossy (glow and anti-aliasing get
+#         quantized), by an amount that depends on the art: compare against png before using it
+#   webp  lossless WebP (method 2, quality 50: close to the best size at a fraction of the time)
+# minSdk 26 decodes WebP drawables natively; templates go through OpenCV imdecode, which sniffs
+# the format rather than trusting the extension.
+#
+# Decoded bytes are what the consumer keeps in memory, not what the file holds: drawables become
+# ARGB_8888 bitmaps (4 bytes/px), templates IMREAD_GRAYSCALE Mats (1 byte/px).
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from lazy_imports import lazy_import
+
+Image = lazy_import("PIL.Image")  # loaded by the first encode/decode, not by importing this module
+
+TIERS = ("png", "png8", "webp")
+EXTENSIONS = {"png": ".png", "png8": ".png", "webp": ".webp"}
+DRAWABLE_BPP = 4  # ARGB_8888
+TEMPLATE_BPP = 1  # CV_8UC1
+WEBP_OPTIONS = {"lossless": True, "method": 2, "quality": 50}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def encode(img: Image.Image, tier: str, png_level: Optional[int] = None) -> bytes:
+    """`img` as `tier` bytes; png_level (0-9) replaces the PNG tiers' optimize=True pass."""
+    buf = io.BytesIO()
+    png = {"optimize": True} if png_level is None else {"compress_level": png_level}
+    if tier == "png":
+        img.save(buf, format="PNG", **png)
+    elif tier == "png8":
+        if img.mode == "RGBA" and img.getextrema()[3][0] == 255:
+            img = img.convert("RGB")  # opaque (matplotlib output): median cut works on RGB
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.mode != "L":  # grayscale is 8-bit already
+            method = Image.Quantize.FASTOCTREE if img.mode == "RGBA" else Image.Quantize.MEDIANCUT
+            img = img.quantize(colors=256, method=method, dither=Image.Dither.NONE)
+        img.save(buf, format="PNG", **png)
+    elif tier == "webp":
+        img.save(buf, format="WEBP", **WEBP_OPTIONS)
+    else:
+        raise ValueError(f"unknown encoder tier: {tier}")
+    return buf.getvalue()
+
+def transcode(data: bytes, tier: str) -> Optional[bytes]:
+    """Re-encode already encoded image bytes; None means `data` is kept as is (PNG into png)."""
+    if tier == "png" and data.startswith(PNG_SIGNATURE):
+        return None
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        return encode(img, tier)
+
+def write_bytes(path: str, data: bytes) -> None:
+    """Write via a temp file and rename, so an interrupted run never leaves a truncated image."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def siblings(path: str) -> List[str]:
+    """Same asset under the other tiers' extensions (Android rejects two drawables with one name)."""
+    stem, ext = os.path.splitext(path)
+    return [stem + e for e in sorted(set(EXTENSIONS.values())) if e != ext and os.path.exists(stem + e)]
+
+def asset_record(path: str, size: tuple, bpp: int, encoded: int, encode_ms: Optional[float]) -> dict:
+    """encode_ms is None for outputs that weren't encoded in this run (up to date or passed through)."""
+    return {
+        "path": path,
+        "width": size[0],
+        "height": size[1],
+        "encoded_bytes": encoded,
+        "decoded_bytes": size[0] * size[1] * bpp,
+        "encode_ms": None if encode_ms is None else round(encode_ms, 2),
+    }
+
+def save_asset(img: Image.Image, path: str, tier: str, bpp: int) -> dict:
+    t0 = time.perf_counter()
+    data = encode(img, tier)
+    ms = (time.perf_counter() - t0) * 1000
+    write_bytes(path, data)
+    return asset_record(path, img.size, bpp, len(data), ms)
+
+def existing_record(path: str, bpp: int, encode_ms: Optional[float] = None) -> dict:
+    with Image.open(path) as img:  # header only
+        size = img.size
+    return asset_record(path, size, bpp, os.path.getsize(path), encode_ms)
+
+def add_arguments(ap) -> None:
+    ap.add_argument("--tier", default="png", choices=TIERS,
+                    help="png: 24-bit PNG (current output); png8: palette PNG; webp: lossless WebP")
+    ap.add_argument("--budget-kb", type=float, default=None, help="Flag assets whose encoded size exceeds this")
+    ap.add_argument("--decode-budget-kb", type=float, default=None,
+                    help="Flag assets whose decoded bitmap (w x h x bytes/px) exceeds this")
+    ap.add_argument("--report", default=None, help="Write the per-asset size report to this JSON file")
+
+def over_budget(rec: dict, budget_kb: Optional[float], decode_budget_kb: Optional[float]) -> List[str]:
+    flags = []
+    if budget_kb is not None and rec["encoded_bytes"] > budget_kb * 1024:
+        flags.append("encoded")
+    if decode_budget_kb is not None and rec["decoded_bytes"] > decode_budget_kb * 1024:
+        flags.append("decoded")
+    return flags
+
+def report(records: List[dict], tier: str, args, tag: str) -> int:
+    """Print totals and over-budget assets, write the JSON report if asked; returns the flagged count."""
+    flagged = 0
+    for rec in records:
+        rec["over_budget"] = over_budget(rec, args.budget_kb, args.decode_budget_kb)
+        if rec["over_budget"]:
+            flagged += 1
+            print(f"[{tag}] OVER BUDGET ({', '.join(rec['over_budget'])}) {rec['path']}: "
+                  f"{rec['encoded_bytes'] / 1024:.1f} KB encoded, {rec['decoded_bytes'] / 1024:.1f} KB decoded",
+                  file=sys.stderr)
+    timed = [r["encode_ms"] for r in records if r["encode_ms"] is not None]
+    totals: Dict[str, object] = {
+        "assets": len(records),
+        "encoded_bytes": sum(r["encoded_bytes"] for r in records),
+        "decoded_bytes": sum(r["decoded_bytes"] for r in records),
+        "encoded_assets": len(timed),
+        "encode_ms": round(sum(timed), 2),
+        "over_budget": flagged,
+    }
+    print(f"[{tag}] {tier}: {totals['assets']} assets, {totals['encoded_bytes'] / 1024:.1f} KB encoded, "
+          f"{totals['decoded_bytes'] / 1024:.1f} KB decoded; {totals['encoded_assets']} encoded in "
+          f"{totals['encode_ms']:.0f} ms; {flagged} over budget")
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"tier": tier,
+                       "budget_kb": args.budget_kb,
+                       "decode_budget_kb": args.decode_budget_kb,
+                       "totals": totals,
+                       "assets": sorted(records, key=lambda r: r["path"])}, f, indent=1)
+            f.write("\n")
+    return flagged
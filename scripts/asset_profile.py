@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# QuantraVision: per-stage timing for the asset generators (--profile).
+# Shared by generate_patterns.py, generate_pattern_images.py and generate_all_108_patterns.py.
+#
+#   --profile build/profile.jsonl   one JSON line per asset: wall/CPU ms per stage, totals, counters
+#   --profile-top 5                 re-run the 5 slowest assets under cProfile; writes
+#                                   <profile>.<asset>.prof (snakeviz/pstats) and .txt (top functions)
+#
+# Stages are measured with perf_counter (wall) and process_time (CPU of the process doing the
+# work, i.e. the worker under --jobs). Timing is always on, it costs ~1 us per stage; only the
+# output is optional. cProfile runs after the build, so it never skews the recorded timings.
+
+import contextlib
+import io
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+PSTATS_LINES = 40  # functions listed in each .txt dump, by cumulative time
+
+@contextlib.contextmanager
+def stage(stats: Optional[dict], name: str):
+    """Add the wall and CPU time of the block to stats["stages"][name] (no-op for stats=None)."""
+    if stats is None:
+        yield
+        return
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        acc = stats.setdefault("stages", {}).setdefault(name, [0.0, 0.0])
+        acc[0] += (time.perf_counter() - w0) * 1000
+        acc[1] += (time.process_time() - c0) * 1000
+
+def laps(stats: Optional[dict]) -> Callable[[str], None]:
+    """lap(name) charges the time since the previous lap (or this call) to stage `name`; for long
+    straight-line functions where a with-block per stage would re-indent everything."""
+    mark = [time.perf_counter(), time.process_time()]
+
+    def lap(name: str) -> None:
+        if stats is None:
+            return
+        w, c = time.perf_counter(), time.process_time()
+        acc = stats.setdefault("stages", {}).setdefault(name, [0.0, 0.0])
+        acc[0] += (w - mark[0]) * 1000
+        acc[1] += (c - mark[1]) * 1000
+        mark[:] = [w, c]
+    return lap
+
+def entry(script: str, asset: str, stats: dict, **extra) -> dict:
+    """One JSONL record from a stats dict filled by stage(); other int/float keys become counters."""
+    stages = {k: {"wall_ms": round(w, 3), "cpu_ms": round(c, 3)} for k, (w, c) in stats.get("stages", {}).items()}
+    rec = {
+        "script": script,
+        "asset": asset,
+        "wall_ms": round(sum(s["wall_ms"] for s in stages.values()), 3),
+        "cpu_ms": round(sum(s["cpu_ms"] for s in stages.values()), 3),
+        "stages": stages,
+    }
+    counters = {k: v for k, v in stats.items() if k != "stages" and isinstance(v, (int, float))}
+    if counters:
+        rec["counters"] = counters
+    rec.update(extra)
+    return rec
+
+def add_arguments(ap) -> None:
+    ap.add_argument("--profile", default=None, help="Write per-asset, per-stage timings to this JSON-lines file")
+    ap.add_argument("--profile-top", type=int, default=0,
+                    help="With --profile, re-run the N slowest assets under cProfile and dump the stats")
+
+def write(path: str, records: List[dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, sort_keys=True) + "\n")
+
+def summary(records: List[dict], tag: str, slowest: int = 5) -> None:
+    """Per-stage table (total/mean wall, total CPU, share of wall) and the slowest assets."""
+    totals: Dict[str, List[float]] = {}
+    for rec in records:
+        for name, s in rec["stages"].items():
+            acc = totals.setdefault(name, [0, 0.0, 0.0])
+            acc[0] += 1
+            acc[1] += s["wall_ms"]
+            acc[2] += s["cpu_ms"]
+    wall = sum(t[1] for t in totals.values()) or 1.0
+    print(f"[{tag}] profile: {len(records)} assets, {wall:.0f} ms wall in stages")
+    print(f"[{tag}]   {'stage':<12} {'n':>5} {'wall ms':>10} {'mean ms':>9} {'cpu ms':>10} {'share':>6}")
+    for name, (n, w, c) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+        print(f"[{tag}]   {name:<12} {n:>5} {w:>10.1f} {w / n:>9.2f} {c:>10.1f} {100 * w / wall:>5.1f}%")
+    for rec in sorted(records, key=lambda r: -r["wall_ms"])[:slowest]:
+        top = max(rec["stages"].items(), key=lambda kv: kv[1]["wall_ms"], default=("-", {"wall_ms": 0}))
+        print(f"[{tag}]   slow: {rec['asset']} {rec['wall_ms']:.1f} ms (most in {top[0]})")
+
+def profile_slowest(records: List[dict], n: int, rerun: Callable[[dict], object], path: str, tag: str) -> None:
+    """cProfile `rerun(record)` for the n slowest records; dumps .prof and .txt next to `path`."""
+    import cProfile  # only --profile-top needs these
+    import pstats
+    stem = os.path.splitext(path)[0]
+    for rec in sorted(records, key=lambda r: -r["wall_ms"])[:n]:
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", rec["asset"])
+        prof = cProfile.Profile()
+        prof.runcall(rerun, rec)
+        prof.dump_stats(f"{stem}.{slug}.prof")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(PSTATS_LINES)
+        with open(f"{stem}.{slug}.txt", "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        print(f"[{tag}] cProfile {rec['asset']} → {stem}.{slug}.prof")
+
+def finish(args, records: List[dict], tag: str, rerun: Optional[Callable[[dict], object]] = None) -> None:
+    """Write the JSONL, print the summary and run --profile-top; nothing without --profile."""
+    if not args.profile:
+        return
+    write(args.profile, records)
+    summary(records, tag)
+    if args.profile_top and rerun is not None:
+        profile_slowest(records, args.profile_top, rerun, args.profile, tag)
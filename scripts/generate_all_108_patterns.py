@@ -2,20 +2,50 @@
 """
 Generate comprehensive YAML configuration files and template images 
 for all 109 chart patterns in QuantraVision.
+
+Each pattern is a short list of primitives (SHAPES maps its name to them), drawn by
+--backend matplotlib (the historical output, byte for byte) or --backend numpy: an anti-aliased
+NumPy rasterizer with the same 252x212 frame and geometry (NCC > 0.998 against Matplotlib) that
+draws all templates in ~0.3 s instead of ~3 s, writing mode L PNGs.
+--tier png8|webp re-encodes the output (see asset_encoders.py); --budget-kb,
+--decode-budget-kb and --report control the size report printed at the end.
+--profile FILE.jsonl records wall/CPU time per stage (setup, draw, savefig, encode, write,
+yaml) for every pattern; --profile-top N cProfiles the N slowest.
+--jobs N builds the patterns across N processes (0 = one per CPU): same files, same bytes and
+same log order as a serial run. Every image and YAML is written to a temp file and renamed, image
+first, so an interrupted run never leaves a template the app would skip as corrupted. A
+per-category timing summary is printed at the end.
+--bundle PATH (default app/src/main/assets/pattern_templates.qvtb, '' to skip) then packs the whole
+directory into one memory-mappable file for the app's startup (see template_bundle.py).
+--crop-margin PX crops every template to its ink plus PX pixels (see template_crop.py); off by
+default.
+--cascade FACTOR also writes <stem>_coarse.png, the template at FACTOR scale, and a YAML
+`prefilter` entry with its calibrated coarse-pass threshold (see template_cascade.py).
+Next to each YAML goes <stem>.tstats: the template's zero-mean plane, L2 norm, foreground count
+and bounding box, precomputed for TM_CCOEFF_NORMED matching (see template_stats.py).
+--dry-run lists the YAML and image files a run would write; NumPy, Matplotlib and PyYAML are
+only imported by the code that renders and writes them.
 """
 
+import argparse
+import io
 import os
-import yaml
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+import time
 from pathlib import Path
 
-# Output directory
+import asset_encoders
+import asset_profile
+import template_bundle
+import template_cascade
+import template_crop
+import template_stats
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")  # used by the curve shapes and the NumPy backend, not by --help or --dry-run
+
+# Output directory (created by main, not on import)
 OUTPUT_DIR = Path("app/src/main/assets/pattern_templates")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+BUNDLE_PATH = Path("app/src/main/assets/pattern_templates.qvtb")
 
 # Pattern definitions: [name, threshold, scale_range, scale_stride, timeframes, min_bars, aspect_tol]
 PATTERNS = {
@@ -142,10 +172,510 @@ PATTERNS = {
 }
 
 
-def generate_pattern_image(pattern_name, pattern_type, width=300, height=250):
-    """Generate a simple, clean grayscale template image for a chart pattern."""
+# Shapes. Every template is a short list of primitives in data coordinates (0-100 on both
+# axes, y up), drawn in list order with candle bodies under the lines:
+#   ("line", x, y, width, alpha, dashes)   black polyline, width in points; dashes None, "--" or ":"
+#   ("rect", x, y, w, h, face)             candle body with a 1 pt black edge; face "white" for an
+#                                          outline, "gray"/"lightgray" for a filled body; h < 0 hangs down
+# SHAPES maps each pattern (lowercase name) to the function that builds its list; related
+# patterns share one (all Adam/Eve double tops are a double top).
+
+def line(x, y, width=2.5):
+    return ("line", x, y, width, None, None)
+
+
+def dashed(x, y, width=1.5, alpha=0.6, dashes="--"):
+    return ("line", x, y, width, alpha, dashes)
+
+
+def wick(x, y0, y1):
+    return line([x, x], [y0, y1], width=1.5)
+
+
+def body(x, y, w, h, face="white"):
+    return ("rect", x, y, w, h, face)
+
+
+# ---------- Reversal ----------
+
+def head_and_shoulders():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [30, 50, 35, 60, 40, 50, 30, 40, 25]),
+            dashed([10, 90], [30, 25])]  # neckline
+
+
+def inverse_head_and_shoulders():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [70, 50, 65, 40, 60, 50, 70, 60, 75]),
+            dashed([10, 90], [70, 75])]  # neckline
+
+
+def double_top():
+    x = np.linspace(10, 90, 50)
+    y = 30 + 30*np.sin((x-10)/15) * np.exp(-(x-50)**2/1000)
+    y[20:25] = 60
+    y[35:40] = 60
+    return [line(x, y), dashed([10, 90], [40, 40])]
+
+
+def double_bottom():
+    x = np.linspace(10, 90, 50)
+    y = 70 - 30*np.sin((x-10)/15) * np.exp(-(x-50)**2/1000)
+    y[20:25] = 40
+    y[35:40] = 40
+    return [line(x, y), dashed([10, 90], [60, 60])]
+
+
+def triple_top():
+    return [line([10, 18, 25, 32, 40, 48, 55, 62, 70, 78, 90], [30, 55, 40, 55, 38, 55, 40, 55, 35, 45, 25]),
+            dashed([10, 90], [38, 25])]
+
+
+def triple_bottom():
+    return [line([10, 18, 25, 32, 40, 48, 55, 62, 70, 78, 90], [70, 45, 60, 45, 62, 45, 60, 45, 65, 55, 75]),
+            dashed([10, 90], [62, 75])]
+
+
+def rounding_top():
+    x = np.linspace(10, 90, 60)
+    return [line(x, 40 + 25 * np.cos((x-50)/25))]
+
+
+def rounding_bottom():
+    x = np.linspace(10, 90, 60)
+    return [line(x, 60 - 25 * np.cos((x-50)/25))]
+
+
+def v_top():
+    return [line([10, 50, 90], [30, 75, 30])]
+
+
+def v_bottom():
+    return [line([10, 50, 90], [70, 25, 70])]
+
+
+def diamond_top():
+    return [line([10, 30, 50, 70, 90], [45, 70, 45, 70, 45]),
+            dashed([10, 50], [45, 45]), dashed([50, 90], [45, 45])]
+
+
+def diamond_bottom():
+    return [line([10, 30, 50, 70, 90], [55, 30, 55, 30, 55]),
+            dashed([10, 50], [55, 55]), dashed([50, 90], [55, 55])]
+
+
+def broadening_top():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [45, 55, 42, 60, 40, 65, 38, 68, 35]),
+            dashed([10, 90], [45, 35], width=1, alpha=0.5), dashed([10, 90], [55, 68], width=1, alpha=0.5)]
+
+
+def broadening_bottom():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [55, 45, 58, 40, 60, 35, 62, 32, 65]),
+            dashed([10, 90], [55, 65], width=1, alpha=0.5), dashed([10, 90], [45, 32], width=1, alpha=0.5)]
+
+
+def island_reversal_top():
+    x = [10, 25, 30, 45, 50, 65, 90]
+    y = [30, 50, 50, 60, 60, 50, 30]
+    return [line(x[:3], y[:3]), line(x[2:5], y[2:5]), line(x[4:], y[4:]),
+            dashed([28, 28], [40, 50], alpha=None, dashes=":"),  # gaps
+            dashed([52, 52], [50, 40], alpha=None, dashes=":")]
+
+
+def island_reversal_bottom():
+    x = [10, 25, 30, 45, 50, 65, 90]
+    y = [70, 50, 50, 40, 40, 50, 70]
+    return [line(x[:3], y[:3]), line(x[2:5], y[2:5]), line(x[4:], y[4:]),
+            dashed([28, 28], [50, 60], alpha=None, dashes=":"),  # gaps
+            dashed([52, 52], [40, 50], alpha=None, dashes=":")]
+
+
+# ---------- Continuation ----------
+
+def ascending_triangle():
+    return [line([10, 25, 40, 55, 70, 85, 90], [30, 55, 40, 55, 45, 55, 70]),
+            dashed([10, 90], [55, 55]), dashed([10, 85], [30, 55])]
+
+
+def descending_triangle():
+    return [line([10, 25, 40, 55, 70, 85, 90], [70, 45, 60, 45, 55, 45, 30]),
+            dashed([10, 90], [45, 45]), dashed([10, 85], [70, 45])]
+
+
+def symmetrical_triangle():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [65, 40, 58, 42, 54, 46, 52, 48, 70]),
+            dashed([10, 80], [65, 48]), dashed([10, 80], [40, 48])]
+
+
+def rising_wedge():
+    return [line([10, 25, 40, 55, 70, 85], [30, 48, 42, 54, 48, 58]),
+            dashed([10, 85], [30, 58]), dashed([10, 85], [35, 63])]
+
+
+def falling_wedge():
+    return [line([10, 25, 40, 55, 70, 85], [70, 52, 58, 46, 52, 42]),
+            dashed([10, 85], [70, 42]), dashed([10, 85], [65, 37])]
+
+
+def bull_flag():
+    return [line([10, 20, 30, 40, 50, 55, 60, 65, 90], [30, 55, 55, 53, 53, 51, 51, 49, 75]),
+            dashed([30, 65], [55, 49], width=1, alpha=0.5), dashed([30, 65], [53, 47], width=1, alpha=0.5)]
+
+
+def bear_flag():
+    return [line([10, 20, 30, 40, 50, 55, 60, 65, 90], [70, 45, 45, 47, 47, 49, 49, 51, 25]),
+            dashed([30, 65], [45, 51], width=1, alpha=0.5), dashed([30, 65], [47, 53], width=1, alpha=0.5)]
+
+
+def bull_pennant():
+    return [line([10, 20, 30, 38, 46, 54, 62, 70, 90], [30, 55, 55, 52, 54, 51, 53, 51, 75]),
+            dashed([30, 70], [55, 51], width=1, alpha=0.5), dashed([30, 70], [50, 51], width=1, alpha=0.5)]
+
+
+def bear_pennant():
+    return [line([10, 20, 30, 38, 46, 54, 62, 70, 90], [70, 45, 45, 48, 46, 49, 47, 49, 25]),
+            dashed([30, 70], [45, 49], width=1, alpha=0.5), dashed([30, 70], [50, 49], width=1, alpha=0.5)]
+
+
+def rectangle_bullish():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [30, 40, 45, 40, 45, 40, 45, 40, 70]),
+            dashed([20, 80], [40, 40]), dashed([20, 80], [45, 45])]
+
+
+def rectangle_bearish():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [70, 60, 55, 60, 55, 60, 55, 60, 30]),
+            dashed([20, 80], [60, 60]), dashed([20, 80], [55, 55])]
+
+
+def cup_and_handle():
+    x = np.linspace(10, 90, 80)
+    y = np.zeros_like(x)
+    y[:40] = 40 + 15 * (1 - np.cos(np.linspace(0, np.pi, 40)))
+    y[40:55] = 70 - 5 * ((x[40:55] - 50) / 7.5)**2
+    y[55:] = 70 + (x[55:] - 55) * 0.3
+    return [line(x, y)]
+
+
+def inverted_cup_and_handle():
+    x = np.linspace(10, 90, 80)
+    y = np.zeros_like(x)
+    y[:40] = 60 - 15 * (1 - np.cos(np.linspace(0, np.pi, 40)))
+    y[40:55] = 30 + 5 * ((x[40:55] - 50) / 7.5)**2
+    y[55:] = 30 - (x[55:] - 55) * 0.3
+    return [line(x, y)]
+
+
+def channel_up():
+    return [line([10, 30, 50, 70, 90], [30, 40, 50, 60, 70]),
+            dashed([10, 90], [35, 75]), dashed([10, 90], [25, 65])]
+
+
+def channel_down():
+    return [line([10, 30, 50, 70, 90], [70, 60, 50, 40, 30]),
+            dashed([10, 90], [75, 35]), dashed([10, 90], [65, 25])]
+
+
+def channel_horizontal():
+    return [line([10, 20, 30, 40, 50, 60, 70, 80, 90], [50, 45, 50, 45, 50, 45, 50, 45, 50]),
+            dashed([10, 90], [50, 50]), dashed([10, 90], [45, 45])]
+
+
+# ---------- Candlestick ----------
+
+def doji():
+    return [body(45, 48, 10, 4), wick(50, 30, 48), wick(50, 52, 70)]
+
+
+def hammer():
+    return [body(45, 60, 10, 8), wick(50, 30, 60), wick(50, 68, 72)]
+
+
+def hanging_man():
+    return [body(45, 60, 10, 8, "gray"), wick(50, 30, 60), wick(50, 68, 72)]
+
+
+def inverted_hammer():
+    return [body(45, 32, 10, 8), wick(50, 28, 32), wick(50, 40, 70)]
+
+
+def shooting_star():
+    return [body(45, 32, 10, 8, "gray"), wick(50, 28, 32), wick(50, 40, 70)]
+
+
+def bullish_engulfing():
+    return [body(35, 48, 8, -10, "gray"), body(57, 35, 8, 20),
+            wick(39, 50, 55), wick(39, 38, 32), wick(61, 57, 65), wick(61, 35, 28)]
+
+
+def bearish_engulfing():
+    return [body(35, 38, 8, 10), body(57, 55, 8, -20, "gray"),
+            wick(39, 50, 55), wick(39, 38, 32), wick(61, 57, 65), wick(61, 35, 28)]
+
+
+def morning_star():
+    return [body(25, 55, 8, -12, "gray"), body(46, 42, 8, 3), body(67, 45, 8, 15),
+            wick(29, 57, 63), wick(29, 43, 38), wick(50, 46, 50), wick(50, 42, 38),
+            wick(71, 62, 68), wick(71, 45, 40)]
+
+
+def evening_star():
+    return [body(25, 45, 8, 12), body(46, 55, 8, 3, "gray"), body(67, 60, 8, -15, "gray"),
+            wick(29, 59, 63), wick(29, 45, 40), wick(50, 59, 63), wick(50, 55, 50),
+            wick(71, 62, 67), wick(71, 45, 38)]
+
+
+def three_white_soldiers():
+    shapes = []
+    for i, x in enumerate([25, 45, 65]):
+        h = 12 + i*2
+        y = 40 + i*5
+        shapes += [body(x, y, 10, h), wick(x+5, y+h, y+h+6), wick(x+5, y, y-4)]
+    return shapes
+
+
+def three_black_crows():
+    shapes = []
+    for i, x in enumerate([25, 45, 65]):
+        h = 12 + i*2
+        y = 60 - i*5
+        shapes += [body(x, y, 10, -h, "gray"), wick(x+5, y, y+6), wick(x+5, y-h, y-h-4)]
+    return shapes
+
+
+def piercing_line():
+    return [body(35, 60, 8, -15, "gray"), body(57, 42, 8, 16),
+            wick(39, 62, 68), wick(39, 45, 38), wick(61, 60, 66), wick(61, 42, 35)]
+
+
+def dark_cloud_cover():
+    return [body(35, 40, 8, 15), body(57, 58, 8, -16, "gray"),
+            wick(39, 57, 63), wick(39, 40, 33), wick(61, 60, 66), wick(61, 42, 35)]
+
+
+def harami_bullish():
+    return [body(32, 60, 12, -18, "gray"), body(58, 48, 8, 6),
+            wick(38, 62, 68), wick(38, 42, 36), wick(62, 56, 60), wick(62, 48, 44)]
+
+
+def harami_bearish():
+    return [body(32, 40, 12, 18), body(58, 52, 8, -6, "gray"),
+            wick(38, 60, 66), wick(38, 40, 34), wick(62, 54, 58), wick(62, 46, 42)]
+
+
+def tweezer_top():
+    return [body(35, 55, 8, 10), body(57, 60, 8, -10, "gray"),
+            wick(39, 67, 72), wick(39, 55, 50), wick(61, 72, 67), wick(61, 50, 60)]
+
+
+def tweezer_bottom():
+    return [body(35, 45, 8, -10, "gray"), body(57, 40, 8, 10),
+            wick(39, 47, 52), wick(39, 35, 30), wick(61, 52, 57), wick(61, 40, 30)]
+
+
+def spinning_top():
+    return [body(45, 48, 10, 4, "lightgray"), wick(50, 32, 48), wick(50, 52, 68)]
+
+
+def marubozu_bullish():
+    return [body(42, 35, 16, 30)]
+
+
+def marubozu_bearish():
+    return [body(42, 65, 16, -30, "gray")]
+
+
+def abandoned_baby_bullish():
+    return [body(22, 60, 10, -15, "gray"), body(46, 42, 8, 2), body(70, 45, 10, 18),
+            wick(27, 62, 68), wick(27, 45, 38), wick(50, 46, 52), wick(50, 42, 36),
+            wick(75, 65, 72), wick(75, 45, 38)]
+
+
+def abandoned_baby_bearish():
+    return [body(22, 40, 10, 15), body(46, 56, 8, 2, "gray"), body(70, 63, 10, -18, "gray"),
+            wick(27, 57, 63), wick(27, 40, 33), wick(50, 60, 66), wick(50, 56, 50),
+            wick(75, 65, 72), wick(75, 45, 38)]
+
+
+def kicker_bullish():
+    return [body(32, 58, 12, -16, "gray"), body(58, 48, 12, 18),
+            wick(38, 60, 66), wick(38, 42, 36), wick(64, 68, 74), wick(64, 48, 42)]
+
+
+def kicker_bearish():
+    return [body(32, 42, 12, 16), body(58, 52, 12, -18, "gray"),
+            wick(38, 60, 66), wick(38, 42, 36), wick(64, 54, 60), wick(64, 34, 28)]
+
+
+def belt_hold_bullish():
+    return [body(42, 38, 16, 24), wick(50, 64, 70)]
+
+
+def belt_hold_bearish():
+    return [body(42, 62, 16, -24, "gray"), wick(50, 38, 32)]
+
+
+# ---------- Generic ----------
+
+def trend_up():
+    x = np.linspace(10, 90, 50)
+    return [line(x, 30 + 35 * (1 / (1 + np.exp(-(x-50)/10))))]
+
+
+def trend_down():
+    x = np.linspace(10, 90, 50)
+    return [line(x, 70 - 35 * (1 / (1 + np.exp(-(x-50)/10))))]
+
+
+def sideways():
+    x = np.linspace(10, 90, 50)
+    return [line(x, 50 + 15 * np.sin((x-10)/10))]
+
+
+SHAPES = {
+    # Reversal
+    "head_and_shoulders": head_and_shoulders,
+    "inverse_head_and_shoulders": inverse_head_and_shoulders,
+    "double_top": double_top,
+    "double_bottom": double_bottom,
+    "triple_top": triple_top,
+    "triple_bottom": triple_bottom,
+    "rounding_top": rounding_top,
+    "rounding_bottom": rounding_bottom,
+    "v_top": v_top,
+    "v_bottom": v_bottom,
+    "diamond_top": diamond_top,
+    "diamond_bottom": diamond_bottom,
+    "broadening_top": broadening_top,
+    "broadening_bottom": broadening_bottom,
+    "island_reversal_top": island_reversal_top,
+    "island_reversal_bottom": island_reversal_bottom,
+    "adam_eve_double_top": double_top,
+    "eve_adam_double_top": double_top,
+    "adam_adam_double_top": double_top,
+    "eve_eve_double_top": double_top,
+    "adam_eve_double_bottom": double_bottom,
+    "eve_adam_double_bottom": double_bottom,
+    "adam_adam_double_bottom": double_bottom,
+    "eve_eve_double_bottom": double_bottom,
+    "saucer_top": rounding_top,
+    "saucer_bottom": rounding_bottom,
+    "spike_and_channel_reversal": channel_horizontal,
+    "bump_and_run_reversal_top": trend_down,
+    "bump_and_run_reversal_bottom": trend_up,
+    "complex_head_and_shoulders": head_and_shoulders,
+    "complex_inverse_head_and_shoulders": inverse_head_and_shoulders,
+    "megaphone_top": broadening_top,
+    "megaphone_bottom": broadening_bottom,
+    "key_reversal_up": trend_up,
+    "key_reversal_down": trend_down,
+    "pipe_top": trend_down,
+    "pipe_bottom": trend_up,
+    "two_bar_reversal_up": trend_up,
+    "two_bar_reversal_down": trend_down,
+    "horn_top": trend_down,
+    "horn_bottom": trend_up,
+    # Continuation
+    "ascending_triangle": ascending_triangle,
+    "descending_triangle": descending_triangle,
+    "symmetrical_triangle": symmetrical_triangle,
+    "rising_wedge": rising_wedge,
+    "falling_wedge": falling_wedge,
+    "bull_flag": bull_flag,
+    "bear_flag": bear_flag,
+    "bull_pennant": bull_pennant,
+    "bear_pennant": bear_pennant,
+    "rectangle_bullish": rectangle_bullish,
+    "rectangle_bearish": rectangle_bearish,
+    "cup_and_handle": cup_and_handle,
+    "inverted_cup_and_handle": inverted_cup_and_handle,
+    "ascending_channel": channel_up,
+    "descending_channel": channel_down,
+    "horizontal_channel": channel_horizontal,
+    "measured_move_up": trend_up,
+    "measured_move_down": trend_down,
+    "three_drives_pattern_bullish": trend_up,
+    "three_drives_pattern_bearish": trend_down,
+    "scallop_bullish": trend_up,
+    "scallop_bearish": trend_down,
+    "flag_formation_high_tight": sideways,
+    "pennant_formation_high_tight": sideways,
+    "consolidation_box": rectangle_bullish,
+    "trading_range": rectangle_bullish,
+    "continuation_diamond": diamond_bottom,
+    "ladder_bottom": trend_up,
+    "ladder_top": trend_down,
+    "bull_trap_continuation": sideways,
+    "bear_trap_continuation": sideways,
+    "rectangle_top_continuation": rectangle_bullish,
+    "rectangle_bottom_continuation": rectangle_bullish,
+    "parallel_channel_up": channel_up,
+    "parallel_channel_down": channel_down,
+    # Candlestick
+    "doji": doji,
+    "hammer": hammer,
+    "hanging_man": hanging_man,
+    "inverted_hammer": inverted_hammer,
+    "shooting_star": shooting_star,
+    "bullish_engulfing": bullish_engulfing,
+    "bearish_engulfing": bearish_engulfing,
+    "morning_star": morning_star,
+    "evening_star": evening_star,
+    "three_white_soldiers": three_white_soldiers,
+    "three_black_crows": three_black_crows,
+    "piercing_line": piercing_line,
+    "dark_cloud_cover": dark_cloud_cover,
+    "harami_bullish": harami_bullish,
+    "harami_bearish": harami_bearish,
+    "tweezer_top": tweezer_top,
+    "tweezer_bottom": tweezer_bottom,
+    "spinning_top": spinning_top,
+    "marubozu_bullish": marubozu_bullish,
+    "marubozu_bearish": marubozu_bearish,
+    "three_inside_up": three_white_soldiers,
+    "three_inside_down": three_black_crows,
+    "three_outside_up": three_white_soldiers,
+    "three_outside_down": three_black_crows,
+    "abandoned_baby_bullish": abandoned_baby_bullish,
+    "abandoned_baby_bearish": abandoned_baby_bearish,
+    "kicker_bullish": kicker_bullish,
+    "kicker_bearish": kicker_bearish,
+    "belt_hold_bullish": belt_hold_bullish,
+    "belt_hold_bearish": belt_hold_bearish,
+    "upside_gap_two_crows": trend_up,
+    "downside_tasuki_gap": trend_down,
+    "upside_tasuki_gap": trend_up,
+}
+
+
+def pattern_shapes(pattern_name):
+    """Primitive list for a pattern; every name in PATTERNS has an entry in SHAPES."""
+    try:
+        return SHAPES[pattern_name.lower()]()
+    except KeyError:
+        raise KeyError(f"no shape registered for {pattern_name!r}: add it to SHAPES") from None
+
+
+# ---------- Rendering ----------
+# Both backends produce the same frame. Matplotlib lays a width x height (px at 100 dpi) figure
+# out with the default subplot box, and bbox_inches='tight' crops the saved PNG to that axes
+# box plus pad_inches: 252x212 px for the default 300x250, with data x=0..100 spanning
+# 232.5 px and y=0..100 spanning 192.5 px. The NumPy backend rasterizes straight into that frame,
+# with coverage-based anti-aliasing per stroke (one alpha per path, as Agg composites it).
+
+DPI = 100
+PAD_PX = 10  # pad_inches=0.1
+AXES_FRACTION = (0.9 - 0.125, 0.88 - 0.11)  # matplotlib's default subplot box
+FACES = {"white": 1.0, "gray": 128 / 255, "lightgray": 211 / 255}
+DASHES = {"--": (3.7, 1.6), ":": (1.0, 1.65)}  # on/off in units of the line width (rcParams)
+BACKENDS = ("matplotlib", "numpy")
+
+
+def draw_matplotlib(shapes, width, height, lap):
+    """PNG bytes through the historical Matplotlib path (byte-identical to earlier output)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
     
-    fig, ax = plt.subplots(figsize=(width/100, height/100), dpi=100)
+    fig, ax = plt.subplots(figsize=(width/100, height/100), dpi=DPI)
     ax.set_xlim(0, 100)
     ax.set_ylim(0, 100)
     ax.axis('off')
@@ -153,493 +683,165 @@ def generate_pattern_image(pattern_name, pattern_type, width=300, height=250):
     # Set background to white
     fig.patch.set_facecolor('white')
     ax.set_facecolor('white')
+    lap("setup")
     
-    # Generate pattern-specific shapes
-    name_lower = pattern_name.lower()
-    
-    # REVERSAL PATTERNS
-    if "head_and_shoulders" in name_lower and "inverse" not in name_lower:
-        # Head and Shoulders
-        x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-        y = np.array([30, 50, 35, 60, 40, 50, 30, 40, 25])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [30, 25], 'k--', linewidth=1.5, alpha=0.6)  # Neckline
-        
-    elif "inverse_head_and_shoulders" in name_lower:
-        # Inverse Head and Shoulders
-        x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-        y = np.array([70, 50, 65, 40, 60, 50, 70, 60, 75])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [70, 75], 'k--', linewidth=1.5, alpha=0.6)  # Neckline
-        
-    elif "double_top" in name_lower:
-        x = np.linspace(10, 90, 50)
-        y = 30 + 30*np.sin((x-10)/15) * np.exp(-(x-50)**2/1000)
-        y[20:25] = 60
-        y[35:40] = 60
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [40, 40], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "double_bottom" in name_lower:
-        x = np.linspace(10, 90, 50)
-        y = 70 - 30*np.sin((x-10)/15) * np.exp(-(x-50)**2/1000)
-        y[20:25] = 40
-        y[35:40] = 40
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [60, 60], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "triple_top" in name_lower:
-        x = np.array([10, 18, 25, 32, 40, 48, 55, 62, 70, 78, 90])
-        y = np.array([30, 55, 40, 55, 38, 55, 40, 55, 35, 45, 25])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [38, 25], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "triple_bottom" in name_lower:
-        x = np.array([10, 18, 25, 32, 40, 48, 55, 62, 70, 78, 90])
-        y = np.array([70, 45, 60, 45, 62, 45, 60, 45, 65, 55, 75])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [62, 75], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "rounding_top" in name_lower or "saucer_top" in name_lower:
-        x = np.linspace(10, 90, 60)
-        y = 40 + 25 * np.cos((x-50)/25)
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "rounding_bottom" in name_lower or "saucer_bottom" in name_lower:
-        x = np.linspace(10, 90, 60)
-        y = 60 - 25 * np.cos((x-50)/25)
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "v_top" in name_lower:
-        x = np.array([10, 50, 90])
-        y = np.array([30, 75, 30])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "v_bottom" in name_lower:
-        x = np.array([10, 50, 90])
-        y = np.array([70, 25, 70])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "diamond" in name_lower:
-        if "top" in name_lower:
-            x = np.array([10, 30, 50, 70, 90])
-            y = np.array([45, 70, 45, 70, 45])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 50], [45, 45], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([50, 90], [45, 45], 'k--', linewidth=1.5, alpha=0.6)
-        else:
-            x = np.array([10, 30, 50, 70, 90])
-            y = np.array([55, 30, 55, 30, 55])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 50], [55, 55], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([50, 90], [55, 55], 'k--', linewidth=1.5, alpha=0.6)
-            
-    elif "broadening" in name_lower or "megaphone" in name_lower:
-        if "top" in name_lower or "ascending" in name_lower:
-            x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-            y = np.array([45, 55, 42, 60, 40, 65, 38, 68, 35])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 90], [45, 35], 'k--', linewidth=1, alpha=0.5)
-            ax.plot([10, 90], [55, 68], 'k--', linewidth=1, alpha=0.5)
-        else:
-            x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-            y = np.array([55, 45, 58, 40, 60, 35, 62, 32, 65])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 90], [55, 65], 'k--', linewidth=1, alpha=0.5)
-            ax.plot([10, 90], [45, 32], 'k--', linewidth=1, alpha=0.5)
-            
-    elif "island_reversal" in name_lower:
-        if "top" in name_lower:
-            x = np.array([10, 25, 30, 45, 50, 65, 90])
-            y = np.array([30, 50, 50, 60, 60, 50, 30])
-            ax.plot(x[:3], y[:3], 'k-', linewidth=2.5)
-            ax.plot(x[2:5], y[2:5], 'k-', linewidth=2.5)
-            ax.plot(x[4:], y[4:], 'k-', linewidth=2.5)
-            ax.axvline(x=28, ymin=0.4, ymax=0.5, color='k', linestyle=':', linewidth=1.5)
-            ax.axvline(x=52, ymin=0.5, ymax=0.4, color='k', linestyle=':', linewidth=1.5)
-        else:
-            x = np.array([10, 25, 30, 45, 50, 65, 90])
-            y = np.array([70, 50, 50, 40, 40, 50, 70])
-            ax.plot(x[:3], y[:3], 'k-', linewidth=2.5)
-            ax.plot(x[2:5], y[2:5], 'k-', linewidth=2.5)
-            ax.plot(x[4:], y[4:], 'k-', linewidth=2.5)
-            ax.axvline(x=28, ymin=0.5, ymax=0.6, color='k', linestyle=':', linewidth=1.5)
-            ax.axvline(x=52, ymin=0.4, ymax=0.5, color='k', linestyle=':', linewidth=1.5)
-            
-    # CONTINUATION PATTERNS
-    elif "ascending_triangle" in name_lower:
-        x = np.array([10, 25, 40, 55, 70, 85, 90])
-        y = np.array([30, 55, 40, 55, 45, 55, 70])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [55, 55], 'k--', linewidth=1.5, alpha=0.6)
-        ax.plot([10, 85], [30, 55], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "descending_triangle" in name_lower:
-        x = np.array([10, 25, 40, 55, 70, 85, 90])
-        y = np.array([70, 45, 60, 45, 55, 45, 30])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 90], [45, 45], 'k--', linewidth=1.5, alpha=0.6)
-        ax.plot([10, 85], [70, 45], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "symmetrical_triangle" in name_lower:
-        x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-        y = np.array([65, 40, 58, 42, 54, 46, 52, 48, 70])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 80], [65, 48], 'k--', linewidth=1.5, alpha=0.6)
-        ax.plot([10, 80], [40, 48], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "rising_wedge" in name_lower:
-        x = np.array([10, 25, 40, 55, 70, 85])
-        y = np.array([30, 48, 42, 54, 48, 58])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 85], [30, 58], 'k--', linewidth=1.5, alpha=0.6)
-        ax.plot([10, 85], [35, 63], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "falling_wedge" in name_lower:
-        x = np.array([10, 25, 40, 55, 70, 85])
-        y = np.array([70, 52, 58, 46, 52, 42])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([10, 85], [70, 42], 'k--', linewidth=1.5, alpha=0.6)
-        ax.plot([10, 85], [65, 37], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "bull_flag" in name_lower or "flag_bullish" in name_lower:
-        x = np.array([10, 20, 30, 40, 50, 55, 60, 65, 90])
-        y = np.array([30, 55, 55, 53, 53, 51, 51, 49, 75])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([30, 65], [55, 49], 'k--', linewidth=1, alpha=0.5)
-        ax.plot([30, 65], [53, 47], 'k--', linewidth=1, alpha=0.5)
-        
-    elif "bear_flag" in name_lower or "flag_bearish" in name_lower:
-        x = np.array([10, 20, 30, 40, 50, 55, 60, 65, 90])
-        y = np.array([70, 45, 45, 47, 47, 49, 49, 51, 25])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([30, 65], [45, 51], 'k--', linewidth=1, alpha=0.5)
-        ax.plot([30, 65], [47, 53], 'k--', linewidth=1, alpha=0.5)
-        
-    elif "bull_pennant" in name_lower or "pennant_bullish" in name_lower:
-        x = np.array([10, 20, 30, 38, 46, 54, 62, 70, 90])
-        y = np.array([30, 55, 55, 52, 54, 51, 53, 51, 75])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([30, 70], [55, 51], 'k--', linewidth=1, alpha=0.5)
-        ax.plot([30, 70], [50, 51], 'k--', linewidth=1, alpha=0.5)
-        
-    elif "bear_pennant" in name_lower or "pennant_bearish" in name_lower:
-        x = np.array([10, 20, 30, 38, 46, 54, 62, 70, 90])
-        y = np.array([70, 45, 45, 48, 46, 49, 47, 49, 25])
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        ax.plot([30, 70], [45, 49], 'k--', linewidth=1, alpha=0.5)
-        ax.plot([30, 70], [50, 49], 'k--', linewidth=1, alpha=0.5)
-        
-    elif "rectangle" in name_lower or "consolidation" in name_lower or "trading_range" in name_lower:
-        if "bearish" in name_lower or "down" in name_lower:
-            x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-            y = np.array([70, 60, 55, 60, 55, 60, 55, 60, 30])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([20, 80], [60, 60], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([20, 80], [55, 55], 'k--', linewidth=1.5, alpha=0.6)
-        else:
-            x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-            y = np.array([30, 40, 45, 40, 45, 40, 45, 40, 70])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([20, 80], [40, 40], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([20, 80], [45, 45], 'k--', linewidth=1.5, alpha=0.6)
-        
-    elif "cup_and_handle" in name_lower and "inverted" not in name_lower:
-        x = np.linspace(10, 90, 80)
-        y = np.zeros_like(x)
-        y[:40] = 40 + 15 * (1 - np.cos(np.linspace(0, np.pi, 40)))
-        y[40:55] = 70 - 5 * ((x[40:55] - 50) / 7.5)**2
-        y[55:] = 70 + (x[55:] - 55) * 0.3
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "inverted_cup_and_handle" in name_lower:
-        x = np.linspace(10, 90, 80)
-        y = np.zeros_like(x)
-        y[:40] = 60 - 15 * (1 - np.cos(np.linspace(0, np.pi, 40)))
-        y[40:55] = 30 + 5 * ((x[40:55] - 50) / 7.5)**2
-        y[55:] = 30 - (x[55:] - 55) * 0.3
-        ax.plot(x, y, 'k-', linewidth=2.5)
-        
-    elif "channel" in name_lower or "parallel" in name_lower:
-        if "ascending" in name_lower or "up" in name_lower:
-            x = np.array([10, 30, 50, 70, 90])
-            y = np.array([30, 40, 50, 60, 70])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 90], [35, 75], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([10, 90], [25, 65], 'k--', linewidth=1.5, alpha=0.6)
-        elif "descending" in name_lower or "down" in name_lower:
-            x = np.array([10, 30, 50, 70, 90])
-            y = np.array([70, 60, 50, 40, 30])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 90], [75, 35], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([10, 90], [65, 25], 'k--', linewidth=1.5, alpha=0.6)
-        else:  # horizontal
-            x = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90])
-            y = np.array([50, 45, 50, 45, 50, 45, 50, 45, 50])
-            ax.plot(x, y, 'k-', linewidth=2.5)
-            ax.plot([10, 90], [50, 50], 'k--', linewidth=1.5, alpha=0.6)
-            ax.plot([10, 90], [45, 45], 'k--', linewidth=1.5, alpha=0.6)
-            
-    # CANDLESTICK PATTERNS
-    elif "doji" in name_lower:
-        # Single candle with small body
-        rect = Rectangle((45, 48), 10, 4, linewidth=1, edgecolor='black', facecolor='white')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [30, 48], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [52, 70], 'k-', linewidth=1.5)
-        
-    elif "hammer" in name_lower and "inverted" not in name_lower:
-        rect = Rectangle((45, 60), 10, 8, linewidth=1, edgecolor='black', facecolor='white')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [30, 60], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [68, 72], 'k-', linewidth=1.5)
-        
-    elif "hanging_man" in name_lower:
-        rect = Rectangle((45, 60), 10, 8, linewidth=1, edgecolor='black', facecolor='gray')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [30, 60], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [68, 72], 'k-', linewidth=1.5)
-        
-    elif "inverted_hammer" in name_lower:
-        rect = Rectangle((45, 32), 10, 8, linewidth=1, edgecolor='black', facecolor='white')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [28, 32], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [40, 70], 'k-', linewidth=1.5)
-        
-    elif "shooting_star" in name_lower:
-        rect = Rectangle((45, 32), 10, 8, linewidth=1, edgecolor='black', facecolor='gray')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [28, 32], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [40, 70], 'k-', linewidth=1.5)
-        
-    elif "engulfing" in name_lower:
-        if "bullish" in name_lower:
-            rect1 = Rectangle((35, 48), 8, -10, linewidth=1, edgecolor='black', facecolor='gray')
-            rect2 = Rectangle((57, 35), 8, 20, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([39, 39], [50, 55], 'k-', linewidth=1.5)
-            ax.plot([39, 39], [38, 32], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [57, 65], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [35, 28], 'k-', linewidth=1.5)
+    for shape in shapes:
+        if shape[0] == "rect":
+            _, x, y, w, h, face = shape
+            ax.add_patch(Rectangle((x, y), w, h, linewidth=1, edgecolor='black', facecolor=face))
         else:
-            rect1 = Rectangle((35, 38), 8, 10, linewidth=1, edgecolor='black', facecolor='white')
-            rect2 = Rectangle((57, 55), 8, -20, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([39, 39], [50, 55], 'k-', linewidth=1.5)
-            ax.plot([39, 39], [38, 32], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [57, 65], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [35, 28], 'k-', linewidth=1.5)
-            
-    elif "morning_star" in name_lower:
-        rect1 = Rectangle((25, 55), 8, -12, linewidth=1, edgecolor='black', facecolor='gray')
-        rect2 = Rectangle((46, 42), 8, 3, linewidth=1, edgecolor='black', facecolor='white')
-        rect3 = Rectangle((67, 45), 8, 15, linewidth=1, edgecolor='black', facecolor='white')
-        ax.add_patch(rect1)
-        ax.add_patch(rect2)
-        ax.add_patch(rect3)
-        ax.plot([29, 29], [57, 63], 'k-', linewidth=1.5)
-        ax.plot([29, 29], [43, 38], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [46, 50], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [42, 38], 'k-', linewidth=1.5)
-        ax.plot([71, 71], [62, 68], 'k-', linewidth=1.5)
-        ax.plot([71, 71], [45, 40], 'k-', linewidth=1.5)
-        
-    elif "evening_star" in name_lower:
-        rect1 = Rectangle((25, 45), 8, 12, linewidth=1, edgecolor='black', facecolor='white')
-        rect2 = Rectangle((46, 55), 8, 3, linewidth=1, edgecolor='black', facecolor='gray')
-        rect3 = Rectangle((67, 60), 8, -15, linewidth=1, edgecolor='black', facecolor='gray')
-        ax.add_patch(rect1)
-        ax.add_patch(rect2)
-        ax.add_patch(rect3)
-        ax.plot([29, 29], [59, 63], 'k-', linewidth=1.5)
-        ax.plot([29, 29], [45, 40], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [59, 63], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [55, 50], 'k-', linewidth=1.5)
-        ax.plot([71, 71], [62, 67], 'k-', linewidth=1.5)
-        ax.plot([71, 71], [45, 38], 'k-', linewidth=1.5)
-        
-    elif "three_white_soldiers" in name_lower or "three_inside_up" in name_lower or "three_outside_up" in name_lower:
-        for i, x_pos in enumerate([25, 45, 65]):
-            height = 12 + i*2
-            rect = Rectangle((x_pos, 40+i*5), 10, height, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect)
-            ax.plot([x_pos+5, x_pos+5], [40+i*5+height, 40+i*5+height+6], 'k-', linewidth=1.5)
-            ax.plot([x_pos+5, x_pos+5], [40+i*5, 40+i*5-4], 'k-', linewidth=1.5)
-            
-    elif "three_black_crows" in name_lower or "three_inside_down" in name_lower or "three_outside_down" in name_lower:
-        for i, x_pos in enumerate([25, 45, 65]):
-            height = 12 + i*2
-            rect = Rectangle((x_pos, 60-i*5), 10, -height, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect)
-            ax.plot([x_pos+5, x_pos+5], [60-i*5, 60-i*5+6], 'k-', linewidth=1.5)
-            ax.plot([x_pos+5, x_pos+5], [60-i*5-height, 60-i*5-height-4], 'k-', linewidth=1.5)
-            
-    elif "piercing_line" in name_lower:
-        rect1 = Rectangle((35, 60), 8, -15, linewidth=1, edgecolor='black', facecolor='gray')
-        rect2 = Rectangle((57, 42), 8, 16, linewidth=1, edgecolor='black', facecolor='white')
-        ax.add_patch(rect1)
-        ax.add_patch(rect2)
-        ax.plot([39, 39], [62, 68], 'k-', linewidth=1.5)
-        ax.plot([39, 39], [45, 38], 'k-', linewidth=1.5)
-        ax.plot([61, 61], [60, 66], 'k-', linewidth=1.5)
-        ax.plot([61, 61], [42, 35], 'k-', linewidth=1.5)
-        
-    elif "dark_cloud_cover" in name_lower:
-        rect1 = Rectangle((35, 40), 8, 15, linewidth=1, edgecolor='black', facecolor='white')
-        rect2 = Rectangle((57, 58), 8, -16, linewidth=1, edgecolor='black', facecolor='gray')
-        ax.add_patch(rect1)
-        ax.add_patch(rect2)
-        ax.plot([39, 39], [57, 63], 'k-', linewidth=1.5)
-        ax.plot([39, 39], [40, 33], 'k-', linewidth=1.5)
-        ax.plot([61, 61], [60, 66], 'k-', linewidth=1.5)
-        ax.plot([61, 61], [42, 35], 'k-', linewidth=1.5)
-        
-    elif "harami" in name_lower:
-        if "bullish" in name_lower:
-            rect1 = Rectangle((32, 60), 12, -18, linewidth=1, edgecolor='black', facecolor='gray')
-            rect2 = Rectangle((58, 48), 8, 6, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([38, 38], [62, 68], 'k-', linewidth=1.5)
-            ax.plot([38, 38], [42, 36], 'k-', linewidth=1.5)
-            ax.plot([62, 62], [56, 60], 'k-', linewidth=1.5)
-            ax.plot([62, 62], [48, 44], 'k-', linewidth=1.5)
-        else:
-            rect1 = Rectangle((32, 40), 12, 18, linewidth=1, edgecolor='black', facecolor='white')
-            rect2 = Rectangle((58, 52), 8, -6, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([38, 38], [60, 66], 'k-', linewidth=1.5)
-            ax.plot([38, 38], [40, 34], 'k-', linewidth=1.5)
-            ax.plot([62, 62], [54, 58], 'k-', linewidth=1.5)
-            ax.plot([62, 62], [46, 42], 'k-', linewidth=1.5)
-            
-    elif "tweezer" in name_lower:
-        if "bottom" in name_lower:
-            rect1 = Rectangle((35, 45), 8, -10, linewidth=1, edgecolor='black', facecolor='gray')
-            rect2 = Rectangle((57, 40), 8, 10, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([39, 39], [47, 52], 'k-', linewidth=1.5)
-            ax.plot([39, 39], [35, 30], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [52, 57], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [40, 30], 'k-', linewidth=1.5)
-        else:
-            rect1 = Rectangle((35, 55), 8, 10, linewidth=1, edgecolor='black', facecolor='white')
-            rect2 = Rectangle((57, 60), 8, -10, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([39, 39], [67, 72], 'k-', linewidth=1.5)
-            ax.plot([39, 39], [55, 50], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [72, 67], 'k-', linewidth=1.5)
-            ax.plot([61, 61], [50, 60], 'k-', linewidth=1.5)
-            
-    elif "spinning_top" in name_lower:
-        rect = Rectangle((45, 48), 10, 4, linewidth=1, edgecolor='black', facecolor='lightgray')
-        ax.add_patch(rect)
-        ax.plot([50, 50], [32, 48], 'k-', linewidth=1.5)
-        ax.plot([50, 50], [52, 68], 'k-', linewidth=1.5)
-        
-    elif "marubozu" in name_lower:
-        if "bullish" in name_lower:
-            rect = Rectangle((42, 35), 16, 30, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect)
-        else:
-            rect = Rectangle((42, 65), 16, -30, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect)
-            
-    elif "abandoned_baby" in name_lower:
-        if "bullish" in name_lower:
-            rect1 = Rectangle((22, 60), 10, -15, linewidth=1, edgecolor='black', facecolor='gray')
-            rect2 = Rectangle((46, 42), 8, 2, linewidth=1, edgecolor='black', facecolor='white')
-            rect3 = Rectangle((70, 45), 10, 18, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.add_patch(rect3)
-            ax.plot([27, 27], [62, 68], 'k-', linewidth=1.5)
-            ax.plot([27, 27], [45, 38], 'k-', linewidth=1.5)
-            ax.plot([50, 50], [46, 52], 'k-', linewidth=1.5)
-            ax.plot([50, 50], [42, 36], 'k-', linewidth=1.5)
-            ax.plot([75, 75], [65, 72], 'k-', linewidth=1.5)
-            ax.plot([75, 75], [45, 38], 'k-', linewidth=1.5)
-        else:
-            rect1 = Rectangle((22, 40), 10, 15, linewidth=1, edgecolor='black', facecolor='white')
-            rect2 = Rectangle((46, 56), 8, 2, linewidth=1, edgecolor='black', facecolor='gray')
-            rect3 = Rectangle((70, 63), 10, -18, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.add_patch(rect3)
-            ax.plot([27, 27], [57, 63], 'k-', linewidth=1.5)
-            ax.plot([27, 27], [40, 33], 'k-', linewidth=1.5)
-            ax.plot([50, 50], [60, 66], 'k-', linewidth=1.5)
-            ax.plot([50, 50], [56, 50], 'k-', linewidth=1.5)
-            ax.plot([75, 75], [65, 72], 'k-', linewidth=1.5)
-            ax.plot([75, 75], [45, 38], 'k-', linewidth=1.5)
-            
-    elif "kicker" in name_lower:
-        if "bullish" in name_lower:
-            rect1 = Rectangle((32, 58), 12, -16, linewidth=1, edgecolor='black', facecolor='gray')
-            rect2 = Rectangle((58, 48), 12, 18, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([38, 38], [60, 66], 'k-', linewidth=1.5)
-            ax.plot([38, 38], [42, 36], 'k-', linewidth=1.5)
-            ax.plot([64, 64], [68, 74], 'k-', linewidth=1.5)
-            ax.plot([64, 64], [48, 42], 'k-', linewidth=1.5)
-        else:
-            rect1 = Rectangle((32, 42), 12, 16, linewidth=1, edgecolor='black', facecolor='white')
-            rect2 = Rectangle((58, 52), 12, -18, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect1)
-            ax.add_patch(rect2)
-            ax.plot([38, 38], [60, 66], 'k-', linewidth=1.5)
-            ax.plot([38, 38], [42, 36], 'k-', linewidth=1.5)
-            ax.plot([64, 64], [54, 60], 'k-', linewidth=1.5)
-            ax.plot([64, 64], [34, 28], 'k-', linewidth=1.5)
-            
-    elif "belt_hold" in name_lower:
-        if "bullish" in name_lower:
-            rect = Rectangle((42, 38), 16, 24, linewidth=1, edgecolor='black', facecolor='white')
-            ax.add_patch(rect)
-            ax.plot([50, 50], [64, 70], 'k-', linewidth=1.5)
-        else:
-            rect = Rectangle((42, 62), 16, -24, linewidth=1, edgecolor='black', facecolor='gray')
-            ax.add_patch(rect)
-            ax.plot([50, 50], [38, 32], 'k-', linewidth=1.5)
-            
-    # DEFAULT PATTERNS - Generic shapes
-    else:
-        # Create a generic pattern visualization
-        if "bullish" in name_lower or "up" in name_lower or "bottom" in name_lower:
-            x = np.linspace(10, 90, 50)
-            y = 30 + 35 * (1 / (1 + np.exp(-(x-50)/10)))
-            ax.plot(x, y, 'k-', linewidth=2.5)
-        elif "bearish" in name_lower or "down" in name_lower or "top" in name_lower:
-            x = np.linspace(10, 90, 50)
-            y = 70 - 35 * (1 / (1 + np.exp(-(x-50)/10)))
-            ax.plot(x, y, 'k-', linewidth=2.5)
-        else:
-            # Neutral pattern
-            x = np.linspace(10, 90, 50)
-            y = 50 + 15 * np.sin((x-10)/10)
-            ax.plot(x, y, 'k-', linewidth=2.5)
+            _, x, y, lw, alpha, dashes = shape
+            ax.plot(x, y, 'k' + (dashes or '-'), linewidth=lw, alpha=alpha)
+    lap("draw")
     
-    # Save as grayscale PNG
-    output_path = OUTPUT_DIR / f"{pattern_name.lower()}_ref.png"
-    plt.savefig(output_path, dpi=100, bbox_inches='tight', pad_inches=0.1, 
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=DPI, bbox_inches='tight', pad_inches=0.1,
                 facecolor='white', edgecolor='none')
     plt.close()
+    lap("savefig")
+    return buf.getvalue()
+
+
+def stroke_coverage(cov, x0, y0, x1, y1, half, butt):
+    """Max-in the anti-aliased coverage of one segment (pixel coordinates within cov)."""
+    length = np.hypot(x1 - x0, y1 - y0)
+    if length == 0:
+        return
+    h, w = cov.shape
+    r = half + 1
+    c0, c1 = max(0, int(min(x0, x1) - r)), min(w, int(max(x0, x1) + r) + 2)
+    r0, r1 = max(0, int(min(y0, y1) - r)), min(h, int(max(y0, y1) + r) + 2)
+    px = np.arange(c0, c1, dtype=np.float32) + (0.5 - x0)
+    py = (np.arange(r0, r1, dtype=np.float32) + (0.5 - y0))[:, None]
+    ux, uy = (x1 - x0) / length, (y1 - y0) / length
+    along = px * ux + py * uy
+    across = np.abs(py * ux - px * uy)
+    if butt:
+        c = np.clip(half + 0.5 - across, 0, 1) * np.clip(np.minimum(along, length - along) + 0.5, 0, 1)
+    else:  # round caps and joins
+        t = np.clip(along, 0, length)
+        c = np.clip(half + 0.5 - np.hypot(px - t * ux, py - t * uy), 0, 1)
+    np.maximum(cov[r0:r1, c0:c1], c, out=cov[r0:r1, c0:c1])
+
+
+def dash_segments(xs, ys, pattern):
+    """The 'on' pieces of a dashed polyline, as (x0, y0, x1, y1) in pixels."""
+    on, off = pattern
+    lengths = np.hypot(np.diff(xs), np.diff(ys))
+    ends = np.cumsum(lengths)
+    pieces = []
+    for start in np.arange(0, ends[-1], on + off):
+        stop = min(start + on, ends[-1])
+        for i, (length, end) in enumerate(zip(lengths, ends)):
+            a, b = max(start, end - length), min(stop, end)
+            if b > a:
+                fa, fb = 1 - (end - a) / length, 1 - (end - b) / length
+                pieces.append((xs[i] + (xs[i+1] - xs[i]) * fa, ys[i] + (ys[i+1] - ys[i]) * fa,
+                               xs[i] + (xs[i+1] - xs[i]) * fb, ys[i] + (ys[i+1] - ys[i]) * fb))
+    return pieces
+
+
+def draw_numpy(shapes, width, height):
+    """Anti-aliased grayscale rendering of `shapes`, same frame and geometry as Matplotlib."""
+    from PIL import Image
+    aw, ah = AXES_FRACTION[0] * width, AXES_FRACTION[1] * height
+    img = np.ones((int(ah + 2 * PAD_PX), int(aw + 2 * PAD_PX)), dtype=np.float32)
+    pt = DPI / 72  # pixels per point
+    
+    def to_px(x, y, lw):
+        xs = PAD_PX + np.asarray(x, dtype=float) * aw / 100
+        ys = img.shape[0] - PAD_PX - np.asarray(y, dtype=float) * ah / 100  # Agg flips at the whole-pixel height
+        if np.all((np.diff(xs) == 0) | (np.diff(ys) == 0)):
+            # Like Agg, snap paths made only of horizontal/vertical segments (candles, wicks,
+            # level necklines) to the pixel grid, so thin strokes stay one pixel sharp
+            snap = 0.5 if round(lw * pt) % 2 else 0.0
+            xs, ys = np.floor(xs + 0.5) + snap, np.floor(ys + 0.5) + snap
+        return xs, ys
+    
+    def window(xs, ys, margin):
+        """Slices of img covering the box around the given pixel coordinates."""
+        h, w = img.shape
+        c0, c1 = max(0, int(min(xs) - margin)), min(w, int(max(xs) + margin) + 2)
+        r0, r1 = max(0, int(min(ys) - margin)), min(h, int(max(ys) + margin) + 2)
+        return slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+    
+    def ink(segments, lw, alpha, butt):
+        if not segments:
+            return
+        half = lw * pt / 2
+        rows, cols = window([v for s in segments for v in s[::2]], [v for s in segments for v in s[1::2]], half + 1)
+        cov = np.zeros((rows.stop - rows.start, cols.stop - cols.start), dtype=np.float32)
+        for x0, y0, x1, y1 in segments:
+            stroke_coverage(cov, x0 - cols.start, y0 - rows.start, x1 - cols.start, y1 - rows.start, half, butt)
+        img[rows, cols] *= 1 - (1.0 if alpha is None else alpha) * cov  # black ink, one alpha per path
     
-    return output_path
+    # Candle bodies first, then lines: Matplotlib's zorder for patches and lines
+    for shape in shapes:
+        if shape[0] != "rect":
+            continue
+        _, x, y, w, h, face = shape
+        xs, ys = to_px([x, x + w, x + w, x, x], [y, y, y + h, y + h, y], 1)
+        (l, r), (t, b) = sorted(xs[:2]), sorted(ys[1:3])
+        rows, cols = window([l, r], [t, b], 1)
+        px = np.arange(cols.start, cols.stop) + 0.5
+        py = (np.arange(rows.start, rows.stop) + 0.5)[:, None]
+        fill = np.clip(np.minimum(px - l, r - px) + 0.5, 0, 1) * np.clip(np.minimum(py - t, b - py) + 0.5, 0, 1)
+        img[rows, cols] += (FACES[face] - img[rows, cols]) * fill
+        ink(list(zip(xs[:-1], ys[:-1], xs[1:], ys[1:])), 1, None, butt=False)
+    for shape in shapes:
+        if shape[0] != "line":
+            continue
+        _, x, y, lw, alpha, dashes = shape
+        xs, ys = to_px(x, y, lw)
+        if dashes:
+            ink(dash_segments(xs, ys, [v * lw * pt for v in DASHES[dashes]]), lw, alpha, butt=True)
+        else:
+            ink(list(zip(xs[:-1], ys[:-1], xs[1:], ys[1:])), lw, alpha, butt=False)
+    return Image.fromarray(np.rint(img * 255).astype(np.uint8))  # 2-D uint8: mode L
 
 
-def create_yaml(pattern_name, threshold, scale_range, scale_stride, timeframes, min_bars, aspect_tol):
+def generate_pattern_image(pattern_name, pattern_type, width=300, height=250, tier="png", stats=None,
+                           backend="matplotlib", crop=None):
+    """Generate a simple, clean grayscale template image for a chart pattern.
+    
+    crop=margin cuts it down to its ink plus margin pixels with template_crop.crop.
+    """
+    lap = asset_profile.laps(stats)
+    shapes = pattern_shapes(pattern_name)
+    
+    # Save as grayscale PNG, re-encoded for non-png tiers
+    output_path = OUTPUT_DIR / f"{pattern_name.lower()}_ref{asset_encoders.EXTENSIONS[tier]}"
+    if backend == "numpy":
+        img = draw_numpy(shapes, width, height)
+        lap("draw")
+    else:
+        data = draw_matplotlib(shapes, width, height, lap)
+    if crop is not None:
+        from PIL import Image
+        gray = np.asarray(img) if backend == "numpy" else template_bundle.decode_gray(data)
+        img = Image.fromarray(template_crop.crop(gray, crop)[0])
+        lap("crop")
+    t0 = time.perf_counter()
+    if backend == "numpy" or crop is not None:
+        data = encoded = asset_encoders.encode(img, tier)
+    else:
+        encoded = asset_encoders.transcode(data, tier)
+    encode_ms = None if encoded is None else (time.perf_counter() - t0) * 1000
+    lap("encode")
+    asset_encoders.write_bytes(str(output_path), data if encoded is None else encoded)
+    lap("write")
+    
+    return asset_encoders.existing_record(str(output_path), asset_encoders.TEMPLATE_BPP, encode_ms)
+
+
+def create_yaml(pattern_name, threshold, scale_range, scale_stride, timeframes, min_bars, aspect_tol,
+                image_ext=".png", prefilter=None):
     """Create YAML configuration for a pattern."""
+    import yaml
     
     yaml_data = {
         'name': pattern_name.replace('_', ' '),
-        'image': f"pattern_templates/{pattern_name.lower()}_ref.png",
+        'image': f"pattern_templates/{pattern_name.lower()}_ref{image_ext}",
         'threshold': threshold,
         'scale_range': scale_range,
         'scale_stride': scale_stride,
@@ -650,37 +852,137 @@ def create_yaml(pattern_name, threshold, scale_range, scale_stride, timeframes,
     if aspect_tol is not None:
         yaml_data['aspect_tolerance'] = aspect_tol
     
+    if prefilter is not None:
+        yaml_data['prefilter'] = prefilter
+    
     yaml_path = OUTPUT_DIR / f"{pattern_name.lower()}.yaml"
     
-    with open(yaml_path, 'w') as f:
-        yaml.dump(yaml_data, f, default_flow_style=False, sort_keys=False)
+    # temp file + rename, like the images: the app never lists a half-written YAML
+    text = yaml.dump(yaml_data, default_flow_style=False, sort_keys=False)
+    asset_encoders.write_bytes(str(yaml_path), text.encode("utf-8"))
     
     return yaml_path
 
 
+def build_pattern(job):
+    """Image, stats sidecar, coarse image, YAML, then stale files; returns (record, stage stats).
+    
+    TemplateLibrary loads every *.yaml and the image it names, so a YAML must never point at an
+    image that isn't complete. All files are replaced atomically and in this order, and the old
+    tier's images are only removed once the new YAML stops referring to them: an interrupted run
+    leaves each template either fully old or fully new.
+    """
+    pattern_type, pattern_data, tier, backend, crop, cascade = job
+    name, threshold, scale_range, scale_stride, timeframes, min_bars, aspect_tol = pattern_data
+    ext = asset_encoders.EXTENSIONS[tier]
+    stats = {}
+    record = generate_pattern_image(name, pattern_type, tier=tier, stats=stats, backend=backend, crop=crop)
+    with asset_profile.stage(stats, "stats"):
+        with open(record["path"], "rb") as f:  # the bytes on disk: the sidecar records their hash
+            data = f.read()
+        template_stats.write_sidecar(str(OUTPUT_DIR / f"{name.lower()}.yaml"), data)
+    coarse_path = template_cascade.coarse_path(record["path"])
+    prefilter = None
+    if cascade:
+        from PIL import Image
+        with asset_profile.stage(stats, "cascade"):
+            gray = template_bundle.decode_gray(data)
+            coarse = template_cascade.coarse_template(gray, cascade)
+            asset_encoders.write_bytes(coarse_path, asset_encoders.encode(Image.fromarray(coarse), tier))
+            level, _ = template_cascade.calibrate(gray, threshold, cascade)
+            prefilter = template_cascade.prefilter_entry(f"pattern_templates/{name.lower()}_ref{ext}", cascade, level)
+    with asset_profile.stage(stats, "yaml"):
+        create_yaml(name, threshold, scale_range, scale_stride,
+                    timeframes, min_bars, aspect_tol, image_ext=ext, prefilter=prefilter)
+    with asset_profile.stage(stats, "write"):
+        stale = asset_encoders.siblings(record["path"]) + asset_encoders.siblings(coarse_path)
+        if not cascade and os.path.exists(coarse_path):
+            stale.append(coarse_path)
+        for other in stale:
+            os.remove(other)
+    return record, stats
+
+
+def run_jobs(jobs, workers):
+    """Yield (job, record, stats) in job order, serially or across a process pool."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield (job, *build_pattern(job))
+        return
+    import concurrent.futures  # serial runs and --help don't pay for it
+    chunk = max(1, len(jobs) // (workers * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+        # Executor.map preserves submission order, so the log and report are stable; every job
+        # writes only its own files, so the bytes match a serial run.
+        for job, result in zip(jobs, ex.map(build_pattern, jobs, chunksize=chunk)):
+            yield (job, *result)
+
+
+def category_summary(profile, workers, elapsed):
+    """Per-category time spent in the pattern stages (summed over workers) and the slowest pattern."""
+    print(f"\nTiming by category ({workers} worker{'s' if workers != 1 else ''}, {elapsed:.2f} s wall):")
+    for pattern_type in PATTERNS:
+        recs = [r for r in profile if r["category"] == pattern_type]
+        if not recs:
+            continue
+        total = sum(r["wall_ms"] for r in recs)
+        slow = max(recs, key=lambda r: r["wall_ms"])
+        print(f"  - {pattern_type.capitalize():<13} {len(recs):>3} patterns {total:>9.1f} ms "
+              f"({total / len(recs):.1f} ms each, slowest {slow['asset']} {slow['wall_ms']:.1f} ms)")
+
+
 def main():
     """Generate all 108 patterns with YAMLs and images."""
+    ap = argparse.ArgumentParser(description="Generate YAML configs and reference images for all patterns.")
+    asset_encoders.add_arguments(ap)
+    asset_profile.add_arguments(ap)
+    ap.add_argument("--backend", choices=BACKENDS, default="matplotlib",
+                    help="Template renderer: matplotlib (historical output) or numpy (fast, anti-aliased)")
+    ap.add_argument("--crop-margin", type=int, default=None,
+                    help="Crop templates to their ink plus this many pixels (default: full frame)")
+    ap.add_argument("--cascade", type=float, default=None, metavar="FACTOR",
+                    help="Also write a FACTOR-scale prefilter template with a calibrated threshold (e.g. 0.25)")
+    ap.add_argument("--bundle", default=str(BUNDLE_PATH),
+                    help="Also write every template in the output directory to this bundle ('' = don't)")
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes (0 = one per CPU, 1 = serial)")
+    ap.add_argument("--dry-run", action="store_true", help="List the files a run would write, then exit")
+    args = ap.parse_args()
+    ext = asset_encoders.EXTENSIONS[args.tier]
+    
+    if args.dry_run:
+        for pattern_type, pattern_list in PATTERNS.items():
+            for pattern_data in pattern_list:
+                stem = pattern_data[0].lower()
+                print(f"{pattern_type:<12} {OUTPUT_DIR / f'{stem}.yaml'}  {OUTPUT_DIR / f'{stem}_ref{ext}'}  "
+                      f"{OUTPUT_DIR / (stem + template_stats.EXTENSION)}"
+                      + (f"  {OUTPUT_DIR / f'{stem}{template_cascade.SUFFIX}{ext}'}" if args.cascade else ""))
+        if args.bundle:
+            print(f"{'bundle':<12} {args.bundle}")
+        print(f"Dry run: {sum(len(p) for p in PATTERNS.values())} patterns, nothing written")
+        return
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    for leftover in OUTPUT_DIR.glob("*.tmp"):  # from an interrupted run; never referenced by a YAML
+        leftover.unlink()
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    records = []
+    profile = []
     
     print("Generating all 108 chart patterns for QuantraVision...")
     print(f"Output directory: {OUTPUT_DIR}")
     
     total_count = 0
+    t_start = time.perf_counter()
+    jobs = [(pattern_type, pattern_data, args.tier, args.backend, args.crop_margin, args.cascade)
+            for pattern_type, pattern_list in PATTERNS.items() for pattern_data in pattern_list]
     
-    for pattern_type, pattern_list in PATTERNS.items():
-        print(f"\nGenerating {pattern_type.upper()} patterns ({len(pattern_list)} patterns)...")
-        
-        for pattern_data in pattern_list:
-            name, threshold, scale_range, scale_stride, timeframes, min_bars, aspect_tol = pattern_data
-            
-            # Generate image
-            img_path = generate_pattern_image(name, pattern_type)
-            
-            # Generate YAML
-            yaml_path = create_yaml(name, threshold, scale_range, scale_stride, 
-                                   timeframes, min_bars, aspect_tol)
-            
-            print(f"  ✓ {name}: YAML + Image created")
-            total_count += 1
+    for (pattern_type, pattern_data, *_), record, stats in run_jobs(jobs, workers):
+        name = pattern_data[0]
+        if name == PATTERNS[pattern_type][0][0]:
+            print(f"\nGenerating {pattern_type.upper()} patterns ({len(PATTERNS[pattern_type])} patterns)...")
+        records.append(record)
+        profile.append(asset_profile.entry("generate_all_108_patterns", name, stats, category=pattern_type))
+        print(f"  ✓ {name}: YAML + Image created")
+        total_count += 1
     
     print(f"\n{'='*60}")
     print(f"COMPLETE: Generated {total_count} patterns")
@@ -691,11 +993,22 @@ def main():
     
     # Verify all files exist
     yaml_files = list(OUTPUT_DIR.glob("*.yaml"))
-    png_files = list(OUTPUT_DIR.glob("*_ref.png"))
+    png_files = list(OUTPUT_DIR.glob(f"*_ref{ext}"))
     
     print(f"\nVerification:")
     print(f"  YAML files: {len(yaml_files)}")
     print(f"  PNG files: {len(png_files)}")
+    if args.bundle:
+        # From the directory, not from this run: the bundle must hold exactly what the app's
+        # directory loader would, including templates other scripts wrote there
+        bundled = template_bundle.load_directory(str(OUTPUT_DIR))
+        size = template_bundle.write_bundle(args.bundle, bundled)
+        print(f"  Bundle: {args.bundle} ({len(bundled)} templates, {size / 1024:.0f} KB)")
+    category_summary(profile, workers, time.perf_counter() - t_start)
+    asset_encoders.report(records, args.tier, args, "generate_all_108_patterns")
+    asset_profile.finish(args, profile, "generate_all_108_patterns",
+                         lambda rec: generate_pattern_image(rec["asset"], rec["category"], tier=args.tier,
+                                                            backend=args.backend, crop=args.crop_margin))
     
     if total_count == 108:
         print("\n✓ SUCCESS: All 108 patterns generated successfully!")
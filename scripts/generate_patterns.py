@@ -10,8 +10,32 @@
 #     --templates app/src/main/assets/pattern_templates \
 #     --out app/src/main/res \
 #     --sizes mdpi,hdpi,xhdpi,xxhdpi,xxxhdpi \
-#     --theme neon
+#     --theme neon,mono   # comma list; themes after the first write pattern_<name>_<theme>.png
+#     --jobs 0            # worker pool; 0 = one process per CPU, 1 = serial
+#     --downsample        # render each template once at the largest density, resample the rest
+#     --force             # ignore the build manifest and re-render everything
+#     --rng fast          # NumPy series/candles for new assets (default "compat" keeps golden images)
+#     --glow batched      # one blurred layer for all overlay strokes (default "exact" keeps golden images)
+#     --palette           # draw each scene once, colorize it per theme (pixel-identical to direct renders)
+#     --tier webp         # png (default) | png8 | webp; see asset_encoders.py
+#     --budget-kb 48 --decode-budget-kb 512 --report build/drawables.json
+#     --atlas             # a few drawable-nodpi/pattern_atlas_<density>_<page> pages + assets/pattern_atlas.json
+#     --atlas-max-size 2048 --atlas-padding 2
+#     --backend vector    # one res/drawable/pattern_<name>.xml VectorDrawable instead of PNGs
+#     --max-vector-nodes 4000
+#     --profile build/profile.jsonl --profile-top 3   # per-stage timings; cProfile the 3 slowest
+#     --watch             # stay running; re-render templates as their JSON files change
 #
+# Size report:
+#   Every run ends with encoded/decoded totals for all outputs (up-to-date ones included) and
+#   flags assets over --budget-kb / --decode-budget-kb; --report writes the per-asset JSON.
+#
+# Incremental builds:
+#   A manifest next to the res root (app/src/main/generate_patterns.manifest.json by default)
+#   records an input hash per output: template spec, theme, density, font file and
+#   RENDERER_VERSION. Only outputs whose hash changed (or whose file is missing) are rendered.
+#   Outputs whose template JSON file has been deleted are deleted too, but only by a run in which
+#   every template parsed and the fallbacks weren't used; a bad template fails the run (exit 1).
 # Template JSON schema (example: bull_flag.json):
 # {
 #   "name": "bull_flag",
@@ -22,7 +46,7 @@
 #       {"type":"line","pts":[[10,70],[45,30]],"width":4},
 #       {"type":"line","pts":[[10,80],[45,40]],"width":4},
 #       {"type":"channel","pts":[[55,30],[90,45]],"width":3}
-#     ],
+#     ],                  # overlay coordinates/widths are mdpi px, scaled per density
 #     "label": "Bull Flag",
 #     "confidence": 0.87
 #   }
@@ -30,22 +54,50 @@
 #
 # Determinism:
 #   Seed = stable hash of pattern name. No RNG outside seeded instance.
+#   --rng compat draws from random.Random(seed) exactly as before; --rng fast draws the whole
+#   series and all wick jitter in one batch from numpy.random.default_rng(seed). The two
+#   streams differ, so switching modes changes every candle chart.
+#   --glow exact (default) blurs each overlay line on its own, as before, but only within the
+#   line's padded bounding box: pixel-identical to a full-canvas blur. --glow batched draws all
+#   strokes into one mask, tints one union halo and blurs wide radii on a reduced pyramid: much
+#   less blurring, but where halos overlap they no longer stack. Measured against exact on the
+#   fallback templates, all themes and densities: 39.6-47.0 dB PSNR, up to 103/255 on single
+#   pixels where halos overlap. Head-and-shoulders overlay at xxxhdpi: 1160 ms full-canvas,
+#   140 ms exact, 24 ms batched.
+
+from __future__ import annotations  # annotations name np/Image without loading them
 
 import argparse
+import functools
+import hashlib
 import json
 import math
 import os
 import pathlib
 import random
 import sys
-from typing import List, Tuple, Dict
+import time
+from typing import List, Tuple, Dict, Optional
+
+from lazy_imports import lazy_import
 
+# Loaded on first use: --help, --dry-run and up-to-date builds never import them.
 try:
-    from PIL import Image, ImageDraw, ImageFont, ImageFilter
+    Image, ImageChops, ImageDraw, ImageFont, ImageFilter = (
+        lazy_import(f"PIL.{m}") for m in ("Image", "ImageChops", "ImageDraw", "ImageFont", "ImageFilter"))
 except ImportError:
     print("[generate_patterns] Pillow not found. Install via: pip install pillow", file=sys.stderr)
     raise
 
+try:
+    np = lazy_import("numpy")
+except ImportError:
+    print("[generate_patterns] NumPy not found. Install via: pip install numpy", file=sys.stderr)
+    raise
+
+import asset_encoders
+import asset_profile
+
 # ---------- Config ----------
 
 DENSITIES = {
@@ -91,6 +143,17 @@ FONT_CANDIDATES = [
     "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
 ]
 
+# Bump whenever a rendering change alters output pixels, so incremental builds re-render.
+RENDERER_VERSION = "2"
+RNG_MODES = ("compat", "fast")
+GLOW_MODES = ("exact", "batched")
+BADGE_FILL = (20, 48, 70, 200)  # badge box; themes may override it with a "badge" colour
+MANIFEST_NAME = "generate_patterns.manifest.json"
+
+# Process-wide LRU caches for render resources (one set per worker process).
+FONT_CACHE_SIZE = 16        # (font path, size) → parsed FreeType font
+BACKGROUND_CACHE_SIZE = 16  # (theme, width, height) → gradient + grid array, ~5 MB each at xxxhdpi
+
 # ---------- Helpers ----------
 
 def stable_seed(s: str) -> int:
@@ -101,40 +164,91 @@ def stable_seed(s: str) -> int:
         h &= 0xFFFFFFFFFFFFFFFF
     return h
 
-def pick_font(size: int) -> ImageFont.FreeTypeFont:
+SFNT_MAGIC = (b"\x00\x01\x00\x00", b"true", b"OTTO", b"ttcf")  # TrueType/OpenType/collection headers
+
+@functools.lru_cache(maxsize=1)
+def font_path() -> Optional[str]:
+    """First entry of FONT_CANDIDATES that is a font file, probed once per process.
+
+    Reads the sfnt header rather than loading the face, so hashing inputs (--dry-run, up-to-date
+    builds) doesn't need FreeType.
+    """
     for p in FONT_CANDIDATES:
-        if os.path.exists(p):
-            try:
-                return ImageFont.truetype(p, size=size)
-            except Exception:
-                continue
-    return ImageFont.load_default()
+        try:
+            with open(p, "rb") as f:
+                if f.read(4) in SFNT_MAGIC:
+                    return p
+        except OSError:
+            continue
+    return None
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def load_font(path: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size=size) if path else ImageFont.load_default()
+
+def pick_font(size: int) -> ImageFont.FreeTypeFont:
+    return load_font(font_path(), size)
+
+def canvas_size(dpi_scale: float) -> Tuple[int, int]:
+    return int(BASE_W * dpi_scale), int(BASE_H * dpi_scale)
 
 def ensure_dir(p: str) -> None:
     pathlib.Path(p).mkdir(parents=True, exist_ok=True)
 
 def lerp(a, b, t): return a + (b - a) * t
 
-def draw_background(img: Image.Image, theme: Dict):
-    w, h = img.size
-    g = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    d = ImageDraw.Draw(g)
-    # gradient bg
-    for y in range(h):
-        t = y / max(1, h - 1)
-        r = int(lerp(theme["bg1"][0], theme["bg2"][0], t))
-        gcol = int(lerp(theme["bg1"][1], theme["bg2"][1], t))
-        b = int(lerp(theme["bg1"][2], theme["bg2"][2], t))
-        d.line([(0, y), (w, y)], fill=(r, gcol, b, 255))
-    # grid
-    grid = theme["grid"]
-    gx = int(w / 16)
-    gy = int(h / 12)
-    for x in range(0, w, gx):
-        d.line([(x, 0), (x, h)], fill=grid, width=1)
-    for y in range(0, h, gy):
-        d.line([(0, y), (w, y)], fill=grid, width=1)
-    img.alpha_composite(g)
+def gradient_rows(c1: Tuple[int, ...], c2: Tuple[int, ...], h: int) -> "np.ndarray":
+    """(h, 3) uint8 vertical gradient; same lerp and int() truncation as a per-row loop."""
+    t = np.arange(h, dtype=np.float64)[:, None] / max(1, h - 1)
+    a = np.asarray(c1[:3], dtype=np.float64)
+    b = np.asarray(c2[:3], dtype=np.float64)
+    return lerp(a, b, t).astype(np.uint8)  # non-negative, so astype truncates exactly like int()
+
+def over_black(rgba: Tuple[int, ...]) -> Tuple[int, ...]:
+    """`rgba` alpha-composited onto opaque black, using Pillow's own rounding."""
+    px = Image.new("RGBA", (1, 1), (0, 0, 0, 255))
+    px.alpha_composite(Image.new("RGBA", (1, 1), tuple(rgba)))
+    return px.getpixel((0, 0))
+
+def background_array(w: int, h: int, theme: Dict) -> "np.ndarray":
+    """Gradient + grid composited over opaque black as one (h, w, 4) RGBA array.
+
+    Pixel-identical (tolerance 0) to drawing the gradient row by row and the grid line by line
+    into a transparent layer and alpha-compositing it onto a black canvas: gradient rows are
+    opaque, so compositing leaves them unchanged, and grid pixels replace the gradient in that
+    layer, so they composite onto black rather than onto the gradient.
+    """
+    rows = np.empty((h, 4), dtype=np.uint8)
+    rows[:, :3] = gradient_rows(theme["bg1"], theme["bg2"], h)
+    rows[:, 3] = 255
+    # Work on packed uint32 pixels: one contiguous broadcast instead of a strided 3-channel fill.
+    px = np.empty((h, w), dtype=np.uint32)
+    px[:] = rows.view(np.uint32)
+    grid = np.asarray(over_black(theme["grid"]), dtype=np.uint8).view(np.uint32)[0]
+    px[:, ::int(w / 16)] = grid
+    px[::int(h / 12), :] = grid
+    return px.view(np.uint8).reshape(h, w, 4)
+
+@functools.lru_cache(maxsize=BACKGROUND_CACHE_SIZE)
+def cached_background(theme_key: str, w: int, h: int) -> "np.ndarray":
+    arr = background_array(w, h, THEMES[theme_key])
+    arr.flags.writeable = False  # shared by every render of this (theme, size)
+    return arr
+
+def canvas_image(arr: "np.ndarray") -> Image.Image:
+    """RGBA image over an (h, w, 4) array, e.g. a cached background."""
+    # frombuffer maps the array without copying (RGBA is a Pillow map mode); Pillow makes its own
+    # writable copy on the first draw, so cached pixels are never modified.
+    return Image.frombuffer("RGBA", (arr.shape[1], arr.shape[0]), arr, "raw", "RGBA", 0, 1)
+
+CACHES = {"font": load_font, "background": cached_background}
+
+def cache_counters() -> Dict[str, List[int]]:
+    """[hits, misses] per render cache in this process."""
+    return {k: [fn.cache_info().hits, fn.cache_info().misses] for k, fn in CACHES.items()}
+
+def counters_delta(before: Dict[str, List[int]], after: Dict[str, List[int]]) -> Dict[str, List[int]]:
+    return {k: [a - b for a, b in zip(after[k], before[k])] for k in after}
 
 def synth_series(rng: random.Random, n: int, h: int, bull_bias=0.0) -> List[float]:
     """OU-like synthetic series for a subtle background trend."""
@@ -157,7 +271,7 @@ def draw_line_series(d: ImageDraw.ImageDraw, series: List[float], w: int, color,
         x2 = int(i * w / (n - 1))
         d.line([(x1, series[i - 1]), (x2, series[i])], fill=color, width=width)
 
-def draw_candles(d: ImageDraw.ImageDraw, rng: random.Random, series: List[float], w: int, theme: Dict):
+def draw_candles(d: ImageDraw.ImageDraw, rng: random.Random, series: List[float], w: int, theme: Dict, scale: float = 1.0):
     n = len(series)
     cw = max(2, int(w / (n * 1.2)))
     last = series[0]
@@ -169,54 +283,266 @@ def draw_candles(d: ImageDraw.ImageDraw, rng: random.Random, series: List[float]
         up = change >= 0
         col = theme["candle_up"] if up else theme["candle_dn"]
         # wick
-        wick_top = y - abs(change) * 1.2 - rng.uniform(2, 5)
-        wick_bot = y + abs(change) * 1.2 + rng.uniform(2, 5)
-        d.line([(x, wick_top), (x, wick_bot)], fill=(*col[:3], 200), width=1)
+        wick_top = y - abs(change) * 1.2 - rng.uniform(2, 5) * scale
+        wick_bot = y + abs(change) * 1.2 + rng.uniform(2, 5) * scale
+        d.line([(x, wick_top), (x, wick_bot)], fill=(*col[:3], 200), width=max(1, int(scale)))
         # body rect
         body_top = min(y, y - change * 0.8)
         body_bot = max(y, y - change * 0.8)
         d.rectangle([x - cw // 2, body_top, x + cw // 2, body_bot], fill=(*col[:3], 220), outline=None)
 
-def glow_line(base: Image.Image, pts: List[Tuple[int, int]], color: Tuple[int, int, int], width: int):
-    glow = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    g = ImageDraw.Draw(glow)
-    g.line(pts, fill=(*color, 255), width=width)
-    for r in (8, 4, 2):
-        blur = glow.filter(ImageFilter.GaussianBlur(radius=r))
-        base.alpha_composite(Image.new("RGBA", base.size, (0, 0, 0, 0)), (0, 0), blur)
-        base.alpha_composite(blur)
-    base.alpha_composite(glow)
-
-def draw_overlay(img: Image.Image, overlay: List[dict], theme: Dict):
+OU_THETA, OU_SIGMA = 0.1, 0.22
+OU_BLOCK = 64  # keeps (1 - theta)^-k well inside float64 range within a block
+
+def synth_series_np(gen: "np.random.Generator", n: int, h: int, bull_bias=0.0) -> "np.ndarray":
+    """synth_series for --rng fast: all innovations in one draw, the OU recursion solved in closed form.
+
+    x[t] = a*x[t-1] + u[t] with a = 1 - theta, u = theta*mu + sigma*eps, so within a block
+    x[s+k] = a^(k+1)*x[s-1] + a^k * cumsum(u / a^j)[k].
+    """
+    a = 1.0 - OU_THETA
+    u = OU_THETA * bull_bias + OU_SIGMA * gen.standard_normal(n)
+    x = np.empty(n)
+    carry = 0.0
+    for s in range(0, n, OU_BLOCK):
+        blk = u[s:s + OU_BLOCK]
+        p = a ** np.arange(len(blk))
+        x[s:s + len(blk)] = p * (a * carry) + p * np.cumsum(blk / p)
+        carry = x[s + len(blk) - 1]
+    mn, mx = x.min(), x.max()
+    eps = 1e-6 if mx - mn == 0 else (mx - mn)
+    return (0.15 + 0.7 * (x - mn) / eps) * h
+
+def draw_candles_np(canvas: "np.ndarray", series: "np.ndarray", jitter: "np.ndarray", theme: Dict, scale: float = 1.0):
+    """Array rasterizer for --rng fast: every wick and body painted into `canvas` (h, w, 4) in place.
+
+    Each primitive is a set of one-pixel-wide column spans. A covered pixel takes the colour of
+    the last primitive over it in draw_candles order (wick i, body i, wick i+1, ...), so each
+    covered pixel is written once and uncovered pixels are never touched.
+    """
+    h, w = canvas.shape[:2]
+    n = len(series)
+    y = np.asarray(series, dtype=np.float64)
+    xs = (np.arange(n) * w / (n - 1)).astype(np.int64)
+    change = np.diff(y, prepend=y[0])
+    reach = np.abs(change) * 1.2
+    cw = max(2, int(w / (n * 1.2)))
+    ww = max(1, int(scale))
+
+    # One row per candle, raveled in draw order: ww wick columns, then cw + 1 body columns.
+    # Column offsets and floor()ed rows reproduce ImageDraw's line/rectangle coverage.
+    offs = np.concatenate([np.arange(ww) - (ww - 1) // 2, np.arange(-(cw // 2), cw // 2 + 1)])
+    is_body = np.arange(len(offs)) >= ww
+    top = np.where(is_body, np.minimum(y, y - change * 0.8)[:, None], (y - reach - jitter[:, 0] * scale)[:, None])
+    bot = np.where(is_body, np.maximum(y, y - change * 0.8)[:, None], (y + reach + jitter[:, 1] * scale)[:, None])
+    cols = (xs[:, None] + offs).ravel()
+    top = np.clip(np.floor(top).astype(np.int64).ravel(), 0, h - 1)
+    bot = np.clip(np.floor(bot).astype(np.int64).ravel(), -1, h - 1)
+    code = (2 * np.arange(n)[:, None] + is_body).astype(np.int16).ravel()  # 2i wick, 2i+1 body
+    keep = (cols >= 0) & (cols < w)
+    cols, top, bot, code = cols[keep], top[keep], bot[keep], code[keep]
+
+    # Expand spans to flat pixel indices within the rows the candles reach; consecutive rows
+    # of a span are w apart.
+    y0 = int(top.min())
+    lengths = np.maximum(bot - top + 1, 0)
+    first = np.cumsum(lengths) - lengths
+    idx = np.repeat((top - y0 - first) * w + cols, lengths) + np.arange(lengths.sum()) * w
+    code = np.repeat(code, lengths)
+    owner = np.full((int(bot.max()) + 1 - y0) * w, -1, dtype=np.int16)
+    np.maximum.at(owner, idx, code)  # codes grow in draw order, so max == last drawn
+    win = owner[idx] == code  # a primitive covers each pixel at most once: one winner per pixel
+    px, who = idx[win] + y0 * w, code[win]
+
+    # ImageDraw on an RGBA image writes fill values as-is (no blending), so the winner's RGBA
+    # simply replaces the pixel, exactly as the last draw_candles primitive would.
+    lut = np.empty((2 * n, 4), dtype=np.uint8)
+    lut[:, :3] = np.where(np.repeat(change >= 0, 2)[:, None],
+                          np.asarray(theme["candle_up"][:3], dtype=np.uint8),
+                          np.asarray(theme["candle_dn"][:3], dtype=np.uint8))
+    lut[0::2, 3] = 200
+    lut[1::2, 3] = 220
+    canvas.reshape(-1, 4).view(np.uint32)[px, 0] = lut.view(np.uint32)[who, 0]  # packed pixels: one word each
+
+GLOW_RADII = (8, 4, 2)  # mdpi px, outermost halo first
+GLOW_MIN_LEVEL_RADIUS = 2.0  # blur radius (px) a reduced pyramid level must still have
+
+Stroke = Tuple[List[Tuple[int, int]], int]  # (points, width) in canvas px
+
+def glow_masks(mask: Image.Image, radii: List[float]) -> Tuple[List[Image.Image], int]:
+    """Blurred copies of an 'L' stroke mask, one per radius, plus the pixel count blurred.
+
+    Wide radii are blurred on a 2x-reduced pyramid of the mask and upsampled; the pyramid is
+    built once and shared by every radius, and a level is only used while the radius on it
+    stays >= GLOW_MIN_LEVEL_RADIUS. This is an approximation: halo masks differ from a full
+    blur by up to 4/255 at mdpi and 21/255 at xxxhdpi. --glow batched only.
+    """
+    pyramid = [mask]
+    out, blurred = [], 0
+    for r in radii:
+        level = 0
+        while r / 2 ** (level + 1) >= GLOW_MIN_LEVEL_RADIUS and min(pyramid[-1].size) >= 4:
+            level += 1
+            if level == len(pyramid):
+                pyramid.append(pyramid[-1].reduce(2))
+        src = pyramid[level]
+        halo = src.filter(ImageFilter.GaussianBlur(radius=r / 2 ** level))
+        blurred += src.width * src.height
+        out.append(halo.resize(mask.size, Image.BILINEAR) if level else halo)
+    return out, blurred
+
+@functools.lru_cache(maxsize=None)
+def scaled_table(c: int) -> List[int]:
+    return [c * a // 255 for a in range(256)]
+
+def tint(mask: Image.Image, color: Tuple[int, int, int]) -> Image.Image:
+    """RGBA layer of `color` with `mask` as alpha and colour scaled by alpha, which is what
+    blurring an opaque-on-transparent RGBA layer channel by channel yields."""
+    bands = [mask.point(scaled_table(c)) for c in color]
+    return Image.merge("RGBA", (*bands, mask))
+
+def apply_glow(base: Image.Image, xy: Tuple[int, int], halos: List[Image.Image], mask: Image.Image,
+               color: Tuple[int, int, int]) -> None:
+    """Composite tinted halos, then the stroke itself, onto `base` at `xy`."""
+    for halo in halos:
+        base.alpha_composite(tint(halo, color), xy)
+    stroke = Image.new("RGBA", mask.size, (*color, 255))
+    stroke.putalpha(mask)
+    base.alpha_composite(stroke, xy)
+
+def stroke_mask(base: Image.Image, strokes: List[Stroke], radii: List[float]
+                ) -> Optional[Tuple[Tuple[int, int], Image.Image]]:
+    """((x0, y0), 'L' mask of the strokes) over their padded bounding box, clipped to `base`.
+
+    The pad covers the full support of Pillow's 3-pass box approximation of GaussianBlur, so
+    every halo pixel that a full-canvas blur would produce is inside the box.
+    """
+    pad = max(w for _, w in strokes) + 3 * (math.ceil(max(radii)) + 1) + 1
+    xs = [x for pts, _ in strokes for x, _ in pts]
+    ys = [y for pts, _ in strokes for _, y in pts]
+    x0, y0 = max(0, min(xs) - pad), max(0, min(ys) - pad)
+    x1, y1 = min(base.width, max(xs) + pad + 1), min(base.height, max(ys) + pad + 1)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    mask = Image.new("L", (x1 - x0, y1 - y0), 0)
+    g = ImageDraw.Draw(mask)
+    for pts, width in strokes:
+        g.line([(x - x0, y - y0) for x, y in pts], fill=255, width=width)
+    return (x0, y0), mask
+
+def apply_line_glow(base: Image.Image, xy: Tuple[int, int], mask: Image.Image, color: Tuple[int, int, int],
+                    radii: List[float]) -> None:
+    """The former full-canvas glow of one line, on its box: RGBA blurs of the solid stroke, then the stroke."""
+    layer = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+    layer.paste((*color, 255), mask=mask)  # the line's pixels, as ImageDraw.line on an RGBA layer sets them
+    for r in radii:
+        base.alpha_composite(layer.filter(ImageFilter.GaussianBlur(radius=r)), xy)
+    base.alpha_composite(layer, xy)
+
+def glow_line(base: Image.Image, stroke: Stroke, color: Tuple[int, int, int], scale: float = 1.0,
+              record: Optional[List[tuple]] = None) -> int:
+    """--glow exact: one line's halos, pixel-identical to blurring a full-canvas layer.
+
+    Only the line's padded bounding box is blurred (RGBA, so colour rounding matches too) and
+    composited. Returns the number of pixels touched; with `record` the glow is appended as a
+    scene layer instead (see record_scene).
+    """
+    radii = [r * scale for r in GLOW_RADII]
+    boxed = stroke_mask(base, [stroke], radii)
+    if boxed is None:
+        return 0
+    xy, mask = boxed
+    if record is not None:
+        record_layer(record, base, ("line", xy, radii, mask, color))
+    else:
+        apply_line_glow(base, xy, mask, color, radii)
+    return mask.width * mask.height * (2 * len(radii) + 1)
+
+def glow_strokes(base: Image.Image, strokes: List[Stroke], color: Tuple[int, int, int], scale: float = 1.0,
+                 record: Optional[List[tuple]] = None) -> int:
+    """--glow batched: draw all strokes into one glow mask and composite its blurred halos onto `base`.
+
+    Only the padded bounding box of the strokes is allocated, blurred and composited. The glow
+    is one colour, so the halos are blurred as a single-channel mask and tinted afterwards
+    instead of blurring RGBA (within 2/255 of an RGBA blur). Overlapping strokes share one
+    union halo instead of stacking one per line. Returns the number of pixels the blur and
+    composite passes touched. With `record` the glow is appended as a scene layer instead of
+    being composited (see record_scene).
+    """
+    if not strokes:
+        return 0
+    radii = [r * scale for r in GLOW_RADII]
+    boxed = stroke_mask(base, strokes, radii)
+    if boxed is None:
+        return 0
+    (x0, y0), mask = boxed
+    halos, blurred = glow_masks(mask, radii)
+    if record is not None:
+        record_layer(record, base, ("glow", (x0, y0), halos, mask, color))
+    else:
+        apply_glow(base, (x0, y0), halos, mask, color)
+    return blurred + mask.width * mask.height * (len(halos) + 1)
+
+def draw_overlay(img: Image.Image, overlay: List[dict], theme: Dict, scale: float = 1.0,
+                 record: Optional[List[tuple]] = None, glow: str = "exact") -> int:
+    """Overlay coordinates, widths and offsets are mdpi px; `scale` maps them to the canvas density.
+
+    Items are drawn in order, each line and channel rail with its own glow; with glow="batched"
+    the glowing strokes are collected into one glow layer composited on top of the polygons
+    instead. Returns the glow pixel count.
+    """
     d = ImageDraw.Draw(img, "RGBA")
+    strokes: List[Stroke] = []
+    glow_px = 0
     for item in overlay:
         t = item.get("type", "line")
-        width = int(item.get("width", 3))
+        width = max(1, int(item.get("width", 3) * scale))
         color = theme["accent"]
         if t == "line":
-            pts = [(int(x), int(y)) for x, y in item["pts"]]
-            glow_line(img, pts, color, width)
+            pts = [(int(x * scale), int(y * scale)) for x, y in item["pts"]]
+            strokes.append((pts, width))
+            if glow == "exact":
+                glow_px += glow_line(img, strokes.pop(), color, scale, record)
         elif t == "channel":
             p1, p2 = item["pts"]
-            p1, p2 = (int(p1[0]), int(p1[1])), (int(p2[0]), int(p2[1]))
+            p1, p2 = (int(p1[0] * scale), int(p1[1] * scale)), (int(p2[0] * scale), int(p2[1] * scale))
             # draw two parallel lines
             dx, dy = p2[0] - p1[0], p2[1] - p1[1]
             nx, ny = -dy, dx
             norm = math.hypot(nx, ny) or 1.0
             nx, ny = nx / norm, ny / norm
-            offset = item.get("offset", 8)
+            offset = item.get("offset", 8) * scale
             p1a = (int(p1[0] + nx * offset), int(p1[1] + ny * offset))
             p2a = (int(p2[0] + nx * offset), int(p2[1] + ny * offset))
             p1b = (int(p1[0] - nx * offset), int(p1[1] - ny * offset))
             p2b = (int(p2[0] - nx * offset), int(p2[1] - ny * offset))
-            glow_line(img, [p1a, p2a], color, width)
-            glow_line(img, [p1b, p2b], color, width)
+            strokes.append(([p1a, p2a], width))
+            strokes.append(([p1b, p2b], width))
+            if glow == "exact":
+                glow_px += sum(glow_line(img, stroke, color, scale, record) for stroke in strokes)
+                strokes.clear()
         elif t == "polygon":
-            pts = [(int(x), int(y)) for x, y in item["pts"]]
+            pts = [(int(x * scale), int(y * scale)) for x, y in item["pts"]]
             d.polygon(pts, outline=(*theme["accent"], 220), fill=(theme["accent"][0], theme["accent"][1], theme["accent"][2], 40))
         # more types can be added here
+    return glow_px + glow_strokes(img, strokes, theme["accent"], scale, record)
+
+def draw_text(img: Image.Image, xy: Tuple[float, float], text: str, font: ImageFont.FreeTypeFont,
+              color: Tuple[int, ...], record: Optional[List[tuple]] = None) -> None:
+    if record is None:
+        ImageDraw.Draw(img, "RGBA").text(xy, text, fill=color, font=font)
+        return
+    # Coverage of the same text call; ImageDraw.bitmap() applies it exactly as text() would.
+    # xy is kept as is (glyph rasterization depends on its fractional part); the mask only
+    # extends to the text's bottom-right corner, plus a margin for antialiasing.
+    right, bottom = ImageDraw.Draw(img).textbbox(xy, text, font=font)[2:]
+    mask = Image.new("L", (min(img.width, math.ceil(right) + 2), min(img.height, math.ceil(bottom) + 2)), 0)
+    ImageDraw.Draw(mask).text(xy, text, fill=255, font=font)
+    box = mask.getbbox()
+    if box:
+        record_layer(record, img, ("text", box[:2], mask.crop(box), color))
 
-def badge(img: Image.Image, label: str, confidence: float, theme: Dict):
+def badge(img: Image.Image, label: str, confidence: float, theme: Dict, record: Optional[List[tuple]] = None):
     d = ImageDraw.Draw(img, "RGBA")
     w, h = img.size
     pad = int(min(w, h) * 0.04)
@@ -224,62 +550,277 @@ def badge(img: Image.Image, label: str, confidence: float, theme: Dict):
     rect = [pad, h - pad - r*2, pad + r*5, h - pad]
     # shadow
     d.rounded_rectangle([rect[0]+2, rect[1]+2, rect[2]+2, rect[3]+2], radius=r, fill=theme["shadow"])
-    d.rounded_rectangle(rect, radius=r, outline=None, fill=(20, 48, 70, 200))
+    d.rounded_rectangle(rect, radius=r, outline=None, fill=theme.get("badge", BADGE_FILL))
     font1 = pick_font(int(r*0.8))
     font2 = pick_font(int(r*0.9))
-    d.text((rect[0] + r*0.6, rect[1] + r*0.35), label, fill=theme["text"], font=font1)
+    draw_text(img, (rect[0] + r*0.6, rect[1] + r*0.35), label, font1, theme["text"], record)
     conf_txt = f"{int(confidence*100)}% conf."
-    d.text((rect[0] + r*0.6, rect[1] + r*1.15), conf_txt, fill=theme["accent"], font=font2)
+    draw_text(img, (rect[0] + r*0.6, rect[1] + r*1.15), conf_txt, font2, theme["accent"], record)
+
+def render_one(name: str, spec: dict, dpi_scale: float, theme_key: str, stats: Optional[Dict[str, int]] = None,
+               rng_mode: str = "compat", glow: str = "exact") -> Image.Image:
+    """Render one drawable; per-image counters (e.g. glow_px) and stage timings are written into
+    `stats` if given."""
+    w, h = canvas_size(dpi_scale)
+    with asset_profile.stage(stats, "background"):
+        background = cached_background(theme_key, w, h)
+    img = draw_scene(name, spec, dpi_scale, THEMES[theme_key], background, stats, rng_mode, glow=glow)
+    with asset_profile.stage(stats, "convert"):
+        return img.convert("RGB")  # Android drawables are RGB
 
-def render_one(name: str, spec: dict, dpi_scale: float, out_file: str, theme_key: str):
-    theme = THEMES.get(theme_key, THEMES["neon"])
+def scene_series(name: str, n: int, h: int, rng_mode: str = "compat"):
+    """Seeded series for a canvas `h` px tall, plus the generator the candle jitter is drawn from
+    next (random.Random for compat, numpy Generator for fast)."""
+    # introduce small bull bias for bullish-named patterns
+    bias = 0.15 if ("bull" in name or "ascending" in name or "cup" in name) else (-0.05 if "bear" in name or "descending" in name else 0.0)
+    if rng_mode == "fast":
+        gen = np.random.default_rng(stable_seed(name))
+        return synth_series_np(gen, n, h=int(h*0.76), bull_bias=bias) + h*0.12, gen  # center
     rng = random.Random(stable_seed(name))
+    series = synth_series(rng, n, h=int(h*0.76), bull_bias=bias)
+    return [y + h*0.12 for y in series], rng  # center
 
-    w, h = int(BASE_W * dpi_scale), int(BASE_H * dpi_scale)
-    img = Image.new("RGBA", (w, h), (0, 0, 0, 255))
-    draw_background(img, theme)
+def draw_scene(name: str, spec: dict, dpi_scale: float, theme: Dict, background: "np.ndarray",
+               stats: Optional[Dict[str, int]] = None, rng_mode: str = "compat",
+               record: Optional[List[tuple]] = None, glow: str = "exact") -> Image.Image:
+    """Series, overlay and badge drawn over `background` (h, w, 4); returns the RGBA canvas."""
+    h, w = background.shape[:2]
 
     # series
     render = spec.get("render", {})
     n = int(render.get("series_points", 120))
     style = render.get("series_style", "candles")
-    # introduce small bull bias for bullish-named patterns
-    bias = 0.15 if ("bull" in name or "ascending" in name or "cup" in name) else (-0.05 if "bear" in name or "descending" in name else 0.0)
-    series = synth_series(rng, n, h=int(h*0.76), bull_bias=bias)
-    series = [y + h*0.12 for y in series]  # center
-    d = ImageDraw.Draw(img, "RGBA")
-    if style == "line":
-        draw_line_series(d, series, w, color=(*THEMES[theme_key]["accent"], 180), width=max(2, int(2*dpi_scale)))
-    else:
-        draw_candles(d, rng, series, w, THEMES[theme_key])
+    with asset_profile.stage(stats, "series"):
+        series, rng = scene_series(name, n, h, rng_mode)
+    with asset_profile.stage(stats, "candles"):
+        if style == "line":
+            img = canvas_image(background)
+            draw_line_series(ImageDraw.Draw(img, "RGBA"), list(series), w,
+                             color=(*theme["accent"], 180), width=max(2, int(2*dpi_scale)))
+        elif rng_mode == "fast":
+            canvas = background.copy()  # candles are painted straight into the array
+            draw_candles_np(canvas, series, rng.uniform(2, 5, size=(n, 2)), theme, dpi_scale)
+            img = canvas_image(canvas)
+        else:
+            img = canvas_image(background)
+            draw_candles(ImageDraw.Draw(img, "RGBA"), rng, series, w, theme, dpi_scale)
 
     # overlay
     overlay = render.get("overlay", [])
-    draw_overlay(img, overlay, THEMES[theme_key])
+    with asset_profile.stage(stats, "overlay"):
+        glow_px = draw_overlay(img, overlay, theme, dpi_scale, record, glow)
+    if stats is not None:
+        stats["glow_px"] = glow_px
 
     # badge
     conf = float(render.get("confidence", 0.85))
-    badge(img, render.get("label", name.replace("_", " ").title()), conf, THEMES[theme_key])
+    with asset_profile.stage(stats, "badge"):
+        badge(img, render.get("label", name.replace("_", " ").title()), conf, theme, record)
+    return img
+
+# ---------- Palette mode ----------
+
+# Theme colours used as solid fills. record_scene draws the scene once with each of them
+# replaced by a label colour (id, 0, 0); colorize() then maps labels to any theme's colours.
+PALETTE_KEYS = ("candle_up", "candle_dn", "accent", "shadow", "badge", "text")
+LABEL_THEME = {k: (i + 1, 0, 0) for i, k in enumerate(PALETTE_KEYS)}
+
+# A scene is {"size": (w, h), "layers": [...]}, replayed in order by colorize():
+#   ("fills", px, inverse, keys)           solid fills: flat pixel indices, and per pixel an index
+#                                          into keys = label id * 256 + drawn alpha
+#   ("line", (x0, y0), radii, mask, label)  one line's stroke mask from glow_line, blurred per theme
+#   ("glow", (x0, y0), halos, mask, label)  blurred stroke layers from glow_strokes
+#   ("text", (x0, y0), mask, label)         glyph coverage from draw_text
+
+def record_layer(record: List[tuple], img: Image.Image, layer: Optional[tuple]) -> None:
+    """Append the fills drawn into `img` since the previous layer, then `layer` itself.
+
+    `img` is cleared afterwards, so each "fills" layer only holds what was drawn over the layer
+    before it, which is what keeps the replay order (fills, glow, fills, text) exact.
+    """
+    box = img.getbbox()  # every label fill has non-zero alpha; untouched pixels are (0, 0, 0, 0)
+    if box:
+        ids = np.asarray(img.getchannel("R")).reshape(-1)
+        rows = slice(box[1] * img.width, box[3] * img.width)  # full rows: one contiguous scan
+        px = np.flatnonzero(ids[rows]) + rows.start  # label ids start at 1
+        codes = ids[px].astype(np.int32) * 256 + np.asarray(img.getchannel("A")).reshape(-1)[px]
+        keys = np.flatnonzero(np.bincount(codes))  # a handful of (label, alpha) pairs
+        index = np.zeros(keys[-1] + 1, dtype=np.uint8)
+        index[keys] = np.arange(len(keys))
+        inverse = index[codes]
+        record.append(("fills", px, inverse, keys))
+        img.paste((0, 0, 0, 0), box)
+    if layer is not None:
+        record.append(layer)
+
+def record_scene(name: str, spec: dict, dpi_scale: float, stats: Optional[Dict[str, int]] = None,
+                 rng_mode: str = "compat", glow: str = "exact") -> dict:
+    """Draw the theme-independent geometry of one drawable once, as a replayable scene."""
+    w, h = canvas_size(dpi_scale)
+    layers: List[tuple] = []
+    img = draw_scene(name, spec, dpi_scale, LABEL_THEME, np.zeros((h, w, 4), dtype=np.uint8), stats, rng_mode,
+                     layers, glow)
+    with asset_profile.stage(stats, "record"):
+        record_layer(layers, img, None)
+    return {"size": (w, h), "layers": layers}
+
+def palette_color(theme: Dict, label: Tuple[int, ...]) -> Tuple[int, ...]:
+    key = PALETTE_KEYS[label[0] - 1]
+    return theme.get(key, BADGE_FILL) if key == "badge" else theme[key]
 
-    img = img.convert("RGB")  # Android drawables are RGB
-    ensure_dir(os.path.dirname(out_file))
-    img.save(out_file, format="PNG", optimize=True)
-    print(f"[generate_patterns] wrote {out_file}")
+def colorize(scene: dict, theme_key: str) -> Image.Image:
+    """Replay a recorded scene over the theme's background; pixel-identical to render_one."""
+    theme = THEMES[theme_key]
+    w, h = scene["size"]
+    canvas = cached_background(theme_key, w, h).copy()
+    flat = canvas.reshape(-1, 4).view(np.uint32)[:, 0]
+    for layer in scene["layers"]:
+        if layer[0] == "fills":
+            _, px, inverse, keys = layer
+            lut = np.empty((len(keys), 4), dtype=np.uint8)
+            for i, code in enumerate(keys.tolist()):
+                color = palette_color(theme, (code // 256,))
+                lut[i] = (*color[:3], color[3] if len(color) == 4 else code % 256)  # themed alpha wins
+            flat[px] = lut.view(np.uint32)[inverse, 0]
+            continue
+        # Glow and text only touch their box, so only that region goes through Pillow.
+        (x0, y0), mask = layer[1], layer[-2]
+        region = canvas[y0:y0 + mask.height, x0:x0 + mask.width]
+        box = Image.fromarray(region)
+        color = palette_color(theme, layer[-1])
+        if layer[0] == "line":  # an RGBA blur of the theme's colour: exact, so it can't be shared
+            apply_line_glow(box, (0, 0), mask, color, layer[2])
+        elif layer[0] == "glow":
+            apply_glow(box, (0, 0), layer[2], mask, color)
+        else:
+            ImageDraw.Draw(box, "RGBA").bitmap((0, 0), mask, fill=color)
+        region[...] = np.asarray(box)
+    return canvas_image(canvas).convert("RGB")
 
-def load_templates(dir_path: str) -> Dict[str, dict]:
-    mapping = {}
+# ---------- Density pipeline ----------
+
+def downsample_set(master: Image.Image, targets: List[str]) -> Dict[str, Image.Image]:
+    """Derive every density in `targets` from one master render (the largest density).
+
+    Each target is reduced from the largest image already produced whose size is an exact
+    integer multiple (box filter via Image.reduce, e.g. xxxhdpi→xhdpi→mdpi, xxhdpi→hdpi);
+    anything else is resampled from the master with Lanczos (xxxhdpi→xxhdpi).
+    """
+    out: Dict[str, Image.Image] = {}
+    made = [master]
+    for dens in sorted(targets, key=DENSITIES.get, reverse=True):
+        tw, th = canvas_size(DENSITIES[dens])
+        if (tw, th) == master.size:
+            out[dens] = master
+            continue
+        src = next((im for im in made
+                    if im.width % tw == 0 and im.height % th == 0 and im.width // tw == im.height // th), None)
+        if src is not None:
+            img = src.reduce(src.width // tw)
+        else:
+            img = master.resize((tw, th), Image.LANCZOS)
+        out[dens] = img
+        made.append(img)
+        made.sort(key=lambda im: im.width, reverse=True)
+    return out
+
+def render_themes(name: str, spec: dict, density: str, themes: List[str], opts: dict,
+                  stats: Optional[Dict[str, int]] = None) -> Dict[str, Image.Image]:
+    """One image per theme at one density; --palette draws the geometry once and colorizes it per theme."""
+    rng_mode, glow = opts.get("rng", "compat"), opts.get("glow", "exact")
+    if opts.get("palette"):
+        scene = record_scene(name, spec, DENSITIES[density], stats, rng_mode, glow)
+        with asset_profile.stage(stats, "colorize"):
+            return {t: colorize(scene, t) for t in themes}
+    return {t: render_one(name, spec, DENSITIES[density], t, stats, rng_mode, glow) for t in themes}
+
+def render_densities(name: str, spec: dict, densities: List[str], themes: List[str], opts: dict,
+                     stats: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Dict[str, Image.Image]]:
+    """{theme: {density: image}}; `stats` collects render counters keyed by each density actually drawn.
+
+    opts: {"downsample": bool, "rng": one of RNG_MODES, "glow": one of GLOW_MODES, "palette": bool,
+    "themes": all themes of the run}
+    """
+    stats = {} if stats is None else stats
+    if not opts.get("downsample"):
+        per_density = {dens: render_themes(name, spec, dens, themes, opts, stats.setdefault(dens, {}))
+                       for dens in densities}
+        return {t: {dens: per_density[dens][t] for dens in densities} for t in themes}
+    top = max(densities, key=DENSITIES.get)
+    masters = render_themes(name, spec, top, themes, opts, stats.setdefault(top, {}))
+    with asset_profile.stage(stats[top], "downsample"):
+        return {t: downsample_set(masters[t], densities) for t in themes}
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    hist = ImageChops.difference(a, b).histogram()
+    # histogram() of an RGB diff is 3×256 bins; fold them into one squared-error sum.
+    sq = sum(count * (i % 256) ** 2 for i, count in enumerate(hist))
+    mse = sq / (a.width * a.height * len(a.getbands()))
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+def verify_downsample(templates: Dict[str, dict], sizes: List[str], themes: List[str], rng_mode: str, min_psnr: float,
+                      glow: str = "exact") -> bool:
+    """Compare resampled drawables against direct renders; returns False if any falls below min_psnr.
+
+    Hairlines (grid, wicks, glyph stems) land on different sub-pixel offsets at each density, which
+    raw PSNR punishes heavily even when the images look the same. The gate is therefore applied
+    after a 1px Gaussian on both sides; raw PSNR is printed alongside for reference.
+    """
+    ok = True
+    soften = ImageFilter.GaussianBlur(radius=1)
+    for name, spec in templates.items():
+        derived = render_densities(name, spec, sizes, themes, {"downsample": True, "rng": rng_mode, "glow": glow})
+        for theme_key in themes:
+            for dens in sizes:
+                direct = render_one(name, spec, DENSITIES[dens], theme_key, rng_mode=rng_mode, glow=glow)
+                raw = psnr(derived[theme_key][dens], direct)
+                soft = psnr(derived[theme_key][dens].filter(soften), direct.filter(soften))
+                flag = "ok" if soft >= min_psnr else "LOW"
+                ok &= soft >= min_psnr
+                print(f"[generate_patterns] verify {name} @ {dens} ({theme_key}): PSNR {soft:.2f} dB (raw {raw:.2f}) {flag}")
+    return ok
+
+def verify_palette(templates: Dict[str, dict], sizes: List[str], themes: List[str], rng_mode: str,
+                   glow: str = "exact") -> bool:
+    """Compare colorized scenes with direct renders; palette mode must be pixel-identical."""
+    ok = True
+    for name, spec in templates.items():
+        for dens in sizes:
+            scene = record_scene(name, spec, DENSITIES[dens], rng_mode=rng_mode, glow=glow)
+            for theme_key in themes:
+                direct = render_one(name, spec, DENSITIES[dens], theme_key, rng_mode=rng_mode, glow=glow)
+                box = ImageChops.difference(colorize(scene, theme_key), direct).getbbox()
+                ok &= box is None
+                print(f"[generate_patterns] palette {name} @ {dens} ({theme_key}): "
+                      + ("identical" if box is None else f"DIFFERS in {box}"))
+    return ok
+
+def load_template(p: pathlib.Path) -> Optional[Tuple[str, dict]]:
+    """(name, spec) of one template file, or None (reported) if it can't be read."""
+    with open(p, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+            return data.get("name") or p.stem, data
+        except Exception as e:
+            print(f"[generate_patterns] bad template {p.name}: {e}", file=sys.stderr)
+            return None
+
+def load_templates(dir_path: str) -> Tuple[Dict[str, dict], Dict[str, str], List[str]]:
+    """({name: spec}, {name: template file}, files that failed to parse)."""
+    mapping: Dict[str, dict] = {}
+    sources: Dict[str, str] = {}
+    bad: List[str] = []
     if not os.path.isdir(dir_path):
         print(f"[generate_patterns] Template dir missing: {dir_path}", file=sys.stderr)
-        return mapping
+        return mapping, sources, bad
     for p in sorted(pathlib.Path(dir_path).glob("*.json")):
-        with open(p, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                name = data.get("name") or p.stem
-                mapping[name] = data
-            except Exception as e:
-                print(f"[generate_patterns] bad template {p.name}: {e}", file=sys.stderr)
-    return mapping
+        loaded = load_template(p)
+        if loaded:
+            mapping[loaded[0]] = loaded[1]
+            sources[loaded[0]] = str(p)
+        else:
+            bad.append(str(p))
+    return mapping, sources, bad
 
 # Minimal fallbacks if no templates exist
 FALLBACKS: Dict[str, dict] = {
@@ -329,12 +870,847 @@ def density_path(res_root: str, density: str) -> str:
     sub = "drawable" if density == "mdpi" else f"drawable-{density}"
     return os.path.join(res_root, sub)
 
+# ---------- Jobs ----------
+
+# (name, spec, densities, themes, res_root, opts) — plain tuples so they pickle cheaply to workers.
+# Direct rendering gets one job per density and theme; --downsample groups all densities of a
+# template in one job, --palette all themes.
+Job = Tuple[str, dict, Tuple[str, ...], Tuple[str, ...], str, dict]
+
+def plan_jobs(templates: Dict[str, dict], sizes: List[str], res_root: str, themes: List[str], opts: dict,
+              dirty: Optional[set] = None) -> List[Job]:
+    """Jobs for every (name, density, theme), or only those in `dirty` when given.
+
+    A --downsample job still covers all densities, since the master is rendered anyway; a
+    --palette job covers all themes, since the scene is recorded anyway.
+    """
+    jobs = []
+    dens_groups = [tuple(sizes)] if opts.get("downsample") else [(dens,) for dens in sizes]
+    theme_groups = [tuple(themes)] if opts.get("palette") else [(t,) for t in themes]
+    for name, spec in templates.items():
+        for dens_group in dens_groups:
+            for theme_group in theme_groups:
+                if dirty is None or any((name, dens, t) in dirty for dens in dens_group for t in theme_group):
+                    jobs.append((name, spec, dens_group, theme_group, res_root, opts))
+    return jobs
+
+def out_path(res_root: str, density: str, name: str, theme_key: str, opts: dict) -> str:
+    """pattern_<name>.<ext> for the first theme of the run, pattern_<name>_<theme>.<ext> for the others."""
+    suffix = "" if theme_key == opts["themes"][0] else f"_{theme_key}"
+    ext = asset_encoders.EXTENSIONS[opts.get("tier", "png")]
+    return os.path.join(density_path(res_root, density), f"pattern_{name}{suffix}{ext}")
+
+def run_job(job: Job) -> Tuple[List[str], Optional[str], dict]:
+    """Render one job; returns (written files, error, stats).
+
+    stats = {"images": {density: render_one counters and stage timings}, "cache": {cache: [hits, misses]},
+    "assets": {path: asset_encoders record}}, the cache part being this job's delta, so totals are
+    correct whichever worker ran it.
+    Never raises, so one bad template can't sink the pool.
+    """
+    name, spec, densities, themes, res_root, opts = job
+    written: List[str] = []
+    images: Dict[str, Dict[str, int]] = {}
+    assets: Dict[str, dict] = {}
+    before = cache_counters()
+    err = None
+    try:
+        for theme_key, per_density in render_densities(name, spec, list(densities), list(themes), opts, images).items():
+            for dens, img in per_density.items():
+                out_file = out_path(res_root, dens, name, theme_key, opts)
+                with asset_profile.stage(images.setdefault(dens, {}), "encode"):
+                    assets[out_file] = asset_encoders.save_asset(img, out_file, opts.get("tier", "png"),
+                                                                 asset_encoders.DRAWABLE_BPP)
+                written.append(out_file)
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+    return written, err, {"images": images, "cache": counters_delta(before, cache_counters()), "assets": assets}
+
+def run_jobs(jobs: List[Job], workers: int):
+    """Yield (job, written, error, stats) in job order, serially or across a process pool."""
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield (job, *run_job(job))
+        return
+    import concurrent.futures  # serial builds and --help don't pay for it
+    chunk = max(1, len(jobs) // (workers * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+        # Executor.map preserves submission order, so output is stable regardless of scheduling.
+        for job, result in zip(jobs, ex.map(run_job, jobs, chunksize=chunk)):
+            yield (job, *result)
+
+# ---------- Manifest ----------
+
+def default_manifest_path(res_root: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(res_root)), MANIFEST_NAME)
+
+@functools.lru_cache(maxsize=1)
+def font_digest() -> str:
+    p = font_path()
+    if p is None:
+        return "pil-default"
+    with open(p, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def input_hash(name: str, spec: dict, density: str, theme_key: str, master: Optional[str], rng_mode: str,
+               tier: str = "png", glow: str = "exact") -> str:
+    """Hash of everything that determines one output's bytes.
+
+    `master` is the density a --downsample output is resampled from (None for direct renders).
+    """
+    key = {
+        "renderer": RENDERER_VERSION,
+        "name": name,
+        "spec": spec,
+        "theme": THEMES[theme_key],
+        "density": [density, DENSITIES[density]],
+        "master": master,
+        "rng": rng_mode,
+        "font": font_digest(),
+        # Only non-default tiers and glow modes are keyed, so existing manifests stay valid.
+        **({"tier": tier} if tier != "png" else {}),
+        **({"glow": glow} if glow != "exact" else {}),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_manifest(path: str) -> Dict[str, dict]:
+    """{output path relative to the manifest: {"template": name, "inputs": hash, "source": template file}}
+
+    "source" is relative to the manifest too, and None for a built-in fallback.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("outputs", {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[generate_patterns] ignoring unreadable manifest {path}: {e}", file=sys.stderr)
+        return {}
+
+def save_manifest(path: str, outputs: Dict[str, dict]) -> None:
+    ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"renderer": RENDERER_VERSION, "outputs": dict(sorted(outputs.items()))}, f, indent=1)
+        f.write("\n")
+    os.replace(tmp, path)
+
+def manifest_entry(name: str, inputs: str, sources: Optional[Dict[str, str]], base: str) -> dict:
+    src = (sources or {}).get(name)
+    return {"template": name, "inputs": inputs,
+            "source": os.path.relpath(os.path.abspath(src), base) if src else None}
+
+def up_to_date(old: Optional[dict], entry: dict) -> bool:
+    """Same template and inputs; "source" doesn't matter (renaming the JSON file changes no pixel)."""
+    return old is not None and old.get("template") == entry["template"] and old.get("inputs") == entry["inputs"]
+
+def removed_outputs(old: Dict[str, dict], sources: Optional[Dict[str, str]], base: str, ext: str = "") -> List[str]:
+    """Manifest keys (ending in `ext`) whose template file was deleted or now defines another name.
+
+    Only ever called with the sources of a run in which every template parsed, so a syntax error
+    or a wrong --templates path can't delete anything; entries without a source are never pruned.
+    """
+    loaded = {os.path.relpath(os.path.abspath(p), base): name for name, p in (sources or {}).items()}
+    gone = []
+    for key, entry in old.items():
+        src = entry.get("source")
+        if not key.endswith(ext) or not src:
+            continue
+        if loaded.get(src, entry.get("template")) != entry.get("template") \
+                or (src not in loaded and not os.path.exists(os.path.join(base, src))):
+            gone.append(key)
+    return gone
+
+# ---------- Build ----------
+
+def plan_outputs(templates: Dict[str, dict], sizes: List[str], res_root: str, themes: List[str], opts: dict,
+                 manifest_path: str, force: bool, sources: Optional[Dict[str, str]] = None, prune: bool = False
+                 ) -> Tuple[Dict[str, dict], Dict[str, dict], set, List[str]]:
+    """(old manifest, expected entry per output, dirty (name, density, theme), stale manifest keys).
+
+    Pure bookkeeping (hashes and stat calls), shared by build() and --dry-run. `sources` maps
+    template names to their files; with `prune`, outputs of deleted template files are stale.
+    """
+    base = os.path.dirname(manifest_path)
+    rel = lambda p: os.path.relpath(os.path.abspath(p), base)
+    old = load_manifest(manifest_path)
+    master = max(sizes, key=DENSITIES.get) if opts.get("downsample") else None
+
+    expected: Dict[str, dict] = {}
+    dirty = set()
+    for name, spec in templates.items():
+        for dens in sizes:
+            for theme_key in themes:
+                out_file = out_path(res_root, dens, name, theme_key, opts)
+                entry = manifest_entry(name, input_hash(name, spec, dens, theme_key, master, opts.get("rng", "compat"),
+                                                        opts.get("tier", "png"), opts.get("glow", "exact")),
+                                       sources, base)
+                expected[rel(out_file)] = entry
+                if force or not up_to_date(old.get(rel(out_file)), entry) or not os.path.exists(out_file):
+                    dirty.add((name, dens, theme_key))
+
+    # Outputs of removed templates, and the same drawable under another tier's extension (Android
+    # rejects pattern_x.png next to pattern_x.webp), are stale.
+    expected_stems = {os.path.splitext(key)[0] for key in expected}
+    removed = set(removed_outputs(old, sources, base)) if prune else set()
+    stale = [key for key in old
+             if (key in removed and key not in expected)
+             or (key not in expected and os.path.splitext(key)[0] in expected_stems)]
+    return old, expected, dirty, stale
+
+def dry_run(templates: Dict[str, dict], sizes: List[str], res_root: str, themes: List[str], opts: dict,
+            manifest_path: str, force: bool, backend: str, sources: Optional[Dict[str, str]] = None,
+            prune: bool = False) -> None:
+    """List what a build would write and remove, without importing or running a renderer."""
+    base = os.path.dirname(manifest_path)
+    rel = lambda p: os.path.relpath(os.path.abspath(p), base)
+    if backend == "vector":
+        old = load_manifest(manifest_path)
+        planned = []
+        for name, spec in templates.items():
+            for theme_key in themes:
+                out_file = vector_path(res_root, name, theme_key, themes)
+                entry = manifest_entry(name, vector_hash(name, spec, theme_key, opts.get("rng", "compat")), sources, base)
+                fresh = not force and up_to_date(old.get(rel(out_file)), entry) and os.path.exists(out_file)
+                planned.append((out_file, "up to date" if fresh else "render"))
+        stale = [k for k in removed_outputs(old, sources, base, ".xml") if prune
+                 and k not in {rel(out_file) for out_file, _ in planned}]
+    else:
+        _, _, dirty, stale = plan_outputs(templates, sizes, res_root, themes, opts, manifest_path, force,
+                                          sources, prune)
+        planned = [(out_path(res_root, dens, name, t, opts), "render" if (name, dens, t) in dirty else "up to date")
+                   for name in templates for dens in sizes for t in themes]
+    for out_file, status in planned:
+        print(f"[generate_patterns] {status:<10} {os.path.normpath(out_file)}")
+    for key in stale:
+        print(f"[generate_patterns] {'remove':<10} {os.path.normpath(os.path.join(base, key))}")
+    todo = sum(status == "render" for _, status in planned)
+    print(f"[generate_patterns] dry run: {todo} to render, {len(planned) - todo} up to date, {len(stale)} to remove")
+
+def build(templates: Dict[str, dict], sizes: List[str], res_root: str, themes: List[str], opts: dict,
+          workers: int, manifest_path: str, force: bool, profile: Optional[List[dict]] = None,
+          sources: Optional[Dict[str, str]] = None, prune: bool = False) -> Tuple[List[tuple], List[dict]]:
+    """Render what is out of date, prune outputs of deleted templates (with `prune`), update the manifest.
+
+    Returns the failed jobs as (name, densities, error) and an asset_encoders record for every
+    expected output, freshly encoded or not. With `profile`, an asset_profile entry per rendered
+    template and density is appended to it.
+    """
+    base = os.path.dirname(manifest_path)
+    rel = lambda p: os.path.relpath(os.path.abspath(p), base)
+    old, expected, dirty, stale_keys = plan_outputs(templates, sizes, res_root, themes, opts, manifest_path, force,
+                                                    sources, prune)
+
+    outputs = dict(old)
+    for key in stale_keys:
+        stale = os.path.join(base, key)
+        if os.path.exists(stale):
+            os.remove(stale)
+            print(f"[generate_patterns] removed {stale}")
+        del outputs[key]
+    for key in expected:
+        for other in asset_encoders.siblings(os.path.join(base, key)):
+            print(f"[generate_patterns] warning: {other} is not in the manifest and clashes with {key}",
+                  file=sys.stderr)
+
+    jobs = plan_jobs(templates, sizes, res_root, themes, opts, dirty)
+    skipped = len(expected) - len(dirty)
+    if skipped:
+        print(f"[generate_patterns] {skipped} outputs up to date")
+
+    failed = []
+    assets: Dict[str, dict] = {}
+    cache_totals = {k: [0, 0] for k in CACHES}
+    for (name, _spec, densities, job_themes, _res, _opts), written, err, stats in run_jobs(jobs, workers):
+        for out_file in written:
+            outputs[rel(out_file)] = expected[rel(out_file)]
+            rec = assets[rel(out_file)] = dict(stats["assets"][out_file], path=rel(out_file))
+            print(f"[generate_patterns] wrote {out_file} ({rec['encoded_bytes'] / 1024:.1f} KB, "
+                  f"decoded {rec['decoded_bytes'] / 1024:.0f} KB, {rec['encode_ms']:.0f} ms)")
+        for dens, st in stats["images"].items():
+            if "glow_px" in st:
+                print(f"[generate_patterns] glow {name} @ {dens}: {st['glow_px']:,} px processed")
+            if profile is not None:
+                profile.append(asset_profile.entry(
+                    "generate_patterns", f"{name}@{dens}", st, template=name, density=dens,
+                    densities=list(densities), themes=list(job_themes), cache=stats["cache"],
+                    outputs=[rel(out_path(res_root, dens, name, t, opts)) for t in job_themes]))
+        for k, (hits, misses) in stats["cache"].items():
+            cache_totals[k][0] += hits
+            cache_totals[k][1] += misses
+        if err:
+            failed.append((name, densities, err))
+            print(f"[generate_patterns] FAILED {name} @ {','.join(densities)} ({','.join(job_themes)}): {err}", file=sys.stderr)
+
+    for key, entry in expected.items():  # refresh "source" of outputs that were up to date
+        if up_to_date(outputs.get(key), entry):
+            outputs[key] = entry
+    save_manifest(manifest_path, outputs)
+    if jobs:
+        print("[generate_patterns] cache " + ", ".join(
+            f"{k}: {hits} hits / {misses} misses" for k, (hits, misses) in cache_totals.items()))
+    for key in expected:
+        if key not in assets and os.path.exists(os.path.join(base, key)):
+            assets[key] = dict(asset_encoders.existing_record(os.path.join(base, key), asset_encoders.DRAWABLE_BPP),
+                               path=key)
+    return failed, [assets[key] for key in sorted(assets)]
+
+# ---------- Atlas ----------
+
+# --atlas renders every drawable into a staging "sprite" tree (always PNG, tracked by the manifest
+# like a normal build), then packs each density/theme into pattern_atlas_<density>[_<theme>]_<page>.<ext>
+# pages of at most --atlas-max-size px a side. Each sprite gets a --atlas-padding px border of its
+# own edge pixels, so bilinear sampling at a rect's edge never picks up the neighbour.
+# Pages go in drawable-nodpi, which Android never rescales: from a density bucket they would be
+# scaled to the device's bucket and the pixel rects would miss. The index lists each density's
+# pages by name, with the sprite rects in that page's pixels and the density's scale (px per dp),
+# so the app picks the density nearest the device's and divides by its scale.
+ATLAS_INDEX_VERSION = 2
+ATLAS_DIR = "drawable-nodpi"
+
+def default_sprite_root(res_root: str) -> str:
+    """app/build/pattern_sprites for the default res root: inside Gradle's build dir, out of the APK."""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(res_root)))),
+                        "build", "pattern_sprites")
+
+def default_atlas_index(res_root: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(res_root)), "assets", "pattern_atlas.json")
+
+def pack_shelves(sizes: Dict[str, Tuple[int, int]], max_size: int, padding: int
+                 ) -> Tuple[List[Tuple[int, int]], Dict[str, Tuple[int, int, int, int, int]]]:
+    """Shelf packing, tallest first: returns page sizes and {name: (page, x, y, w, h)}.
+
+    Every cell is the sprite plus `padding` on each side, so neighbours are 2 * padding apart.
+    """
+    order = sorted(sizes, key=lambda n: (-sizes[n][1], -sizes[n][0], n))
+    pages: List[Tuple[int, int]] = []
+    rects: Dict[str, Tuple[int, int, int, int, int]] = {}
+    x = y = shelf_h = max_size  # forces a new page on the first sprite
+    for name in order:
+        w, h = sizes[name]
+        cw, ch = w + 2 * padding, h + 2 * padding
+        if cw > max_size or ch > max_size:
+            raise ValueError(f"{name} ({w}x{h}) does not fit a {max_size} px atlas with {padding} px padding")
+        if x + cw > max_size:  # next shelf
+            x, y, shelf_h = 0, y + shelf_h, 0
+        if y + ch > max_size:  # next page
+            pages.append((0, 0))
+            x, y, shelf_h = 0, 0, 0
+        rects[name] = (len(pages) - 1, x + padding, y + padding, w, h)
+        x += cw
+        shelf_h = max(shelf_h, ch)
+        pw, ph = pages[-1]
+        pages[-1] = (max(pw, x), max(ph, y + ch))
+    return pages, rects
+
+def compose_page(size: Tuple[int, int], sprites: Dict[str, Image.Image],
+                 rects: Dict[str, Tuple[int, int, int, int, int]], page: int, padding: int) -> Image.Image:
+    canvas = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    for name, (pg, x, y, w, h) in rects.items():
+        if pg == page:
+            arr = np.asarray(sprites[name].convert("RGB"))
+            canvas[y - padding:y + h + padding, x - padding:x + w + padding] = np.pad(
+                arr, ((padding, padding), (padding, padding), (0, 0)), mode="edge")
+    return Image.fromarray(canvas, "RGB")
+
+def atlas_page_path(res_root: str, density: str, theme_key: str, page: int, opts: dict) -> str:
+    suffix = "" if theme_key == opts["themes"][0] else f"_{theme_key}"
+    ext = asset_encoders.EXTENSIONS[opts.get("tier", "png")]
+    return os.path.join(res_root, ATLAS_DIR, f"pattern_atlas_{density}{suffix}_{page}{ext}")
+
+def atlas_pages(res_root: str, index: dict) -> List[str]:
+    """Page files an index written by this or the previous layout (pages in density buckets) refers to."""
+    pages = []
+    for dens, per_theme in index.get("atlases", {}).items():
+        page_dir = os.path.join(res_root, ATLAS_DIR) if index.get("version") == ATLAS_INDEX_VERSION \
+            else density_path(res_root, dens)
+        for entry in per_theme.values():
+            pages += [os.path.join(page_dir, page) for page in entry.get("pages", [])]
+    return pages
+
+def build_atlases(templates: Dict[str, dict], sizes: List[str], themes: List[str], sprite_root: str,
+                  res_root: str, opts: dict, manifest_path: str, index_path: str) -> List[dict]:
+    """Pack the sprite tree into atlas pages under res_root/drawable-nodpi and write the index.
+
+    A density/theme is repacked only when its key (sprite input hashes, layout settings, tier)
+    differs from the previous index or a page is missing. Pages the previous index listed and this
+    one doesn't, and standalone pattern_<name> drawables in res_root, are removed (the latter with
+    their manifest entries). Returns page records for the report.
+    """
+    base = os.path.dirname(manifest_path)
+    rel = lambda p: os.path.relpath(os.path.abspath(p), base)
+    manifest = load_manifest(manifest_path)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            old_index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        old_index = {}
+    old_atlases = old_index.get("atlases", {}) if old_index.get("version") == ATLAS_INDEX_VERSION else {}
+    old_pages = atlas_pages(res_root, old_index)
+
+    max_size, padding, tier = opts["atlas_max_size"], opts["atlas_padding"], opts.get("tier", "png")
+    sprite_opts = dict(opts, tier="png")
+    atlases: Dict[str, Dict[str, dict]] = {}
+    records: List[dict] = []
+    for dens in sizes:
+        for theme_key in themes:
+            sprite_files = {name: out_path(sprite_root, dens, name, theme_key, sprite_opts) for name in sorted(templates)}
+            key = hashlib.sha256(json.dumps({
+                "sprites": {n: manifest.get(rel(p), {}).get("inputs") for n, p in sprite_files.items()},
+                "max_size": max_size, "padding": padding, "tier": tier,
+            }, sort_keys=True).encode("utf-8")).hexdigest()
+            prev = old_atlases.get(dens, {}).get(theme_key)
+            page_files = [os.path.join(res_root, ATLAS_DIR, f) for f in (prev or {}).get("pages", [])]
+            if prev and prev.get("key") == key and all(os.path.exists(f) for f in page_files):
+                entry = prev
+                records += [asset_encoders.existing_record(f, asset_encoders.DRAWABLE_BPP) for f in page_files]
+            else:
+                sprites = {}
+                for name, f in sprite_files.items():
+                    with Image.open(f) as im:
+                        sprites[name] = im.copy()
+                pages, rects = pack_shelves({n: im.size for n, im in sprites.items()}, max_size, padding)
+                names = []
+                for i, size in enumerate(pages):
+                    page_file = atlas_page_path(res_root, dens, theme_key, i, opts)
+                    rec = asset_encoders.save_asset(compose_page(size, sprites, rects, i, padding), page_file,
+                                                    tier, asset_encoders.DRAWABLE_BPP)
+                    records.append(rec)
+                    names.append(os.path.basename(page_file))
+                    print(f"[generate_patterns] wrote {page_file} ({size[0]}x{size[1]}, "
+                          f"{sum(1 for r in rects.values() if r[0] == i)} sprites, {rec['encoded_bytes'] / 1024:.1f} KB)")
+                entry = {"key": key, "scale": DENSITIES[dens], "pages": names,
+                         "sprites": {n: [names[rects[n][0]], *rects[n][1:]] for n in sorted(rects)}}
+            atlases.setdefault(dens, {})[theme_key] = entry
+
+            # The standalone drawables the atlas replaces.
+            for f in (out_path(res_root, dens, n, theme_key, dict(opts, tier=t))
+                      for n in templates for t in ("png", "webp")):
+                if os.path.exists(f):
+                    os.remove(f)
+                    print(f"[generate_patterns] removed {f}")
+                manifest.pop(rel(f), None)
+
+    # Pages a previous, larger or bucketed layout left behind.
+    new_pages = {os.path.join(res_root, ATLAS_DIR, page)
+                 for per_theme in atlases.values() for e in per_theme.values() for page in e["pages"]}
+    for f in old_pages:
+        if f not in new_pages and os.path.exists(f):
+            os.remove(f)
+            print(f"[generate_patterns] removed {f}")
+
+    save_manifest(manifest_path, manifest)
+    ensure_dir(os.path.dirname(index_path))
+    tmp = index_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": ATLAS_INDEX_VERSION, "padding": padding, "max_size": max_size,
+                   "atlases": atlases}, f, separators=(",", ":"), sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, index_path)
+    print(f"[generate_patterns] atlas index {index_path}: "
+          f"{sum(len(e['pages']) for t in atlases.values() for e in t.values())} pages")
+    for rec in records:
+        rec["path"] = rel(rec["path"])
+    return records
+
+def remove_atlases(res_root: str, index_path: str) -> None:
+    """Undo a previous --atlas build: its pages would clash with nothing but still ship in the APK."""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    for page_file in atlas_pages(res_root, index):
+        if os.path.exists(page_file):
+            os.remove(page_file)
+            print(f"[generate_patterns] removed {page_file}")
+    os.remove(index_path)
+    print(f"[generate_patterns] removed {index_path}")
+
+# ---------- Vector backend ----------
+
+# --backend vector writes one density-independent res/drawable/pattern_<name>[_<theme>].xml per
+# pattern instead of five PNG densities: the same scene (seeded series, overlay, badge) as paths
+# in the mdpi viewport, so 1 viewport unit = 1 dp. Glow is approximated by stacked translucent
+# strokes, text by glyph outlines (needs fontTools; without it labels are left out). Paths are
+# batched by paint, so the path count is fixed per scene and inflation cost tracks the node count.
+VECTOR_VERSION = "1"
+VECTOR_EXTENT = 1.0  # each glow stroke reaches this many blur radii past the line edge
+
+def fmt(v: float) -> str:
+    return f"{v:.2f}".rstrip("0").rstrip(".") if v != int(v) else str(int(v))
+
+def hex_color(rgb: Tuple[int, ...]) -> str:
+    return "#{:02X}{:02X}{:02X}".format(*rgb[:3])
+
+def rounded_rect_path(x0: float, y0: float, x1: float, y1: float, r: float) -> List[str]:
+    r = min(r, (x1 - x0) / 2, (y1 - y0) / 2)
+    arc = f"A{fmt(r)},{fmt(r)} 0 0 1 "
+    return [f"M{fmt(x0 + r)},{fmt(y0)}", f"H{fmt(x1 - r)}", f"{arc}{fmt(x1)},{fmt(y0 + r)}", f"V{fmt(y1 - r)}",
+            f"{arc}{fmt(x1 - r)},{fmt(y1)}", f"H{fmt(x0 + r)}", f"{arc}{fmt(x0)},{fmt(y1 - r)}", f"V{fmt(y0 + r)}",
+            f"{arc}{fmt(x0 + r)},{fmt(y0)}", "Z"]
+
+def polyline_path(pts: List[Tuple[float, float]]) -> List[str]:
+    return [("M" if i == 0 else "L") + f"{fmt(x)},{fmt(y)}" for i, (x, y) in enumerate(pts)]
+
+def glow_stack(width: float, radii: List[float]) -> List[Tuple[float, float]]:
+    """(stroke width, alpha) per halo, outermost first, for a line `width` wide.
+
+    A raster halo is the blurred mask tinted with colour * alpha and composited with that same
+    alpha (see tint), so it covers blur_r**2, and the stack of them 1 - prod(1 - blur_r**2) over
+    GLOW_RADII. Stroke k covers out to VECTOR_EXTENT * r_k past the edge, and its alpha is chosen
+    so the stack matches the raster halo in the middle of its own band.
+    """
+    half = width / 2
+    phi = lambda t: 0.5 * (1 + math.erf(t / math.sqrt(2)))
+    blur = lambda d, r: phi((d + half) / r) - phi((d - half) / r)
+    ext = [VECTOR_EXTENT * r for r in radii] + [0.0]
+    stack, clear = [], 1.0
+    for k, r in enumerate(radii):
+        d = half + (ext[k] + ext[k + 1]) / 2
+        target = 1 - math.prod(1 - blur(d, rr) ** 2 for rr in radii)
+        alpha = min(1.0, max(0.0, 1 - (1 - target) / clear))
+        clear *= 1 - alpha
+        stack.append((width + 2 * ext[k], alpha))
+    return stack
+
+def text_path(text: str, xy: Tuple[float, float], size: int) -> Optional[List[str]]:
+    """Glyph outlines of `text` laid out like ImageDraw.text (top-left at the ascender line)."""
+    font = vector_font()
+    if font is None:
+        return None
+    from fontTools.pens.svgPathPen import SVGPathPen  # vector_font() found fontTools
+    from fontTools.pens.transformPen import TransformPen
+    glyphs, cmap, hmtx = font.getGlyphSet(), font.getBestCmap(), font["hmtx"]
+    s = size / font["head"].unitsPerEm
+    x, baseline = xy[0], xy[1] + font["hhea"].ascent * s
+    pen = SVGPathPen(glyphs, ntos=fmt)
+    for ch in text:
+        gname = cmap.get(ord(ch), ".notdef")
+        glyphs[gname].draw(TransformPen(pen, (s, 0, 0, -s, x, baseline)))
+        x += hmtx[gname][0] * s
+    cmds = pen.getCommands()
+    return [cmds] if cmds else []
+
+@functools.lru_cache(maxsize=1)
+def vector_font():
+    """The label font as a fontTools TTFont, or None (reported once) without fontTools or a font file."""
+    try:
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        print("[generate_patterns] fontTools not found; vector labels are omitted. Install via: pip install fonttools",
+              file=sys.stderr)
+        return None
+    p = font_path()
+    return TTFont(p, lazy=True) if p else None
+
+def vector_paths(name: str, spec: dict, theme: Dict, rng_mode: str = "compat") -> List[dict]:
+    """The scene as VectorDrawable paths in mdpi px: {"d": [commands], paint attributes}."""
+    w, h = canvas_size(1.0)
+    render = spec.get("render", {})
+    paths: List[dict] = []
+
+    # background: gradient + opaque grid (the raster grid is composited onto black)
+    paths.append({"d": [f"M0,0H{w}V{h}H0Z"], "gradient": (theme["bg1"], theme["bg2"], h)})
+    grid = [f"M{x + 0.5},0V{h}" for x in range(0, w, int(w / 16))]
+    grid += [f"M0,{y + 0.5}H{w}" for y in range(0, h, int(h / 12))]
+    paths.append({"d": grid, "strokeColor": over_black(theme["grid"]), "strokeWidth": 1})
+
+    # series
+    n = int(render.get("series_points", 120))
+    series, rng = scene_series(name, n, h, rng_mode)
+    series = [float(y) for y in series]
+    if render.get("series_style", "candles") == "line":
+        pts = [(int(i * w / (n - 1)), y) for i, y in enumerate(series)]
+        paths.append({"d": polyline_path(pts), "strokeColor": theme["accent"], "strokeAlpha": 180, "strokeWidth": 2,
+                      "strokeLineJoin": "round"})
+    else:
+        if rng_mode == "fast":
+            jitter = rng.uniform(2, 5, size=(n, 2)).tolist()
+        else:
+            jitter = [(rng.uniform(2, 5), rng.uniform(2, 5)) for _ in range(n)]  # draw_candles' draw order
+        cw = max(2, int(w / (n * 1.2)))
+        wicks = {True: [], False: []}
+        bodies = {True: [], False: []}
+        last = series[0]
+        for i, y in enumerate(series):
+            x = int(i * w / (n - 1))
+            change, last = y - last, y
+            up = change >= 0
+            wicks[up].append(f"M{fmt(x + 0.5)},{fmt(y - abs(change) * 1.2 - jitter[i][0])}"
+                             f"V{fmt(y + abs(change) * 1.2 + jitter[i][1] + 1)}")
+            top, bot = min(y, y - change * 0.8), max(y, y - change * 0.8)
+            bodies[up].append(f"M{x - cw // 2},{fmt(top)}H{x + cw // 2 + 1}V{fmt(bot + 1)}H{x - cw // 2}Z")
+        for up in (True, False):
+            col = theme["candle_up" if up else "candle_dn"]
+            paths.append({"d": wicks[up], "strokeColor": col, "strokeAlpha": 200, "strokeWidth": 1})
+            paths.append({"d": bodies[up], "fillColor": col, "fillAlpha": 220})
+
+    # overlay: polygons in item order, then every glowing stroke grouped by width
+    accent = theme["accent"]
+    strokes: Dict[float, List[str]] = {}
+    for item in render.get("overlay", []):
+        t = item.get("type", "line")
+        width = max(1, int(item.get("width", 3)))
+        if t == "line":
+            strokes.setdefault(width, []).extend(polyline_path([tuple(p) for p in item["pts"]]))
+        elif t == "channel":
+            (x1, y1), (x2, y2) = item["pts"]
+            nx, ny = -(y2 - y1), x2 - x1
+            norm = math.hypot(nx, ny) or 1.0
+            off = item.get("offset", 8)
+            nx, ny = nx / norm * off, ny / norm * off
+            for sgn in (1, -1):
+                strokes.setdefault(width, []).extend(
+                    polyline_path([(x1 + sgn * nx, y1 + sgn * ny), (x2 + sgn * nx, y2 + sgn * ny)]))
+        elif t == "polygon":
+            paths.append({"d": polyline_path([tuple(p) for p in item["pts"]]) + ["Z"], "fillColor": accent,
+                          "fillAlpha": 40, "strokeColor": accent, "strokeAlpha": 220, "strokeWidth": 1})
+    for width, d in sorted(strokes.items()):
+        for sw, alpha in glow_stack(width, list(GLOW_RADII)):
+            paths.append({"d": d, "strokeColor": accent, "strokeAlpha": alpha * 255, "strokeWidth": sw,
+                          "strokeLineCap": "round", "strokeLineJoin": "round"})
+        paths.append({"d": d, "strokeColor": accent, "strokeWidth": width})
+
+    # badge (ImageDraw rectangles include their right/bottom edge, hence the + 1)
+    pad = int(min(w, h) * 0.04)
+    r = int(min(w, h) * 0.08)
+    x0, y0, x1, y1 = pad, h - pad - r*2, pad + r*5 + 1, h - pad + 1
+    shadow = theme["shadow"]
+    paths.append({"d": rounded_rect_path(x0 + 2, y0 + 2, x1 + 2, y1 + 2, r), "fillColor": shadow, "fillAlpha": shadow[3]})
+    fill = theme.get("badge", BADGE_FILL)
+    paths.append({"d": rounded_rect_path(x0, y0, x1, y1, r), "fillColor": fill, "fillAlpha": fill[3]})
+    label = render.get("label", name.replace("_", " ").title())
+    conf_txt = f"{int(float(render.get('confidence', 0.85)) * 100)}% conf."
+    for text, xy, size, col in ((label, (x0 + r*0.6, y0 + r*0.35), int(r*0.8), theme["text"]),
+                                (conf_txt, (x0 + r*0.6, y0 + r*1.15), int(r*0.9), accent)):
+        d = text_path(text, xy, size)
+        if d:
+            paths.append({"d": d, "fillColor": col})
+    return paths
+
+def path_nodes(d: List[str]) -> int:
+    """Path commands, the unit VectorDrawable's path parser and renderer work in."""
+    return sum(sum(c.isalpha() for c in cmd) for cmd in d)
+
+def vector_xml(paths: List[dict]) -> str:
+    w, h = canvas_size(1.0)
+    out = ['<?xml version="1.0" encoding="utf-8"?>',
+           '<!-- Generated by scripts/generate_patterns.py (vector backend); do not edit. -->',
+           '<vector xmlns:android="http://schemas.android.com/apk/res/android"',
+           '    xmlns:aapt="http://schemas.android.com/aapt"',
+           f'    android:width="{w}dp" android:height="{h}dp"',
+           f'    android:viewportWidth="{w}" android:viewportHeight="{h}">']
+    for p in paths:
+        attrs = [f'android:pathData="{"".join(p["d"])}"']
+        for key in ("fillColor", "strokeColor"):
+            if key in p:
+                attrs.append(f'android:{key}="{hex_color(p[key])}"')
+        for key in ("fillAlpha", "strokeAlpha"):
+            if key in p and round(p[key]) < 255:
+                attrs.append(f'android:{key}="{fmt(p[key] / 255)}"')
+        for key in ("strokeWidth", "strokeLineCap", "strokeLineJoin"):
+            if key in p:
+                attrs.append(f'android:{key}="{fmt(p[key]) if key == "strokeWidth" else p[key]}"')
+        if "gradient" not in p:
+            out.append(f'    <path {" ".join(attrs)}/>')
+            continue
+        c1, c2, gh = p["gradient"]
+        out += [f'    <path {" ".join(attrs)}>',
+                '        <aapt:attr name="android:fillColor">',
+                f'            <gradient android:type="linear" android:startX="0" android:startY="0" '
+                f'android:endX="0" android:endY="{gh}" android:startColor="{hex_color(c1)}" '
+                f'android:endColor="{hex_color(c2)}"/>',
+                '        </aapt:attr>',
+                '    </path>']
+    out.append("</vector>")
+    return "\n".join(out) + "\n"
+
+def vector_path(res_root: str, name: str, theme_key: str, themes: List[str]) -> str:
+    """res/drawable/pattern_<name>[_<theme>].xml, beside the mdpi PNG it replaces."""
+    suffix = "" if theme_key == themes[0] else f"_{theme_key}"
+    return os.path.join(density_path(res_root, "mdpi"), f"pattern_{name}{suffix}.xml")
+
+def vector_hash(name: str, spec: dict, theme_key: str, rng_mode: str) -> str:
+    labels = vector_font() is not None
+    key = {"vector": VECTOR_VERSION, "name": name, "spec": spec, "theme": THEMES[theme_key], "rng": rng_mode,
+           "font": font_digest() if labels else None}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def build_vectors(templates: Dict[str, dict], sizes: List[str], res_root: str, themes: List[str], opts: dict,
+                  manifest_path: str, force: bool, max_nodes: Optional[int],
+                  profile: Optional[List[dict]] = None, sources: Optional[Dict[str, str]] = None,
+                  prune: bool = False) -> List[dict]:
+    """Write out-of-date vector drawables and drop the raster drawables they replace.
+
+    With `prune`, the vector drawables of deleted template files are removed, as build() does.
+
+    Returns an asset_encoders record per drawable, with its path and node counts; decoded_bytes is
+    the bitmap a VectorDrawable caches when drawn at its intrinsic size on the densest of `sizes`.
+    With `profile`, an asset_profile entry per written drawable is appended to it.
+    """
+    base = os.path.dirname(manifest_path)
+    rel = lambda p: os.path.relpath(os.path.abspath(p), base)
+    outputs = load_manifest(manifest_path)
+    w, h = canvas_size(max(DENSITIES[d] for d in sizes))
+    records: List[dict] = []
+    for name, spec in templates.items():
+        for theme_key in themes:
+            out_file = vector_path(res_root, name, theme_key, themes)
+            entry = manifest_entry(name, vector_hash(name, spec, theme_key, opts.get("rng", "compat")), sources, base)
+            st: dict = {}
+            with asset_profile.stage(st, "paths"):
+                paths = vector_paths(name, spec, THEMES[theme_key], opts.get("rng", "compat"))
+            counts = {"paths": len(paths), "nodes": sum(path_nodes(p["d"]) for p in paths)}
+            if force or not up_to_date(outputs.get(rel(out_file)), entry) or not os.path.exists(out_file):
+                with asset_profile.stage(st, "xml"):
+                    data = vector_xml(paths).encode("utf-8")
+                with asset_profile.stage(st, "write"):
+                    asset_encoders.write_bytes(out_file, data)
+                rec = asset_encoders.asset_record(rel(out_file), (w, h), asset_encoders.DRAWABLE_BPP, len(data),
+                                                  st["stages"]["xml"][0])
+                outputs[rel(out_file)] = entry
+                if profile is not None:
+                    profile.append(asset_profile.entry("generate_patterns", f"{name}@vector/{theme_key}", st,
+                                                       template=name, themes=[theme_key], outputs=[rel(out_file)],
+                                                       **counts))
+                print(f"[generate_patterns] wrote {out_file} ({counts['paths']} paths, {counts['nodes']} nodes, "
+                      f"{len(data) / 1024:.1f} KB)")
+            else:
+                outputs[rel(out_file)] = entry
+                rec = asset_encoders.asset_record(rel(out_file), (w, h), asset_encoders.DRAWABLE_BPP,
+                                                  os.path.getsize(out_file), None)
+            rec.update(counts)
+            records.append(rec)
+            if max_nodes is not None and counts["nodes"] > max_nodes:
+                print(f"[generate_patterns] OVER NODE BUDGET {out_file}: {counts['nodes']} > {max_nodes}",
+                      file=sys.stderr)
+
+            # A density-specific PNG would win over the vector on that density, and the mdpi one
+            # clashes with it in drawable/.
+            for dens in DENSITIES:
+                for t in ("png", "webp"):
+                    raster = out_path(res_root, dens, name, theme_key, dict(opts, themes=themes, tier=t))
+                    if os.path.exists(raster):
+                        os.remove(raster)
+                        print(f"[generate_patterns] removed {raster}")
+                    outputs.pop(rel(raster), None)
+
+    expected = {rel(vector_path(res_root, name, t, themes)) for name in templates for t in themes}
+    for key in removed_outputs(outputs, sources, base, ".xml") if prune else []:
+        if key not in expected:
+            stale = os.path.join(base, key)
+            if os.path.exists(stale):
+                os.remove(stale)
+                print(f"[generate_patterns] removed {stale}")
+            del outputs[key]
+    save_manifest(manifest_path, outputs)
+    return records
+
+# ---------- Watch mode ----------
+
+# --watch keeps this process (fonts, backgrounds, Pillow/NumPy imports) alive after the first
+# build and polls the template directory; an edit re-runs the incremental build, which
+# re-renders only the templates whose spec changed. Polling (mtime + size of *.json) works the
+# same on every OS and filesystem, including mounted volumes that miss inotify events.
+WATCH_INTERVAL = 0.2  # seconds between directory scans
+
+def scan_templates(dir_path: str) -> Dict[str, Tuple[int, int]]:
+    """{path: (mtime_ns, size)} of the *.json files in dir_path."""
+    try:
+        entries = list(os.scandir(dir_path))
+    except FileNotFoundError:
+        return {}
+    out = {}
+    for e in entries:
+        if e.name.endswith(".json") and e.is_file():
+            st = e.stat()
+            out[e.path] = (st.st_mtime_ns, st.st_size)
+    return out
+
+def watch_templates(dir_path: str, rebuild, interval: float = WATCH_INTERVAL) -> None:
+    """Call rebuild(templates, sources, prune) after every change under dir_path until interrupted.
+
+    A file that fails to parse (e.g. caught mid-save) keeps its previous spec, so a transient
+    syntax error never prunes that template's outputs; while any file has no spec at all, no
+    outputs are pruned, and while no template loads there is no rebuild.
+    """
+    state = scan_templates(dir_path)
+    specs = {p: load_template(pathlib.Path(p)) for p in sorted(state)}
+    print(f"[generate_patterns] watching {dir_path} ({len(state)} templates, every {interval:g} s); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(interval)
+            now = scan_templates(dir_path)
+            if now == state:
+                continue
+            t0 = time.perf_counter()
+            changed = sorted(p for p in now if state.get(p) != now[p])
+            removed = sorted(p for p in state if p not in now)
+            for p in changed:
+                loaded = load_template(pathlib.Path(p))
+                if loaded is None and specs.get(p):
+                    print(f"[generate_patterns] keeping the previous {os.path.basename(p)}", file=sys.stderr)
+                else:
+                    specs[p] = loaded
+            for p in removed:
+                specs.pop(p, None)
+            state = now
+            loaded = {p: v for p, v in sorted(specs.items()) if v}
+            templates = dict(loaded.values())
+            sources = {name: p for p, (name, _) in loaded.items()}
+            if not templates:  # e.g. mid `git checkout`, or an editor that saves by rename
+                print(f"[generate_patterns] warning: no template loads from {dir_path}; not rebuilding",
+                      file=sys.stderr)
+                continue
+            rebuild(templates, sources, len(loaded) == len(specs))
+            done = time.perf_counter()
+            edited = max((now[p][0] for p in changed), default=None)
+            since_edit = f", {time.time() - edited / 1e9:.2f} s since save" if edited else ""
+            names = ", ".join(os.path.basename(p) for p in changed + removed)
+            print(f"[generate_patterns] watch: {names} rebuilt in {done - t0:.2f} s{since_edit}")
+    except KeyboardInterrupt:
+        print("[generate_patterns] watch stopped")
+
 def main():
     ap = argparse.ArgumentParser(description="Generate Android drawable PNGs for chart patterns.")
     ap.add_argument("--templates", default="app/src/main/assets/pattern_templates", help="Directory of *.json templates")
     ap.add_argument("--out", default="app/src/main/res", help="Android res root (will create drawable-* folders)")
     ap.add_argument("--sizes", default="mdpi,hdpi,xhdpi,xxhdpi,xxxhdpi", help="Comma list of densities")
-    ap.add_argument("--theme", default="neon", choices=list(THEMES.keys()))
+    ap.add_argument("--theme", default="neon",
+                    help=f"Comma list of themes ({', '.join(THEMES)}); the first writes pattern_<name>.png, "
+                         "the others pattern_<name>_<theme>.png")
+    ap.add_argument("--palette", action="store_true", help="Draw each scene once and colorize it for every theme")
+    ap.add_argument("--verify-palette", action="store_true", help="Compare palette output with direct renders and exit")
+    ap.add_argument("--jobs", type=int, default=1, help="Worker processes (0 = one per CPU, 1 = serial)")
+    ap.add_argument("--downsample", action="store_true", help="Render once at the largest density and resample the others")
+    ap.add_argument("--verify-downsample", action="store_true", help="Compare resampled output with direct renders and exit")
+    ap.add_argument("--min-psnr", type=float, default=25.0, help="PSNR floor (dB) for --verify-downsample")
+    ap.add_argument("--manifest", default=None, help=f"Build manifest path (default: <res root>/../{MANIFEST_NAME})")
+    ap.add_argument("--force", action="store_true", help="Ignore the manifest and re-render every output")
+    ap.add_argument("--rng", default="compat", choices=RNG_MODES,
+                    help="compat: random.Random stream of existing assets; fast: batched NumPy series and candles")
+    ap.add_argument("--glow", default="exact", choices=GLOW_MODES,
+                    help="exact: per-line halos of existing assets; batched: one union halo, reduced-pyramid blurs")
+    ap.add_argument("--atlas", action="store_true",
+                    help="Pack each density/theme into atlas pages plus a JSON index instead of one drawable per pattern")
+    ap.add_argument("--atlas-max-size", type=int, default=2048, help="Atlas page width/height limit (px)")
+    ap.add_argument("--atlas-padding", type=int, default=2, help="Edge-extruded border around each sprite (px)")
+    ap.add_argument("--atlas-index", default=None,
+                    help="Atlas index JSON (default: <res root>/../assets/pattern_atlas.json)")
+    ap.add_argument("--atlas-sprites", default=None,
+                    help="Staging tree for --atlas sprites (default: <res root>/../../../build/pattern_sprites)")
+    ap.add_argument("--backend", default="raster", choices=("raster", "vector"),
+                    help="raster: PNG/WebP per density; vector: one VectorDrawable XML per pattern in drawable/")
+    ap.add_argument("--max-vector-nodes", type=int, default=None,
+                    help="Flag vector drawables with more path commands than this")
+    ap.add_argument("--dry-run", action="store_true",
+                    help="List the outputs a build would render, keep and remove, then exit (no rendering)")
+    ap.add_argument("--watch", action="store_true",
+                    help="After the build, keep polling --templates and re-render templates as they change")
+    ap.add_argument("--watch-interval", type=float, default=WATCH_INTERVAL, help="Seconds between template scans")
+    asset_encoders.add_arguments(ap)
+    asset_profile.add_arguments(ap)
     args = ap.parse_args()
 
     sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
@@ -343,18 +1719,98 @@ def main():
             print(f"[generate_patterns] unknown density: {s}", file=sys.stderr)
             sys.exit(2)
 
-    templates = load_templates(args.templates)
-    if not templates:
+    themes = [t.strip() for t in args.theme.split(",") if t.strip()]
+    for t in themes:
+        if t not in THEMES:
+            print(f"[generate_patterns] unknown theme: {t}", file=sys.stderr)
+            sys.exit(2)
+    if not themes:
+        print("[generate_patterns] no theme given", file=sys.stderr)
+        sys.exit(2)
+
+    if not os.path.isdir(args.templates):  # a mistyped path must not overwrite the drawables with fallbacks
+        print(f"[generate_patterns] Template dir missing: {args.templates}", file=sys.stderr)
+        sys.exit(2)
+    templates, sources, bad = load_templates(args.templates)
+    prune = not bad  # a template that failed to parse must not look deleted
+    if bad:
+        print(f"[generate_patterns] {len(bad)} bad templates; not removing outputs of deleted templates",
+              file=sys.stderr)
+    if not templates and not bad:
         print("[generate_patterns] no templates found → using built-in fallbacks", file=sys.stderr)
-        templates = FALLBACKS
+        templates, prune = FALLBACKS, False
 
-    for name, spec in templates.items():
-        for dens in sizes:
-            dpi = DENSITIES[dens]
-            out_dir = density_path(args.out, dens)
-            out_file = os.path.join(out_dir, f"pattern_{name}.png")
-            render_one(name, spec, dpi, out_file, args.theme)
+    if args.verify_downsample:
+        sys.exit(0 if verify_downsample(templates, sizes, themes, args.rng, args.min_psnr, args.glow) else 1)
+    if args.verify_palette:
+        sys.exit(0 if verify_palette(templates, sizes, themes, args.rng, args.glow) else 1)
+
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    manifest_path = args.manifest or default_manifest_path(args.out)
+    opts = {"downsample": args.downsample, "rng": args.rng, "glow": args.glow, "palette": args.palette,
+            "themes": themes, "tier": args.tier}
+    profile: Optional[List[dict]] = [] if args.profile else None
+
+    def rerun(rec: dict) -> None:
+        """Re-render and encode one profiled asset in this process (for --profile-top)."""
+        name = rec["template"]
+        if "density" not in rec:
+            vector_xml(vector_paths(name, templates[name], THEMES[rec["themes"][0]], opts["rng"]))
+            return
+        densities = rec["densities"] if opts["downsample"] else [rec["density"]]
+        for per_density in render_densities(name, templates[name], densities, rec["themes"], opts).values():
+            asset_encoders.encode(per_density[rec["density"]], opts["tier"])
+
+    if args.backend == "vector" and (args.atlas or args.palette or args.downsample or args.glow != "exact"):
+        print("[generate_patterns] --backend vector does not combine with --atlas, --palette, --downsample or --glow",
+              file=sys.stderr)
+        sys.exit(2)
+    if args.dry_run:
+        if args.atlas:  # what build_atlases packs is the sprite tree, always PNG
+            dry_run(templates, sizes, args.atlas_sprites or default_sprite_root(args.out), themes,
+                    dict(opts, tier="png"), manifest_path, args.force, "raster", sources, prune)
+        else:
+            dry_run(templates, sizes, args.out, themes, opts, manifest_path, args.force, args.backend, sources, prune)
+        sys.exit(1 if bad else 0)
+    if args.atlas:
+        w, h = canvas_size(max(DENSITIES[d] for d in sizes))
+        if max(w, h) + 2 * args.atlas_padding > args.atlas_max_size:
+            print(f"[generate_patterns] --atlas-max-size {args.atlas_max_size} is too small for {w}x{h} drawables "
+                  f"with {args.atlas_padding} px padding", file=sys.stderr)
+            sys.exit(2)
+        opts.update(atlas_max_size=args.atlas_max_size, atlas_padding=args.atlas_padding)
+
+    def run(templates: Dict[str, dict], sources: Dict[str, str], prune: bool, workers: int, force: bool,
+            profile: Optional[List[dict]]) -> List[tuple]:
+        """One incremental build in the selected mode, with its size report; returns failed jobs."""
+        failed: List[tuple] = []
+        if args.backend == "vector":
+            assets = build_vectors(templates, sizes, args.out, themes, opts, manifest_path, force,
+                                   args.max_vector_nodes, profile, sources, prune)
+        elif args.atlas:
+            sprite_root = args.atlas_sprites or default_sprite_root(args.out)
+            failed, _ = build(templates, sizes, sprite_root, themes, dict(opts, tier="png"), workers, manifest_path,
+                              force, profile, sources, prune)
+            assets = [] if failed else build_atlases(templates, sizes, themes, sprite_root, args.out, opts,
+                                                     manifest_path, args.atlas_index or default_atlas_index(args.out))
+        else:
+            failed, assets = build(templates, sizes, args.out, themes, opts, workers, manifest_path, force, profile,
+                                   sources, prune)
+            if not failed:
+                remove_atlases(args.out, args.atlas_index or default_atlas_index(args.out))
+        asset_encoders.report(assets, "vector" if args.backend == "vector" else args.tier, args, "generate_patterns")
+        return failed
+
+    failed = run(templates, sources, prune, workers, args.force, profile)
+    asset_profile.finish(args, profile, "generate_patterns", rerun)
+    if args.watch:
+        # Serial from here on: a fresh worker pool per edit would start with cold caches.
+        watch_templates(args.templates, lambda t, src, prune: run(t, src, prune, 1, False, None), args.watch_interval)
+        return
+    if failed:
+        print(f"[generate_patterns] {len(failed)} jobs failed", file=sys.stderr)
+    if failed or bad:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
-```0
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# QuantraVision: deferred imports for the asset scripts.
+# Pillow, NumPy and Matplotlib cost 30-600 ms to import, which --help, --dry-run, cache-hit and
+# validation runs never need. lazy_import() returns the module right away and runs its code on
+# first attribute access (importlib.util.LazyLoader), so a module-level `np = lazy_import("numpy")`
+# costs nothing until a renderer actually touches np. A missing package still fails at import
+# time, because finding the module doesn't execute it. Not for modules first touched from
+# several threads at once: LazyLoader's load isn't thread-safe before Python 3.12.
+# Budgets per entry point are enforced by startup_budget.py.
+
+import importlib.util
+import sys
+
+def lazy_import(name: str):
+    """Module `name`, loaded on first use; ImportError now if it isn't installed."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)  # imports the parent package only (PIL, not PIL.Image)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
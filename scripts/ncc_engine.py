@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# QuantraVision: batched FFT reference engine for PatternDetector's matching loop.
+#
+#   python scripts/ncc_engine.py --image screenshot.png        # best match per template
+#   python scripts/ncc_engine.py --verify 3                    # 3 synthetic screenshots vs OpenCV
+#   python scripts/ncc_engine.py --benchmark 640x360,1280x720  # engine vs per-template loops
+#
+# detectFromBitmap loops over templates, then scales, then calls matchTemplate(TM_CCOEFF_NORMED)
+# on the resized screenshot, so every template pays for its own pass over the image. This engine
+# turns the loop around: per scale it resizes the screenshot once (ScaleSpace.resizeForScale:
+# INTER_AREA below 1x, INTER_LINEAR above), takes its FFT once and correlates every template that
+# searches that scale in batched irfft2 calls. Template spectra are cached per image size, window
+# sums are shared by same-sized templates, and scores follow OpenCV's rules
+# (template_stats.coefficients). The output is what the loop computes: per template, its best
+# score over all scales, with position and scale, and whether it clears the YAML threshold.
+#
+# Scales come from each YAML's scale_range / scale_stride, defaulted as TemplateLibrary does
+# (--scales yaml), or from ScaleSpace.scales(), which the detector uses today for every template
+# (--scales app).
+# Template statistics come from the .tstats sidecars when they match the image, else are computed.
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from lazy_imports import lazy_import
+import template_stats
+
+np = lazy_import("numpy")
+
+BATCH_MB = 256         # complex spectra held per irfft2 call
+CACHE_MB = 1024        # template spectra kept across images of the same size
+SCORE_TOLERANCE = template_stats.NCC_TOLERANCE
+BENCHMARK_SIZES = "480x270,640x360,960x540"
+PASTE_JITTER = 0.05    # synthetic pastes vary this much in size around the chosen scale
+
+class Template(NamedTuple):
+    name: str
+    file: str
+    threshold: float
+    scales: Tuple[float, ...]
+    image: object       # uint8, for the OpenCV loop
+    zero_mean: object   # float32
+    norm: float
+
+class Match(NamedTuple):
+    name: str
+    score: float        # -inf if the template never fit the resized image
+    x: int              # top-left of the best window in the resized image
+    y: int
+    scale: float
+    passed: bool        # score >= threshold
+
+# ---------- Templates ----------
+
+def yaml_scales(scale_range, stride: float) -> List[float]:
+    """scale_range [lo, hi] in steps of stride, quantized to 2 decimals like ScaleSpace."""
+    lo, hi = (float(v) for v in scale_range)
+    out, s = [], lo
+    while s <= hi + 1e-9:
+        out.append(round(s * 100) / 100.0)
+        s += stride
+    return out
+
+def load_templates(yaml_dir: str, scales: str = "yaml", limit: Optional[int] = None) -> List[Template]:
+    import yaml
+    from template_bundle import decode_gray, scale_config
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    app = template_stats.app_scales()
+    out = []
+    for yaml_path, image_path in template_stats.template_files(yaml_dir)[:limit]:
+        with open(yaml_path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=loader)
+        with open(image_path, "rb") as f:
+            raw = f.read()
+        image = decode_gray(raw)
+        try:
+            side = template_stats.read_sidecar(template_stats.sidecar_path(yaml_path))
+            if side["image_sha256"] != hashlib.sha256(raw).hexdigest():
+                side = None
+        except (OSError, ValueError):
+            side = None
+        stats = side or template_stats.compute(image)
+        tpl_scales = app if scales == "app" else yaml_scales(*scale_config(data))
+        out.append(Template(data["name"], os.path.basename(yaml_path), float(data.get("threshold", 0.7)),
+                            tuple(tpl_scales), image, stats["zero_mean"], stats["norm"]))
+    return out
+
+def resize_for_scale(image, scale: float):
+    """ScaleSpace.resizeForScale: truncated size, at least 8 px; OpenCV when installed, else Pillow."""
+    h, w = image.shape
+    size = (max(8, int(w * scale)), max(8, int(h * scale)))
+    try:
+        import cv2
+    except ImportError:
+        from PIL import Image
+        method = Image.Resampling.BOX if scale < 1.0 else Image.Resampling.BILINEAR
+        return np.asarray(Image.fromarray(image).resize(size, method))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+
+# ---------- Engine ----------
+
+def fast_len(n: int) -> int:
+    """Smallest 2^a 3^b 5^c >= n: pocketfft is several times slower on large prime factors."""
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            m = p35 << max(0, (-(-n // p35) - 1).bit_length())  # times the next power of two
+            best = min(best, m)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+class Engine:
+    """Best TM_CCOEFF_NORMED match per template over all its scales, one FFT per scale."""
+
+    def __init__(self, templates: List[Template], batch_mb: int = BATCH_MB, cache_mb: int = CACHE_MB):
+        self.templates = templates
+        self.batch_bytes = batch_mb << 20
+        self.cache_bytes = cache_mb << 20
+        self.cache: Dict[tuple, object] = {}  # (image shape, template shape, index tuple) -> conj spectra
+        self.cached = 0
+        by_scale: Dict[float, List[int]] = {}
+        for i, t in enumerate(templates):
+            for s in t.scales:
+                by_scale.setdefault(s, []).append(i)
+        self.by_scale = dict(sorted(by_scale.items()))
+
+    def spectra(self, shape: Tuple[int, int], tshape: Tuple[int, int], idx: Tuple[int, ...]):
+        key = (shape, tshape, idx)
+        spec = self.cache.get(key)
+        if spec is None:
+            planes = np.stack([self.templates[i].zero_mean for i in idx])
+            spec = np.conj(np.fft.rfft2(planes, s=shape))
+            if self.cached + spec.nbytes <= self.cache_bytes:
+                self.cache[key] = spec
+                self.cached += spec.nbytes
+        return spec
+
+    def match(self, image) -> List[Match]:
+        """image: 2-D uint8 (the grayscale screenshot)."""
+        best = [(-np.inf, 0, 0, 0.0)] * len(self.templates)
+        for s, members in self.by_scale.items():
+            scaled = resize_for_scale(image, s)
+            H, W = scaled.shape
+            groups: Dict[Tuple[int, int], List[int]] = {}
+            for i in members:
+                h, w = self.templates[i].zero_mean.shape
+                if H >= h and W >= w:
+                    groups.setdefault((h, w), []).append(i)
+            if not groups:
+                continue
+            # The zero-mean templates ignore a constant offset: subtracting the image mean keeps
+            # the float32 numerator free of cancellation
+            # Circular correlation on a fast FFT size: the valid region (H-h+1 x W-w+1) never wraps
+            shape = (fast_len(H), fast_len(W))
+            spec = np.fft.rfft2((scaled - scaled.mean()).astype(np.float32), s=shape)
+            per = max(1, self.batch_bytes // (spec.size * 8))
+            for (h, w), idx in groups.items():
+                s1, s2 = template_stats.window_sums(scaled, h, w)
+                var = np.sqrt(np.maximum(s2 - s1 * s1 / (h * w), 0))
+                for k in range(0, len(idx), per):
+                    chunk = tuple(idx[k:k + per])
+                    num = np.fft.irfft2(spec[None] * self.spectra(shape, (h, w), chunk), s=shape)
+                    num = num[:, :H - h + 1, :W - w + 1]
+                    norms = np.array([self.templates[i].norm for i in chunk])[:, None, None]
+                    r = template_stats.coefficients(num, var[None] * norms).reshape(len(chunk), -1)
+                    at = r.argmax(axis=1)  # first maximum in row-major order, like minMaxLoc
+                    for i, a, v in zip(chunk, at, r[np.arange(len(chunk)), at]):
+                        if v > best[i][0]:
+                            best[i] = (float(v), int(a % (W - w + 1)), int(a // (W - w + 1)), s)
+        return [Match(t.name, v, x, y, s, v >= t.threshold) for t, (v, x, y, s) in zip(self.templates, best)]
+
+# ---------- Per-template loops ----------
+
+def loop_opencv(templates: List[Template], image) -> List[Match]:
+    """detectFromBitmap's loop: template, then scale, then matchTemplate and minMaxLoc."""
+    import cv2
+    out = []
+    for t in templates:
+        v, x, y, best_s = -np.inf, 0, 0, 0.0
+        for s in t.scales:
+            scaled = resize_for_scale(image, s)
+            if scaled.shape[0] < t.image.shape[0] or scaled.shape[1] < t.image.shape[1]:
+                continue
+            _, top, _, loc = cv2.minMaxLoc(cv2.matchTemplate(scaled, t.image, cv2.TM_CCOEFF_NORMED))
+            if top > v:
+                v, x, y, best_s = float(top), loc[0], loc[1], s
+        out.append(Match(t.name, v, x, y, best_s, v >= t.threshold))
+    return out
+
+def loop_fft(templates: List[Template], image) -> List[Match]:
+    """The same loop with template_stats.ncc: one image FFT and window sums per template and scale."""
+    out = []
+    for t in templates:
+        v, x, y, best_s = -np.inf, 0, 0, 0.0
+        for s in t.scales:
+            scaled = resize_for_scale(image, s)
+            if scaled.shape[0] < t.zero_mean.shape[0] or scaled.shape[1] < t.zero_mean.shape[1]:
+                continue
+            r = template_stats.ncc(scaled, t.zero_mean, t.norm)
+            a = int(r.argmax())
+            if r.flat[a] > v:
+                v, x, y, best_s = float(r.flat[a]), a % r.shape[1], a // r.shape[1], s
+        out.append(Match(t.name, v, x, y, best_s, v >= t.threshold))
+    return out
+
+# ---------- Checks ----------
+
+def chart_background(size: Tuple[int, int], rng):
+    """Chart-like backdrop: horizontal gradient, grid lines, sensor noise."""
+    w, h = size
+    img = np.linspace(200, 245, w)[None, :] + np.linspace(0, 10, h)[:, None]
+    img[::40, :] -= 25
+    img[:, ::60] -= 25
+    img += rng.normal(0, 3, img.shape)
+    return img.clip(0, 255).astype(np.uint8)
+
+def paste(img, gray, scale: float, rng, jitter: float = PASTE_JITTER) -> None:
+    """Ink `gray` into img at a random position, sized so the detector finds it near `scale`
+    (pasted sizes vary by `jitter` around it, off the rungs as real charts are)."""
+    patch = resize_for_scale(gray, rng.uniform(1 - jitter, 1 + jitter) / scale)
+    ph, pw = patch.shape
+    if ph >= img.shape[0] or pw >= img.shape[1]:
+        return
+    y, x = int(rng.integers(0, img.shape[0] - ph)), int(rng.integers(0, img.shape[1] - pw))
+    img[y:y + ph, x:x + pw] = np.minimum(img[y:y + ph, x:x + pw], patch)
+
+def positive_shot(gray, scale: float, rng):
+    """A screenshot just big enough for `gray` pasted near `scale` plus some chart around it."""
+    h, w = gray.shape
+    grow = rng.uniform(1.2, 1.8)
+    img = chart_background((int(w / scale * grow) + 2, int(h / scale * grow) + 2), rng)
+    paste(img, gray, scale, rng)
+    return img
+
+def peak(image, templ) -> Optional[float]:
+    """Peak TM_CCOEFF_NORMED (OpenCV when installed, else template_stats.ncc); None if it doesn't fit."""
+    if image.shape[0] < templ.shape[0] or image.shape[1] < templ.shape[1]:
+        return None
+    try:
+        import cv2
+    except ImportError:
+        return float(template_stats.ncc_template(image, templ).max())
+    return float(cv2.minMaxLoc(cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED))[1])
+
+def synthetic_screenshot(templates: List[Template], size: Tuple[int, int], seed: int = 0):
+    """A chart-like grayscale screenshot: gradient, grid, noise and a few templates pasted at
+    scales the detector searches, so real matches and clutter are both present."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    img = chart_background(size, rng)
+    for t in rng.choice(len(templates), size=min(3, len(templates)), replace=False):
+        s = float(rng.choice(templates[t].scales))
+        patch = resize_for_scale(templates[t].image, 1.0 / s)  # shows at 1x once the frame is scaled by s
+        ph, pw = patch.shape
+        if ph < h and pw < w:
+            y, x = int(rng.integers(0, h - ph)), int(rng.integers(0, w - pw))
+            img[y:y + ph, x:x + pw] = np.minimum(img[y:y + ph, x:x + pw], patch)
+    return img
+
+def verify(templates: List[Template], images: int, size: Tuple[int, int]) -> int:
+    """Engine vs the OpenCV loop on synthetic screenshots; returns the number of mismatches.
+
+    A match agrees when the scores are within SCORE_TOLERANCE and either the positions and scales
+    are equal or OpenCV scores the engine's pick within the tolerance too (a tie broken differently).
+    """
+    import cv2
+    engine = Engine(templates)
+    failures = worst = 0
+    for k in range(images):
+        image = synthetic_screenshot(templates, size, seed=k)
+        for got, ref, t in zip(engine.match(image), loop_opencv(templates, image), templates):
+            if ref.score == -np.inf and got.score == -np.inf:
+                continue
+            err = abs(got.score - ref.score)
+            worst = max(worst, err)
+            same = (got.x, got.y, got.scale) == (ref.x, ref.y, ref.scale)
+            if not same and err <= SCORE_TOLERANCE:
+                scaled = resize_for_scale(image, got.scale)
+                window = scaled[got.y:got.y + t.image.shape[0], got.x:got.x + t.image.shape[1]]
+                at = float(cv2.matchTemplate(window, t.image, cv2.TM_CCOEFF_NORMED)[0, 0])
+                same = abs(at - got.score) <= SCORE_TOLERANCE
+            if err > SCORE_TOLERANCE or not same or got.passed != ref.passed:
+                failures += 1
+                print(f"[ncc_engine] MISMATCH image {k} {t.name}: engine {got.score:.4f} at "
+                      f"({got.x},{got.y}) x{got.scale}, OpenCV {ref.score:.4f} at ({ref.x},{ref.y}) x{ref.scale}")
+    print(f"[ncc_engine] verify: {images} screenshots {size[0]}x{size[1]}, {len(templates)} templates, "
+          f"{failures} mismatches, max |score - OpenCV| {worst:.2e} (tolerance {SCORE_TOLERANCE:g})")
+    return failures
+
+def benchmark(templates: List[Template], sizes: List[Tuple[int, int]], repeat: int) -> None:
+    """Milliseconds per screenshot and template x scale matches per second, per screenshot size."""
+    import statistics
+    runs = {}
+    try:
+        import cv2  # noqa: F401
+        runs["OpenCV loop"] = lambda image: loop_opencv(templates, image)
+    except ImportError:
+        pass
+    runs["FFT loop"] = lambda image: loop_fft(templates, image)
+    print(f"[ncc_engine] {len(templates)} templates, median of {repeat} runs per size")
+    print(f"[ncc_engine]   {'size':>10} {'matches':>8} {'method':<16} {'ms/shot':>10} {'matches/s':>10} {'vs FFT loop':>11}")
+    for w, h in sizes:
+        image = synthetic_screenshot(templates, (w, h))
+        fit = sum(1 for t in templates for s in t.scales  # the matches that run at this size
+                  if max(8, int(h * s)) >= t.image.shape[0] and max(8, int(w * s)) >= t.image.shape[1])
+        engine = Engine(templates)
+        engine.match(image)  # warm the spectra cache: the app matches same-sized frames all day
+        ms = {}
+        for label, fn in list(runs.items()) + [("batched engine", engine.match)]:
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn(image)
+                times.append((time.perf_counter() - t0) * 1000)
+            ms[label] = statistics.median(times)
+        for label, v in ms.items():
+            print(f"[ncc_engine]   {f'{w}x{h}':>10} {fit:>8} {label:<16} {v:>10.1f} {fit / v * 1000:>10.0f} "
+                  f"{ms['FFT loop'] / v:>10.2f}x")
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+def main():
+    ap = argparse.ArgumentParser(description="Batched FFT TM_CCOEFF_NORMED engine for the detector loop.")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates", help="Template directory")
+    ap.add_argument("--scales", choices=("yaml", "app"), default="yaml",
+                    help="Per-template YAML scale_range/scale_stride, or ScaleSpace.scales() for all")
+    ap.add_argument("--limit", type=int, default=None, help="Only the first N templates")
+    ap.add_argument("--image", default=None, help="Match this screenshot and print the best match per template")
+    ap.add_argument("--verify", type=int, default=0, metavar="IMAGES",
+                    help="Compare with the OpenCV loop on IMAGES synthetic screenshots")
+    ap.add_argument("--size", default="480x270", help="--verify screenshot size WxH")
+    ap.add_argument("--benchmark", default=None, metavar="SIZES", nargs="?", const=BENCHMARK_SIZES,
+                    help=f"Time the engine and both loops at these WxH sizes (default {BENCHMARK_SIZES})")
+    ap.add_argument("--repeat", type=int, default=3, help="Benchmark runs per size")
+    args = ap.parse_args()
+
+    if not (args.image or args.verify or args.benchmark):
+        ap.print_help()
+        return 0
+    templates = load_templates(args.yaml_dir, args.scales, args.limit)
+    if not templates:
+        print(f"[ncc_engine] no templates in {args.yaml_dir}")
+        return 1
+    if args.image:
+        from template_bundle import decode_gray
+        with open(args.image, "rb") as f:
+            image = decode_gray(f.read())
+        t0 = time.perf_counter()
+        matches = Engine(templates).match(image)
+        ms = (time.perf_counter() - t0) * 1000
+        for m in sorted(matches, key=lambda m: -m.score):
+            flag = "PASS" if m.passed else "    "
+            print(f"[ncc_engine] {flag} {m.score:7.4f}  {m.name:<36} x{m.scale:<5} at ({m.x}, {m.y})")
+        print(f"[ncc_engine] {image.shape[1]}x{image.shape[0]}: {len(templates)} templates in {ms:.0f} ms, "
+              f"{sum(m.passed for m in matches)} over threshold")
+    if args.verify:
+        w, h = parse_sizes(args.size)[0]
+        if verify(templates, args.verify, (w, h)):
+            return 1
+    if args.benchmark:
+        benchmark(templates, parse_sizes(args.benchmark), args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# QuantraVision: concurrent, rate-limited runner for HTTP image providers.
+# Used by generate_pattern_images.py for every provider that isn't rendered locally.
+#
+# A provider is two functions:
+#   request(pattern_name) -> (url, headers, body)   the POST to send for one pattern
+#   decode(body, content_type) -> bytes             the encoded image in the response
+# decode() accepts either a raw image/* body or an OpenAI-style JSON body
+# ({"data": [{"b64_json": ...}]}), which covers every provider we use; see json_image().
+#
+# Requests run on asyncio with at most --concurrency in flight (blocking urllib calls on a pool
+# of the same size, so the stdlib is enough). A token bucket (--rate per second, --burst) spaces
+# them out. Timeouts, connection errors, 429 and 5xx are retried with exponential backoff and
+# full jitter, or after Retry-After when the server sends it. Other 4xx fail at once.
+# on_result runs on the event loop as each image arrives. The caller persists it there
+# (generate_pattern_images puts it in its image store), so an interrupted run resumes where it stopped.
+
+import base64
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# asyncio, concurrent.futures and urllib are imported by the functions below: only needed once
+# requests are made, not for --help or a fully cached run. Plain imports rather than
+# lazy_imports, since fetch() runs on pool threads and LazyLoader isn't thread-safe before 3.12.
+
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+BACKOFF_CAP = 30.0  # seconds
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; take() waits for one."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+
+    async def take(self) -> None:
+        import asyncio
+        if self.rate <= 0:  # unlimited
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:  # no await between check and take: safe on one event loop
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def backoff(attempt: int, base: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_CAP, base * 2 ** attempt))
+
+def retry_after(headers) -> Optional[float]:
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None  # absent, or an HTTP date: fall back to backoff
+
+def json_image(body: bytes) -> bytes:
+    """The image in an OpenAI-style images response (first entry, b64_json)."""
+    data = json.loads(body)
+    item = data["data"][0] if "data" in data else data
+    return base64.b64decode(item["b64_json"])
+
+def decode_image(body: bytes, content_type: str) -> bytes:
+    if content_type.startswith("image/"):
+        return body
+    return json_image(body)
+
+def fetch(url: str, headers: dict, body: bytes, timeout: float) -> Tuple[bytes, str]:
+    """One blocking POST; raises RetryableError for failures worth another attempt."""
+    import urllib.error
+    import urllib.request
+    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.read(), resp.headers.get("Content-Type", "")
+    except urllib.error.HTTPError as e:
+        detail = e.read()[:200].decode("utf-8", "replace")
+        if e.code in RETRY_STATUS:
+            raise RetryableError(f"HTTP {e.code}: {detail}", retry_after(e.headers)) from e
+        raise RuntimeError(f"HTTP {e.code}: {detail}") from e
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        raise RetryableError(f"{type(e).__name__}: {getattr(e, 'reason', e)}") from e
+
+def add_arguments(ap) -> None:
+    ap.add_argument("--concurrency", type=int, default=8, help="HTTP providers: requests in flight")
+    ap.add_argument("--rate", type=float, default=5.0, help="HTTP providers: requests per second (0 = unlimited)")
+    ap.add_argument("--burst", type=int, default=5, help="HTTP providers: token-bucket size")
+    ap.add_argument("--retries", type=int, default=5, help="HTTP providers: retries per pattern")
+    ap.add_argument("--timeout", type=float, default=120.0, help="HTTP providers: seconds per request")
+    ap.add_argument("--backoff", type=float, default=1.0, help="HTTP providers: first backoff step in seconds")
+
+async def run_async(jobs: List[Tuple[str, str]], request: Callable, decode: Callable, args,
+                    on_result: Callable[[str, bytes, dict], None], tag: str) -> Dict[str, str]:
+    import asyncio
+    import concurrent.futures
+    bucket = TokenBucket(args.rate, args.burst)
+    gate = asyncio.Semaphore(max(1, args.concurrency))
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+    loop = asyncio.get_running_loop()
+    failed: Dict[str, str] = {}
+    done = [0]
+    t_start = time.perf_counter()
+    step = max(1, len(jobs) // 10)
+
+    async def one(job_id: str, pattern_name: str) -> None:
+        attempt = 0
+        async with gate:
+            t0 = time.perf_counter()  # queueing for the gate isn't request time
+            while True:
+                await bucket.take()
+                try:
+                    url, headers, body = request(pattern_name)
+                    resp, ctype = await loop.run_in_executor(pool, fetch, url, headers, body, args.timeout)
+                    data = decode(resp, ctype)
+                    break
+                except RetryableError as e:
+                    if attempt >= args.retries:
+                        failed[job_id] = f"{e} (after {attempt + 1} attempts)"
+                        return
+                    delay = e.retry_after if e.retry_after is not None else backoff(attempt, args.backoff)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    failed[job_id] = f"{type(e).__name__}: {e}"
+                    return
+        on_result(job_id, data, {"request_ms": (time.perf_counter() - t0) * 1000, "retries": attempt})
+        done[0] += 1
+        if done[0] % step == 0 or done[0] == len(jobs):
+            rate = done[0] / max(1e-9, time.perf_counter() - t_start)
+            print(f"[{tag}] {done[0]}/{len(jobs)} images ({rate:.1f}/s, {len(failed)} failed)")
+
+    try:
+        await asyncio.gather(*(one(j, p) for j, p in jobs))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return failed
+
+def run(jobs: List[Tuple[str, str]], request: Callable, decode: Callable, args,
+        on_result: Callable[[str, bytes, dict], None], tag: str) -> Dict[str, str]:
+    """Fetch (job_id, pattern_name) jobs concurrently; returns job_id -> error for the failures."""
+    import asyncio
+    import urllib.request  # once here, before the pool threads import it
+    failed = asyncio.run(run_async(jobs, request, decode, args, on_result, tag))
+    for job_id, err in sorted(failed.items()):
+        print(f"[{tag}] FAILED {job_id}: {err}", file=sys.stderr)
+    return failed
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# QuantraVision: local stand-in for HTTP image providers, for offline throughput runs and tests.
+# Stdlib + Pillow only. Every POST gets a deterministic 256x256 PNG derived from the request
+# body (same prompt, same image) after a configurable latency, or a configurable error.
+#
+#   python scripts/provider_standin.py --port 8765 --latency-ms 400 --jitter-ms 200 --error-rate 0.1
+#   python scripts/generate_pattern_images.py ... --provider openai --endpoint http://127.0.0.1:8765/v1
+#   python scripts/generate_pattern_images.py ... --provider http --endpoint http://127.0.0.1:8765/generate
+#
+# Paths:
+#   POST .../images/generations   OpenAI-style JSON reply ({"data": [{"b64_json": ...}]})
+#   POST anything else            raw image/png reply
+#   GET  /stats                   request counters as JSON
+# --error-rate returns 500s (and --throttle-rate 429s with Retry-After) at random. The draws are
+# seeded per request (--seed + request count), so a single-client run always fails the same way.
+# --max-rps also answers 429 when requests arrive faster than that, like a real rate limit.
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw
+
+SIZE = 256
+
+def render(seed: bytes) -> bytes:
+    """A stand-in chart: a polyline whose shape is the hash of the request body."""
+    h = hashlib.sha256(seed).digest()
+    img = Image.new("RGB", (SIZE, SIZE), "white")
+    d = ImageDraw.Draw(img)
+    d.line([(0, SIZE // 2), (SIZE, SIZE // 2)], fill=(200, 200, 200), width=1)
+    pts = [(int(i * (SIZE - 1) / (len(h) - 1)), 24 + b * (SIZE - 48) // 255) for i, b in enumerate(h)]
+    d.line(pts, fill=(0, 0, 0), width=3)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    opts: argparse.Namespace
+    lock = threading.Lock()
+    counters = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+    recent: list = []  # arrival times within the last second, for --max-rps
+
+    def log_message(self, fmt, *a):
+        if self.opts.verbose:
+            super().log_message(fmt, *a)
+
+    def reply(self, code: int, body: bytes, ctype: str, headers: dict | None = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.lock:
+            body = json.dumps(self.counters).encode("utf-8")
+        self.reply(200 if self.path == "/stats" else 404, body, "application/json")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        now = time.monotonic()
+        with self.lock:
+            n = self.counters["requests"]
+            self.counters["requests"] += 1
+            self.recent[:] = [t for t in self.recent if now - t < 1.0] + [now]
+            burst = self.opts.max_rps > 0 and len(self.recent) > self.opts.max_rps
+        rng = random.Random(self.opts.seed * 1_000_003 + n)
+        time.sleep(max(0.0, self.opts.latency_ms + rng.uniform(-1, 1) * self.opts.jitter_ms) / 1000)
+        draw = rng.random()
+        if burst or draw < self.opts.throttle_rate:
+            with self.lock:
+                self.counters["throttled"] += 1
+            return self.reply(429, b'{"error": "rate limited"}', "application/json", {"Retry-After": "1"})
+        if draw < self.opts.throttle_rate + self.opts.error_rate:
+            with self.lock:
+                self.counters["errors"] += 1
+            return self.reply(500, b'{"error": "stand-in failure"}', "application/json")
+        png = render(body)
+        with self.lock:
+            self.counters["ok"] += 1
+        if self.path.rstrip("/").endswith("images/generations"):
+            out = json.dumps({"data": [{"b64_json": base64.b64encode(png).decode("ascii")}]}).encode("utf-8")
+            return self.reply(200, out, "application/json")
+        return self.reply(200, png, "image/png")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="Mean response latency")
+    ap.add_argument("--jitter-ms", type=float, default=100.0, help="Latency varies uniformly by +/- this")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction answered with 429 + Retry-After")
+    ap.add_argument("--max-rps", type=float, default=0.0, help="Answer 429 above this many requests per second (0 = off)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+
+    StandIn.opts = args
+    server = ThreadingHTTPServer((args.host, args.port), StandIn)
+    server.daemon_threads = True
+    print(f"[provider_standin] listening on http://{args.host}:{server.server_address[1]} "
+          f"({args.latency_ms:.0f}+/-{args.jitter_ms:.0f} ms, {args.error_rate:.0%} errors, "
+          f"{args.throttle_rate:.0%} throttled)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# QuantraVision: cold-start benchmark and budget for the asset scripts' light code paths.
+#
+#   python scripts/startup_budget.py                  # 7 runs each, exit 1 if any budget is exceeded
+#   python scripts/startup_budget.py --runs 15 --json build/startup.json
+#   python scripts/startup_budget.py --budget-scale 2 # slower CI machines
+#
+# Each entry point runs in a fresh interpreter (no warm sys.modules; the OS page cache and
+# __pycache__ are warm after the first run, as on a developer machine). The budget applies to the
+# median wall time minus a bare `python -c pass`, i.e. to what the script itself costs. That
+# includes compiling the script (never cached for __main__: ~35 ms for generate_patterns.py), so
+# budgets sit ~1.5x above today's figures; a Pillow/NumPy/Matplotlib import adds 200-900 ms.
+# A second, instrumented run records which heavy modules were actually executed. For
+# lazy_imports.lazy_import() proxies that haven't been touched, the module is only found, not
+# loaded. --help and --dry-run must not load any of HEAVY.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SCRIPTS)
+TEMPLATE_DIR = os.path.join(ROOT, "app", "src", "main", "assets", "pattern_templates")
+
+HEAVY = ("numpy", "PIL.Image", "matplotlib", "yaml", "cv2", "fontTools.ttLib")
+
+# (label, script, argv, budget in ms over the bare interpreter); {tmp} is a scratch directory.
+ENTRY_POINTS = [
+    ("generate_patterns --help", "generate_patterns.py", ["--help"], 130),
+    ("generate_patterns --dry-run", "generate_patterns.py",
+     ["--dry-run", "--templates", "{tmp}/none", "--out", "{tmp}/res", "--manifest", "{tmp}/manifest.json",
+      "--theme", "neon,mono"], 160),
+    ("generate_pattern_images --help", "generate_pattern_images.py", ["--help"], 100),
+    ("generate_pattern_images --dry-run", "generate_pattern_images.py",
+     ["--dry-run", "--yaml-dir", TEMPLATE_DIR, "--out-dir", "{tmp}/refs", "--store", "{tmp}/store"], 190),
+    ("generate_all_108_patterns --help", "generate_all_108_patterns.py", ["--help"], 110),
+    ("generate_all_108_patterns --dry-run", "generate_all_108_patterns.py", ["--dry-run"], 100),
+]
+
+# Runs the script as __main__ and prints the HEAVY modules it left executed in sys.modules.
+PROBE = """
+import importlib.util, json, runpy, sys
+sys.path.insert(0, {scripts!r})
+sys.argv = {argv!r}
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+lazy = importlib.util._LazyModule
+loaded = [m for m in {heavy!r} if m in sys.modules and not isinstance(sys.modules[m], lazy)]
+sys.__stdout__.write("\\n" + json.dumps(loaded) + "\\n")
+"""
+
+def wall_ms(cmd: List[str]) -> float:
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return (time.perf_counter() - t0) * 1000
+
+def heavy_loaded(script: str, argv: List[str]) -> List[str]:
+    code = PROBE.format(scripts=SCRIPTS, argv=[os.path.join(SCRIPTS, script), *argv], heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def measure(runs: int, scale: float) -> List[Dict]:
+    bare = statistics.median(wall_ms([sys.executable, "-c", "pass"]) for _ in range(runs))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, script, argv, budget in ENTRY_POINTS:
+            argv = [a.replace("{tmp}", tmp) for a in argv]
+            cmd = [sys.executable, os.path.join(SCRIPTS, script), *argv]
+            wall_ms(cmd)  # warm the page cache and __pycache__
+            times = [wall_ms(cmd) for _ in range(runs)]
+            median = statistics.median(times)
+            results.append({
+                "entry": label,
+                "median_ms": round(median, 1),
+                "min_ms": round(min(times), 1),
+                "over_bare_ms": round(median - bare, 1),
+                "budget_ms": budget * scale,
+                "heavy": heavy_loaded(script, argv),
+            })
+    print(f"[startup_budget] bare interpreter: {bare:.1f} ms (median of {runs})")
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure and enforce cold-start budgets of the asset scripts.")
+    ap.add_argument("--runs", type=int, default=7, help="Fresh interpreters per entry point")
+    ap.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget (slow machines)")
+    ap.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = ap.parse_args()
+
+    results = measure(max(1, args.runs), args.budget_scale)
+    failures = 0
+    print(f"[startup_budget]   {'entry point':<38} {'median':>8} {'min':>8} {'script':>8} {'budget':>7}  heavy")
+    for r in results:
+        over = r["over_bare_ms"] > r["budget_ms"]
+        failures += over or bool(r["heavy"])
+        print(f"[startup_budget]   {r['entry']:<38} {r['median_ms']:>8.1f} {r['min_ms']:>8.1f} "
+              f"{r['over_bare_ms']:>8.1f} {r['budget_ms']:>7.0f}  {', '.join(r['heavy']) or '-'}"
+              f"{'  OVER BUDGET' if over else ''}{'  HEAVY IMPORT' if r['heavy'] else ''}")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "budget_scale": args.budget_scale, "results": results}, f, indent=1)
+            f.write("\n")
+    print(f"[startup_budget] {len(results) - failures}/{len(results)} entry points within budget")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# QuantraVision: single-file template bundle (.qvtb), the startup-friendly twin of pattern_templates/.
+#
+#   python scripts/template_bundle.py app/src/main/assets/pattern_templates.qvtb              # list
+#   python scripts/template_bundle.py BUNDLE --build --yaml-dir app/src/main/assets/pattern_templates
+#   python scripts/template_bundle.py BUNDLE --verify --yaml-dir ...      # round trip vs YAML/PNG
+#   python scripts/template_bundle.py BUNDLE --benchmark 20 --yaml-dir ...
+#
+# TemplateLibrary.loadTemplates lists the directory, parses every YAML, decodes every image
+# (IMREAD_GRAYSCALE) and SHA-256s its bytes on each cold start. The bundle holds the result of all
+# of that: the same fields and hash, plus the decoded 8-bit planes, so a loader maps one file and
+# wraps each plane in a Mat without decoding or copying. generate_all_108_patterns.py writes it
+# from the directory after every run, so it always matches what the directory loader would see.
+#
+# Layout (little-endian; every offset is from the start of the file):
+#   header   64 bytes  HEADER: magic "QVTB", version, header size, count, record size,
+#                      record table / string pool / plane area offsets, string pool size, file size
+#   records  count x RECORD (128 bytes), in YAML file name order:
+#                      name, image path, timeframe hints (comma-joined): offset + length in the pool
+#                      threshold, scale min, scale max, scale stride, aspect tolerance (NaN = none): f64
+#                      min_bars, width, height, 0: u32
+#                      plane offset, plane size: u64
+#                      SHA-256 of the encoded image file (Template.tplHash, raw 32 bytes)
+#   strings  UTF-8 string pool
+#   planes   width x height bytes each, rows contiguous, each starting on a 64-byte boundary
+# Zero bytes pad between sections. A reader must check magic and version.
+# To mmap it straight from the APK the asset has to be stored uncompressed
+# (androidResources.noCompress "qvtb"); until the app loader switches over it stays compressed.
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+MAGIC = b"QVTB"
+VERSION = 1
+ALIGN = 64
+HEADER = struct.Struct("<4sHHIIQQQQQ8x")  # 64 bytes
+RECORD = struct.Struct("<6I5d4I2Q32s")    # 128 bytes
+SCALE_RANGE = (0.6, 1.6)  # TemplateLibrary.loadTemplates' defaults for a YAML without them
+SCALE_STRIDE = 0.15
+
+def scale_config(data: dict) -> Tuple[List[float], float]:
+    """([scale min, scale max], stride) of a template YAML, defaulted as TemplateLibrary does."""
+    sr = data.get("scale_range") or SCALE_RANGE
+    stride = data.get("scale_stride")
+    return ([float(sr[0]) if len(sr) > 0 else SCALE_RANGE[0], float(sr[1]) if len(sr) > 1 else SCALE_RANGE[1]],
+            SCALE_STRIDE if stride is None else float(stride))
+
+def default_bundle_path(yaml_dir: str) -> str:
+    """<dir>.qvtb next to a template directory: pattern_templates/ -> pattern_templates.qvtb."""
+    return os.path.normpath(yaml_dir) + ".qvtb"
+
+class BundleTemplate(NamedTuple):
+    name: str
+    path: str
+    threshold: float
+    scale_range: List[float]
+    scale_stride: float
+    aspect_tolerance: Optional[float]
+    timeframe_hints: List[str]
+    min_bars: int
+    sha256: str
+    image: "np.ndarray"  # (height, width) uint8; a read-only view into the bundle when read from one
+
+def align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+# ---------- Directory (what TemplateLibrary loads today) ----------
+
+def decode_gray(data: bytes):
+    """IMREAD_GRAYSCALE equivalent: OpenCV when installed (the app's decoder), else Pillow."""
+    try:
+        import cv2
+    except ImportError:
+        import io
+        with Image.open(io.BytesIO(data)) as img:
+            return np.asarray(img.convert("L"))
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+def load_directory(yaml_dir: str) -> List[BundleTemplate]:
+    """Every template the directory loader would accept, in YAML file name order; skips the same
+    cases (unreadable YAML, missing or undecodable image) with a warning."""
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    out = []
+    for fn in sorted(f for f in os.listdir(yaml_dir) if f.endswith(".yaml")):
+        try:
+            with open(os.path.join(yaml_dir, fn), "r", encoding="utf-8") as f:
+                data = yaml.load(f, Loader=loader)
+            image_path = data["image"]
+            with open(os.path.join(yaml_dir, image_path.rsplit("/", 1)[-1]), "rb") as f:
+                encoded = f.read()
+            img = decode_gray(encoded)
+            if img is None or img.size == 0:
+                raise ValueError(f"cannot decode {image_path}")
+            scale_range, scale_stride = scale_config(data)
+            tol = data.get("aspect_tolerance")
+            out.append(BundleTemplate(
+                name=data["name"],
+                path=image_path,
+                threshold=float(data["threshold"]),
+                scale_range=scale_range,
+                scale_stride=scale_stride,
+                aspect_tolerance=None if tol is None else float(tol),
+                timeframe_hints=[str(t) for t in data.get("timeframe_hints") or []],
+                min_bars=int(data.get("min_bars", 0)),
+                sha256=hashlib.sha256(encoded).hexdigest(),
+                image=img,
+            ))
+        except Exception as e:
+            print(f"[template_bundle] skipped {fn}: {type(e).__name__}: {e}", file=sys.stderr)
+    return out
+
+# ---------- Writer ----------
+
+def pack(templates: List[BundleTemplate]) -> bytes:
+    strings = bytearray()
+
+    def intern(s: str):
+        b = s.encode("utf-8")
+        strings.extend(b)
+        return len(strings) - len(b), len(b)
+
+    fields = []
+    for t in templates:
+        if "," in "".join(t.timeframe_hints):
+            raise ValueError(f"{t.name}: timeframe hints can't contain ','")
+        fields.append((intern(t.name), intern(t.path), intern(",".join(t.timeframe_hints))))
+    table_offset = HEADER.size
+    strings_offset = table_offset + RECORD.size * len(templates)
+    data_offset = align(strings_offset + len(strings))
+    offsets, pos = [], data_offset
+    for t in templates:
+        offsets.append(pos)
+        pos = align(pos + t.image.size)
+    file_size = pos
+
+    buf = bytearray(file_size)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, HEADER.size, len(templates), RECORD.size,
+                     table_offset, strings_offset, len(strings), data_offset, file_size)
+    for i, (t, (name, path, hints), off) in enumerate(zip(templates, fields, offsets)):
+        h, w = t.image.shape
+        tol = math.nan if t.aspect_tolerance is None else t.aspect_tolerance
+        RECORD.pack_into(buf, table_offset + i * RECORD.size, *name, *path, *hints,
+                         t.threshold, t.scale_range[0], t.scale_range[1], t.scale_stride, tol,
+                         t.min_bars, w, h, 0, off, h * w, bytes.fromhex(t.sha256))
+        buf[off:off + h * w] = np.ascontiguousarray(t.image, dtype=np.uint8).tobytes()
+    buf[strings_offset:strings_offset + len(strings)] = strings
+    return bytes(buf)
+
+def write_bundle(path: str, templates: List[BundleTemplate]) -> int:
+    """Write atomically (temp file + rename); returns the file size."""
+    import asset_encoders
+    data = pack(templates)
+    asset_encoders.write_bytes(path, data)
+    return len(data)
+
+# ---------- Reader ----------
+
+class TemplateBundle:
+    """A memory-mapped bundle. Templates are NamedTuples whose `image` is a read-only NumPy view
+    of the mapping (no copy, paged in on first touch); close() unmaps once no view is left."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, header_size, count, record_size, table_offset, strings_offset,
+             strings_size, self.data_offset, file_size) = HEADER.unpack_from(self.mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: not a v{VERSION} template bundle ({magic!r} v{version})")
+            if header_size != HEADER.size or record_size != RECORD.size or file_size != len(self.mm):
+                raise ValueError(f"{path}: truncated or inconsistent bundle header")
+            pool = self.mm[strings_offset:strings_offset + strings_size]
+            self.templates = [self.record(pool, *RECORD.unpack_from(self.mm, table_offset + i * RECORD.size))
+                              for i in range(count)]
+        except Exception:
+            self.mm.close()
+            raise
+        self.by_name: Dict[str, BundleTemplate] = {t.name: t for t in self.templates}
+
+    def record(self, pool: bytes, name_off, name_len, path_off, path_len, hints_off, hints_len,
+               threshold, scale_min, scale_max, stride, tol, min_bars, w, h, _reserved,
+               plane_offset, plane_size, digest) -> BundleTemplate:
+        if plane_offset % ALIGN or plane_size != w * h or plane_offset + plane_size > len(self.mm):
+            raise ValueError(f"bad plane at offset {plane_offset}")
+        hints = pool[hints_off:hints_off + hints_len].decode("utf-8")
+        return BundleTemplate(
+            name=pool[name_off:name_off + name_len].decode("utf-8"),
+            path=pool[path_off:path_off + path_len].decode("utf-8"),
+            threshold=threshold,
+            scale_range=[scale_min, scale_max],
+            scale_stride=stride,
+            aspect_tolerance=None if math.isnan(tol) else tol,
+            timeframe_hints=hints.split(",") if hints else [],
+            min_bars=min_bars,
+            sha256=digest.hex(),
+            image=np.frombuffer(self.mm, np.uint8, count=plane_size, offset=plane_offset).reshape(h, w),
+        )
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def __iter__(self) -> Iterator[BundleTemplate]:
+        return iter(self.templates)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.templates = []
+        self.by_name = {}
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # a caller still holds image views: the mapping goes away with the last of them
+
+# ---------- Checks ----------
+
+def verify(bundle_path: str, yaml_dir: str) -> int:
+    """Round trip: every template of the directory, field by field and pixel by pixel; returns mismatches."""
+    expected = load_directory(yaml_dir)
+    bad = 0
+    with TemplateBundle(bundle_path) as bundle:
+        got = list(bundle)
+        if len(got) != len(expected):
+            print(f"[template_bundle] count: bundle {len(got)}, directory {len(expected)}")
+            bad += 1
+        for e, g in zip(expected, got):
+            diffs = [f for f in BundleTemplate._fields if f != "image" and getattr(e, f) != getattr(g, f)]
+            if e.image.shape != g.image.shape or not np.array_equal(e.image, g.image):
+                diffs.append("image")
+            if not g.image.flags.c_contiguous or g.image.base is None or g.image.flags.writeable:
+                diffs.append("not a read-only view")
+            if diffs:
+                print(f"[template_bundle] MISMATCH {e.name}: {', '.join(diffs)}")
+                bad += 1
+    print(f"[template_bundle] verify: {len(expected) - bad}/{len(expected)} templates identical to {yaml_dir}")
+    return bad
+
+def benchmark(bundle_path: str, yaml_dir: str, runs: int) -> None:
+    """Median load time: directory (parse + decode + hash) vs bundle (map + views, then touching every pixel)."""
+    import statistics  # pulls in fractions/decimal/random: only the benchmark needs it
+    load_directory(yaml_dir)  # warm the page cache and imports for both sides
+    legacy, mapped, touched = [], [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        load_directory(yaml_dir)
+        legacy.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        bundle = TemplateBundle(bundle_path)
+        mapped.append(time.perf_counter() - t0)
+        for t in bundle:
+            int(t.image.sum(dtype=np.uint64))
+        touched.append(time.perf_counter() - t0)
+        bundle.close()
+    ms = {k: statistics.median(v) * 1000 for k, v in (("legacy", legacy), ("mapped", mapped), ("touched", touched))}
+    print(f"[template_bundle] load, median of {runs}:")
+    print(f"[template_bundle]   directory (YAML + decode + SHA-256)   {ms['legacy']:8.2f} ms")
+    print(f"[template_bundle]   bundle (map + views)                  {ms['mapped']:8.2f} ms  "
+          f"({ms['legacy'] / ms['mapped']:.0f}x)")
+    print(f"[template_bundle]   bundle + read every pixel             {ms['touched']:8.2f} ms  "
+          f"({ms['legacy'] / ms['touched']:.0f}x)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Build, list, verify and benchmark the template bundle.")
+    ap.add_argument("bundle", help="Bundle file (.qvtb)")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates",
+                    help="Template directory (YAML + images) to build from or compare with")
+    ap.add_argument("--build", action="store_true", help="(Re)write the bundle from --yaml-dir")
+    ap.add_argument("--verify", action="store_true", help="Round-trip check against --yaml-dir")
+    ap.add_argument("--benchmark", type=int, default=0, metavar="RUNS",
+                    help="Compare load times of the bundle and --yaml-dir over RUNS runs")
+    args = ap.parse_args()
+
+    if args.build:
+        templates = load_directory(args.yaml_dir)
+        size = write_bundle(args.bundle, templates)
+        print(f"[template_bundle] wrote {args.bundle}: {len(templates)} templates, {size / 1024:.1f} KB")
+    if args.verify and verify(args.bundle, args.yaml_dir):
+        return 1
+    if args.benchmark:
+        benchmark(args.bundle, args.yaml_dir, args.benchmark)
+    if not (args.build or args.verify or args.benchmark):
+        with TemplateBundle(args.bundle) as bundle:
+            for t in bundle:
+                h, w = t.image.shape
+                print(f"{t.name:<36} {w:>4}x{h:<4} thr {t.threshold:.2f}  {t.sha256[:12]}  {t.path}")
+            print(f"[template_bundle] {len(bundle)} templates")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# QuantraVision: coarse-to-fine cascade tier for the templates (prefilter images + thresholds).
+#
+#   python scripts/template_cascade.py --write             # <stem>_coarse.png + YAML prefilter for every template
+#   python scripts/template_cascade.py --evaluate 8        # recall loss vs speedup on synthetic screenshots
+#
+# PatternDetector matches every template at full resolution on every ScaleSpace scale. The cascade
+# first matches a --factor (default 1/4) downscaled copy of the template against the screenshot
+# resized by scale x factor, which costs ~factor^4 as much, and runs the full-resolution match only
+# for the (template, scale) pairs whose coarse peak reaches the template's prefilter threshold:
+#
+#   prefilter:
+#     image: pattern_templates/<stem>_coarse.png
+#     scale: 0.25
+#     threshold: 0.52
+#
+# Thresholds are calibrated per template on synthetic positives: chart-like screenshots (gradient,
+# grid, noise) with the template pasted at random ScaleSpace scales and positions, matched at the
+# scales near the pasted one (pasted sizes are jittered off the rungs, as real charts are). Clean
+# pastes score far above the YAML threshold, so their coarse peaks alone would set the bar too high
+# for matches that only just pass. Calibration uses the drop instead: over every pair whose full
+# peak is within CALIBRATION_BAND of the threshold or above, the --recall quantile of
+# (full peak - coarse peak). A match at exactly the threshold keeps a coarse peak of at least
+# threshold - drop, and the prefilter threshold is that minus CALIBRATION_MARGIN. The synthetic
+# set is seeded, so the same template always gets the same threshold. A pair whose coarse
+# screenshot is too small for the coarse template is never rejected.
+#
+# --evaluate matches every (template, scale) pair of synthetic screenshots on other seeds, a few
+# templates each, at both resolutions and reports for each --offsets value (added to every
+# prefilter threshold) the pairs pruned, the positives lost (pairs and detections) and the speedup
+# from the measured match times: the recall loss vs speedup curve around the calibrated point.
+# generate_all_108_patterns.py emits the same tier with --cascade FACTOR.
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+import template_stats
+from ncc_engine import chart_background, paste, peak, positive_shot, resize_for_scale
+
+np = lazy_import("numpy")
+
+DEFAULT_FACTOR = 0.25
+DEFAULT_RECALL = 0.99        # quantile of the calibrated full-to-coarse drop
+CALIBRATION_SHOTS = 24       # synthetic screenshots per template
+NEIGHBOUR_RATIO = 1.25       # calibration matches scales within this ratio of the pasted one
+CALIBRATION_BAND = 0.15      # pairs this far below the threshold still measure the drop
+CALIBRATION_MARGIN = 0.02    # subtracted from the calibrated threshold
+CALIBRATION_SEED = 0
+EVALUATION_SEED = 10_000     # evaluation screenshots never reuse calibration seeds
+SUFFIX = "_coarse"
+
+# ---------- Coarse templates ----------
+
+def coarse_path(image_path: str) -> str:
+    """<stem>_coarse<ext> for <stem>_ref<ext>."""
+    root, ext = os.path.splitext(image_path)
+    return (root[:-4] if root.endswith("_ref") else root) + SUFFIX + ext
+
+def coarse_template(gray, factor: float):
+    """The template resized by `factor` exactly as ScaleSpace resizes screenshots."""
+    return resize_for_scale(gray, factor)
+
+# ---------- Calibration ----------
+
+def pair_scores(shot, gray, coarse, factor: float, scales: List[float]) -> List[Tuple[float, Optional[float], Optional[float]]]:
+    """(scale, full peak, coarse peak) for every scale; None where the template doesn't fit."""
+    out = []
+    for s in scales:
+        full = peak(resize_for_scale(shot, s), gray)
+        small = peak(resize_for_scale(shot, s * factor), coarse) if full is not None else None
+        out.append((s, full, small))
+    return out
+
+def calibrate(gray, threshold: float, factor: float = DEFAULT_FACTOR, recall: float = DEFAULT_RECALL,
+              shots: int = CALIBRATION_SHOTS, seed: int = CALIBRATION_SEED,
+              scales: Optional[List[float]] = None) -> Tuple[float, int]:
+    """(prefilter threshold, number of pairs it was calibrated on) for one template."""
+    scales = scales or template_stats.app_scales()
+    coarse = coarse_template(gray, factor)
+    rng = np.random.default_rng(seed)
+    drops = []
+    for _ in range(shots):
+        r = float(rng.choice(scales))
+        near = [s for s in scales if 1 / NEIGHBOUR_RATIO <= s / r <= NEIGHBOUR_RATIO]  # the rest score low
+        shot = positive_shot(gray, r, rng)
+        drops += [full - small for _, full, small in pair_scores(shot, gray, coarse, factor, near)
+                  if full is not None and full >= threshold - CALIBRATION_BAND and small is not None]
+    if not drops:
+        return -1.0, 0  # nothing to learn from: never reject
+    drop = float(np.quantile(drops, recall, method="higher"))
+    return round(max(-1.0, threshold - drop - CALIBRATION_MARGIN), 4), len(drops)
+
+def prefilter_entry(image_rel: str, factor: float, threshold: float) -> dict:
+    """The YAML `prefilter` mapping for an image path as written in the YAML's `image`."""
+    return {"image": coarse_path(image_rel), "scale": factor, "threshold": threshold}
+
+# ---------- Evaluation ----------
+
+def load(yaml_dir: str) -> List[dict]:
+    import yaml
+    from template_bundle import decode_gray
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    out = []
+    for yaml_path, image_path in template_stats.template_files(yaml_dir):
+        with open(yaml_path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=loader)
+        with open(image_path, "rb") as f:
+            gray = decode_gray(f.read())
+        pre = data.get("prefilter")
+        coarse = None
+        if pre:
+            with open(os.path.join(yaml_dir, pre["image"].rsplit("/", 1)[-1]), "rb") as f:
+                coarse = decode_gray(f.read())
+        out.append({"name": data["name"], "yaml": yaml_path, "image": image_path, "data": data,
+                    "gray": gray, "threshold": float(data.get("threshold", 0.7)), "prefilter": pre,
+                    "coarse": coarse})
+    return out
+
+def evaluate(templates: List[dict], shots: int, size: Tuple[int, int], offsets: List[float],
+             per_shot: int = 2) -> List[dict]:
+    """Full pass vs cascade on `shots` synthetic screenshots with `per_shot` templates each, for each
+    offset added to every prefilter threshold.
+
+    Every (template, scale) pair is matched and timed once at both resolutions; each offset's
+    cascade time is then the coarse pass plus the full matches it lets through.
+    """
+    scales = template_stats.app_scales()
+    rng = np.random.default_rng(EVALUATION_SEED)
+    rows = []  # (shot, template, full peak, coarse peak or None, full s, coarse s)
+    resize_full = resize_coarse = 0.0
+    for k in range(shots):
+        shot = chart_background(size, rng)
+        for i in rng.choice(len(templates), size=min(per_shot, len(templates)), replace=False):
+            paste(shot, templates[i]["gray"], float(rng.choice(scales)), rng)
+        for s in scales:
+            t0 = time.perf_counter()
+            scaled = resize_for_scale(shot, s)
+            resize_full += time.perf_counter() - t0
+            coarse_shots: Dict[float, object] = {}
+            for i, t in enumerate(templates):
+                t0 = time.perf_counter()
+                full = peak(scaled, t["gray"])
+                t1 = time.perf_counter()
+                if full is None:
+                    continue
+                small, t2 = None, t1
+                pre = t["prefilter"]
+                if pre is not None:
+                    if pre["scale"] not in coarse_shots:
+                        coarse_shots[pre["scale"]] = resize_for_scale(shot, s * pre["scale"])
+                        resize_coarse += time.perf_counter() - t1
+                        t1 = time.perf_counter()
+                    small = peak(coarse_shots[pre["scale"]], t["coarse"])
+                    t2 = time.perf_counter()
+                rows.append((k, i, full, small, t1 - t0, t2 - t1))
+    out = []
+    baseline = resize_full + sum(r[4] for r in rows)
+    for offset in offsets:
+        kept_time = resize_full + resize_coarse  # conservative: every scale still resized for the full pass
+        pruned = positives = lost = 0
+        hit: Dict[tuple, bool] = {}
+        for k, i, full, small, tf, tc in rows:
+            pre = templates[i]["prefilter"]
+            keep = small is None or small >= pre["threshold"] + offset
+            kept_time += tc + (tf if keep else 0.0)
+            pruned += not keep
+            if full >= templates[i]["threshold"]:
+                positives += 1
+                lost += not keep
+                hit[k, i] = hit.get((k, i), False) or keep
+        out.append({"offset": offset, "pairs": len(rows), "pruned": pruned, "positives": positives,
+                    "lost": lost, "detected": len(hit), "missed": sum(not v for v in hit.values()),
+                    "full_ms": baseline * 1000 / shots, "cascade_ms": kept_time * 1000 / shots})
+    return out
+
+# ---------- Writing ----------
+
+def write_tier(templates: List[dict], factor: float, recall: float, tag: str = "template_cascade") -> None:
+    """Coarse images next to the originals and a `prefilter` entry in every YAML."""
+    import yaml
+    import asset_encoders
+    from PIL import Image
+    for t in templates:
+        coarse = coarse_template(t["gray"], factor)
+        threshold, n = calibrate(t["gray"], t["threshold"], factor, recall)
+        path = coarse_path(t["image"])
+        tier = "webp" if path.endswith(".webp") else "png"
+        asset_encoders.write_bytes(path, asset_encoders.encode(Image.fromarray(coarse), tier))
+        data = dict(t["data"])
+        data["prefilter"] = prefilter_entry(data["image"], factor, threshold)
+        text = yaml.dump(data, default_flow_style=False, sort_keys=False)
+        asset_encoders.write_bytes(t["yaml"], text.encode("utf-8"))  # after the image it names
+        t.update(prefilter=data["prefilter"], coarse=coarse)
+        print(f"[{tag}] {t['name']:<36} {coarse.shape[1]:>3}x{coarse.shape[0]:<3} "
+              f"threshold {t['threshold']:.2f} → prefilter {threshold:.3f} ({n} pairs)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Coarse prefilter templates, calibrated thresholds and a recall/speed harness.")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates", help="Template directory")
+    ap.add_argument("--factor", type=float, default=DEFAULT_FACTOR, help="Coarse template scale")
+    ap.add_argument("--recall", type=float, default=DEFAULT_RECALL,
+                    help="Quantile of the full-to-coarse score drop each prefilter threshold allows")
+    ap.add_argument("--write", action="store_true", help="Write coarse images and YAML prefilter entries")
+    ap.add_argument("--evaluate", type=int, default=0, metavar="SHOTS",
+                    help="Compare the full pass and the cascade on SHOTS synthetic screenshots")
+    ap.add_argument("--size", default="640x400", help="--evaluate screenshot size WxH")
+    ap.add_argument("--offsets", default="-0.1,-0.05,0,0.05,0.1",
+                    help="--evaluate: added to every prefilter threshold, one row each (0 = as calibrated)")
+    ap.add_argument("--limit", type=int, default=None, help="Only the first N templates")
+    args = ap.parse_args()
+    if not (args.write or args.evaluate):
+        ap.print_help()
+        return 0
+
+    templates = load(args.yaml_dir)[:args.limit]
+    if args.write:
+        t0 = time.perf_counter()
+        write_tier(templates, args.factor, args.recall)
+        print(f"[template_cascade] {len(templates)} templates calibrated in {time.perf_counter() - t0:.1f} s")
+    if args.evaluate:
+        missing = [t["name"] for t in templates if t["prefilter"] is None]
+        if missing:
+            print(f"[template_cascade] {len(missing)} templates without a prefilter (run --write): "
+                  f"{', '.join(missing[:5])}{' ...' if len(missing) > 5 else ''}")
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        offsets = [float(v) for v in args.offsets.split(",")]
+        results = evaluate(templates, args.evaluate, (w, h), offsets)
+        print(f"[template_cascade] {args.evaluate} screenshots {w}x{h}, {len(templates)} templates, "
+              f"{len(template_stats.app_scales())} scales: {results[0]['pairs']} (template, scale) pairs, "
+              f"{results[0]['positives']} over threshold; full pass {results[0]['full_ms']:.0f} ms/shot")
+        print(f"[template_cascade]   {'offset':>6} {'pruned':>7} {'pairs lost':>11} {'recall':>7} "
+              f"{'detections lost':>16} {'ms/shot':>8} {'speedup':>8}")
+        for r in results:
+            print(f"[template_cascade]   {r['offset']:>+6.2f} {100 * r['pruned'] / max(1, r['pairs']):>6.1f}% "
+                  f"{r['lost']:>5} of {r['positives']:<3} {100 * (1 - r['lost'] / max(1, r['positives'])):>6.1f}% "
+                  f"{r['missed']:>7} of {r['detected']:<6} {r['cascade_ms']:>8.0f} "
+                  f"{r['full_ms'] / max(1e-9, r['cascade_ms']):>7.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
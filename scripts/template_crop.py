@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# QuantraVision: crop templates to their ink.
+#
+#   python scripts/template_crop.py                          # report only: sizes, cost, detection
+#   python scripts/template_crop.py --margin 6 --report build/crop.jsonl
+#   python scripts/template_crop.py --margin 6 --write       # rewrite images, sidecars and bundle
+#
+# Every template is a full 252x212 frame: the axes area plus the figure padding, with the pattern
+# drawn somewhere inside. matchTemplate's direct cost is template area x valid positions, summed
+# over the scales, so white margin costs on every scale of every frame. The crop keeps the ink
+# bounding box (template_stats: pixels more than FOREGROUND_DELTA from the background level) plus
+# --margin pixels, clipped to the frame. The crop keeps the template's size: PatternDetector
+# searches the same ScaleSpace ladder for every template, so a drawing the full frame matched at
+# scale s is matched by the crop at s too. A shrunk template would need the screenshot scaled by
+# s x factor, which for most factors is not a rung (0.6 x 1.4 = 0.84), and the detector doesn't
+# read a per-template scale range; shrinking waits until it does.
+# Cropped templates are written as 8-bit grayscale, the form TemplateLibrary loads them in.
+#
+# The report gives per template the size and area before and after and the estimated matching
+# cost reduction over ScaleSpace.scales() on a --frame screenshot. OpenCV switches to a DFT for
+# large templates, where the cost follows the frame more than the template, so the estimate is an
+# upper bound for those.
+#
+# Two checks guard the crop; if either fails for any template, the run fails and nothing is
+# written. Ink kept is the share of the original's ink pixels inside the box: a crop that cuts
+# strokes off scores below --min-ink. Detection is what the detector would see. --shots chart-like
+# screenshots (ncc_engine.positive_shot) each get the original drawing pasted at a random
+# ScaleSpace scale, with sizes jittered off the rungs. The full frame and the crop are then both
+# matched at the ladder scales near the pasted one, as PatternDetector would. The worst drop of
+# the crop's peak below the full frame's peak must stay within --max-drop. Matching the crop
+# against the template it was cut from would prove nothing: a subimage always scores 1 there.
+# generate_all_108_patterns.py applies the same crop() with --crop-margin.
+
+import argparse
+import json
+import math
+import os
+import sys
+from typing import List, Tuple
+
+from lazy_imports import lazy_import
+import template_stats
+
+np = lazy_import("numpy")
+
+DEFAULT_MARGIN = 6        # px of background kept around the ink
+MIN_INK = 0.99            # share of the original's ink pixels the crop must keep
+MAX_DROP = 0.02           # worst allowed drop of the detector's peak on synthetic screenshots
+DETECT_SHOTS = 4          # synthetic screenshots per template
+NEIGHBOUR_RATIO = 1.25    # scales within this ratio of the pasted one are matched
+DETECT_SEED = 0
+COST_FRAME = (1080, 1920)  # WxH screenshot for the cost estimate
+
+# ---------- Crop ----------
+
+def ink_box(gray, margin: int) -> Tuple[int, int, int, int]:
+    """(x0, y0, x1, y1): the ink bounding box grown by margin, clipped; the frame if there's no ink."""
+    h, w = gray.shape
+    bx, by, bw, bh = template_stats.compute(gray)["bbox"]
+    if bw == 0 or bh == 0:
+        return 0, 0, w, h
+    return max(0, bx - margin), max(0, by - margin), min(w, bx + bw + margin), min(h, by + bh + margin)
+
+def crop(gray, margin: int = DEFAULT_MARGIN):
+    """(cropped 2-D uint8, box in the original) for a grayscale template."""
+    x0, y0, x1, y1 = ink_box(gray, margin)
+    return np.ascontiguousarray(gray[y0:y1, x0:x1]), (x0, y0, x1, y1)
+
+# ---------- Report ----------
+
+def match_cost(w: int, h: int, frame: Tuple[int, int], scales: List[float]) -> int:
+    """Direct matchTemplate cost: template area x valid positions, over the scales where it fits."""
+    total = 0
+    for s in scales:
+        fw, fh = max(8, int(frame[0] * s)), max(8, int(frame[1] * s))
+        if fw >= w and fh >= h:
+            total += (fw - w + 1) * (fh - h + 1) * w * h
+    return total
+
+def ink_kept(gray, box: Tuple[int, int, int, int]) -> float:
+    """Share of the template's ink pixels (template_stats' foreground) inside box; 1 without ink."""
+    background = template_stats.compute(gray)["background"]
+    fg = np.abs(gray.astype(np.int16) - background) > template_stats.FOREGROUND_DELTA
+    x0, y0, x1, y1 = box
+    total = int(fg.sum())
+    return float(fg[y0:y1, x0:x1].sum()) / total if total else 1.0
+
+def detection(gray, cropped, scales: List[float], shots: int = DETECT_SHOTS,
+              seed: int = DETECT_SEED) -> Tuple[float, float]:
+    """(lowest full-frame peak, worst drop of the crop's peak below it) over `shots` synthetic
+    screenshots with the original drawing pasted at random ladder scales."""
+    from ncc_engine import peak, positive_shot, resize_for_scale
+    rng = np.random.default_rng(seed)
+    lowest, worst = math.inf, -math.inf
+    for _ in range(shots):
+        r = float(rng.choice(scales))
+        shot = positive_shot(gray, r, rng)
+        full = part = -1.0
+        for s in scales:
+            if 1 / NEIGHBOUR_RATIO <= s / r <= NEIGHBOUR_RATIO:
+                scaled = resize_for_scale(shot, s)
+                full = max(full, peak(scaled, gray) or -1.0)
+                part = max(part, peak(scaled, cropped) or -1.0)
+        lowest, worst = min(lowest, full), max(worst, full - part)
+    return lowest, worst
+
+def analyze(image_path: str, margin: int, frame: Tuple[int, int], scales: List[float],
+            shots: int = DETECT_SHOTS) -> Tuple[dict, object]:
+    """Report entry and cropped image for one template file."""
+    from template_bundle import decode_gray
+    with open(image_path, "rb") as f:
+        gray = decode_gray(f.read())
+    out, box = crop(gray, margin)
+    (h0, w0), (h1, w1) = gray.shape, out.shape
+    before, after = match_cost(w0, h0, frame, scales), match_cost(w1, h1, frame, scales)
+    full, drop = detection(gray, out, scales, shots)
+    return {
+        "template": os.path.basename(image_path),
+        "size_before": [w0, h0],
+        "size_after": [w1, h1],
+        "box": list(box),
+        "area_before": w0 * h0,
+        "area_after": w1 * h1,
+        "cost_before": before,
+        "cost_after": after,
+        "cost_reduction": round(1 - after / before, 4) if before else 0.0,
+        "ink_kept": round(ink_kept(gray, box), 5),
+        "detect_full": round(full, 5),   # lowest full-frame peak over the screenshots
+        "detect_drop": round(drop, 5),   # worst full-frame peak minus crop peak; < 0: the crop scores higher
+    }, out
+
+def main():
+    ap = argparse.ArgumentParser(description="Crop templates to their ink and report matching cost.")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates", help="Template directory")
+    ap.add_argument("--margin", type=int, default=DEFAULT_MARGIN, help="Background pixels kept around the ink")
+    ap.add_argument("--frame", default=f"{COST_FRAME[0]}x{COST_FRAME[1]}", help="Screenshot WxH for the cost estimate")
+    ap.add_argument("--min-ink", type=float, default=MIN_INK,
+                    help="Fail when a crop keeps less than this share of the template's ink")
+    ap.add_argument("--max-drop", type=float, default=MAX_DROP,
+                    help="Fail when the crop's peak on synthetic screenshots drops more than this below the full frame's")
+    ap.add_argument("--shots", type=int, default=DETECT_SHOTS, help="Synthetic screenshots per template")
+    ap.add_argument("--report", default=None, help="Also write the per-template report as JSON lines")
+    ap.add_argument("--write", action="store_true",
+                    help="Replace the images in place (same format) and refresh their .tstats sidecars")
+    ap.add_argument("--bundle", default=None,
+                    help="With --write, rebuild this bundle from the directory "
+                         "(default <yaml-dir>.qvtb, '' = don't)")
+    args = ap.parse_args()
+    frame = tuple(int(v) for v in args.frame.lower().split("x"))
+    scales = template_stats.app_scales()
+
+    rows = []
+    crops = []
+    failed = 0
+    for yaml_path, image_path in template_stats.template_files(args.yaml_dir):
+        row, out = analyze(image_path, args.margin, frame, scales, args.shots)
+        rows.append(row)
+        crops.append((yaml_path, image_path, out))
+        if row["ink_kept"] < args.min_ink or row["detect_drop"] > args.max_drop:
+            failed += 1
+            print(f"[template_crop] FAILED {row['template']}: ink kept {row['ink_kept']:.4f} (min {args.min_ink}), "
+                  f"detection drop {row['detect_drop']:+.4f} (max {args.max_drop})")
+
+    print(f"[template_crop] {'template':<44} {'before':>9} {'after':>9} {'area':>6} {'cost':>6} {'ink':>7} {'drop':>7}")
+    for r in rows:
+        print(f"[template_crop] {r['template']:<44} {'x'.join(map(str, r['size_before'])):>9} "
+              f"{'x'.join(map(str, r['size_after'])):>9} {100 * r['area_after'] / r['area_before']:>5.0f}% "
+              f"{-100 * r['cost_reduction']:>5.0f}% {r['ink_kept']:>7.4f} {r['detect_drop']:>+7.4f}")
+    if rows:
+        area0, area1 = sum(r["area_before"] for r in rows), sum(r["area_after"] for r in rows)
+        cost0, cost1 = sum(r["cost_before"] for r in rows), sum(r["cost_after"] for r in rows)
+        print(f"[template_crop] {len(rows)} templates, margin {args.margin} px"
+              f": area {area0} → {area1} px ({100 * (1 - area1 / area0):.1f} % less), est. matching cost on "
+              f"{frame[0]}x{frame[1]} over {len(scales)} scales {100 * (1 - cost1 / max(1, cost0)):.1f} % less, "
+              f"min ink kept {min(r['ink_kept'] for r in rows):.4f}, "
+              f"worst detection drop {max(r['detect_drop'] for r in rows):+.4f} over {args.shots} screenshots")
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, sort_keys=True) + "\n")
+        print(f"[template_crop] report → {args.report}")
+    if args.write and failed:
+        print(f"[template_crop] {failed} templates failed --min-ink or --max-drop: nothing written")
+    elif args.write:
+        import asset_encoders
+        from PIL import Image
+        rewritten = 0
+        for (yaml_path, image_path, out), row in zip(crops, rows):
+            if row["size_after"] == row["size_before"]:
+                continue
+            tier = "webp" if image_path.endswith(".webp") else "png"
+            data = asset_encoders.encode(Image.fromarray(out), tier)
+            asset_encoders.write_bytes(image_path, data)
+            template_stats.write_sidecar(yaml_path, data)
+            rewritten += 1
+        import template_bundle
+        bundle = template_bundle.default_bundle_path(args.yaml_dir) if args.bundle is None else args.bundle
+        if bundle:
+            size = template_bundle.write_bundle(bundle, template_bundle.load_directory(args.yaml_dir))
+            print(f"[template_crop] rebuilt {bundle} ({size / 1024:.0f} KB)")
+        print(f"[template_crop] rewrote {rewritten} images in {args.yaml_dir}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
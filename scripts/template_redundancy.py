@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# QuantraVision: template redundancy analyzer (offline, over the generated template directory).
+#
+#   python scripts/template_redundancy.py                # matrix, clusters, index, savings
+#   python scripts/template_redundancy.py --threshold 0.9 --matrix build/similarity.csv
+#   python scripts/template_redundancy.py --verify 200   # matrix entries vs OpenCV
+#
+# Many templates are near-copies (the Adam/Eve double top/bottom variants, Rectangle_Bullish vs
+# Rectangle_Top_Continuation, ...) and PatternDetector still matches each one at every scale of
+# every frame. This computes the full N x N similarity matrix
+#
+#   M[i, j] = peak TM_CCOEFF_NORMED of template i over a frame showing template j, placed on its
+#             own background with --shift pixels of margin (so offsets up to +-shift are searched
+#             for same-sized templates, and anywhere inside j for smaller ones)
+#
+# one frame j at a time: the frame's FFT and window sums are computed once and correlated against
+# the FFTs of all templates in batched irfft2 calls (same formula and flat-window rule as
+# template_stats.ncc). Cropped templates (template_crop.py) differ in size, and so do their frames:
+# template spectra are computed once per frame size, and M[i, j] is NaN where template i is larger
+# than frame j. M is not symmetric; clustering uses min(M, M.T), complete linkage, so every pair
+# inside a cluster is at least --threshold alike both ways (a NaN pair is never alike).
+#
+# Each cluster gets a representative and a gate. The app matches the representative first and
+# matches the other members only where it scores >= gate. TM_CCOEFF_NORMED is the cosine between
+# zero-mean vectors, so where member m scores its YAML threshold t_m, the representative r scores
+# at least cos(acos(t_m) + acos(M[r, m])) nearby: a bound when r and m align at zero offset (the
+# cosine triangle inequality), an estimate when the peak is at an offset, where the window also
+# takes in chart outside the template; hence --margin. The gate is the lowest of those over the
+# members, minus --margin, and the representative is the member with the highest gate.
+#
+# The index goes to app/src/main/assets/pattern_clusters.json (--index, '' = don't write). The
+# savings are template x scale matches per frame over ScaleSpace.scales(): with no gate open, and
+# averaged over frames showing each template once (gates that open on it counted from M).
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from lazy_imports import lazy_import
+import template_stats
+
+np = lazy_import("numpy")
+
+INDEX_PATH = "app/src/main/assets/pattern_clusters.json"
+INDEX_VERSION = 1
+DEFAULT_THRESHOLD = 0.85  # min(M, M.T) within a cluster
+DEFAULT_SHIFT = 16        # px of background around the frame template: offsets searched
+DEFAULT_MARGIN = 0.05     # subtracted from the gate bound
+
+# ---------- Templates ----------
+
+def load_templates(yaml_dir: str) -> List[dict]:
+    """Every template in the directory: YAML name, file, threshold and its template_stats.compute()."""
+    import yaml
+    from template_bundle import decode_gray
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    out = []
+    for yaml_path, image_path in template_stats.template_files(yaml_dir):
+        with open(yaml_path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=loader)
+        with open(image_path, "rb") as f:
+            image = decode_gray(f.read())
+        out.append({
+            "name": data["name"],
+            "file": os.path.basename(yaml_path),
+            "threshold": float(data.get("threshold", 0.7)),
+            "image": image,
+            "stats": template_stats.compute(image),
+        })
+    return out
+
+# ---------- Similarity matrix ----------
+
+def similarity_matrix(templates: List[dict], shift: int) -> "np.ndarray":
+    """M[i, j]: peak NCC of template i over a frame showing template j; NaN where i is larger
+    than that frame."""
+    n = len(templates)
+    # Frame j is template j plus `shift` on every side, so cropped templates of different sizes get
+    # frames of different sizes. Frames of one size share the templates' spectra at that size;
+    # templates of one shape share the frame's window sums
+    frames: Dict[Tuple[int, int], List[int]] = {}
+    for j, t in enumerate(templates):
+        h, w = t["image"].shape
+        frames.setdefault((h + 2 * shift, w + 2 * shift), []).append(j)
+    norms = np.array([t["stats"]["norm"] for t in templates])
+    M = np.full((n, n), np.nan)
+    for (fh, fw), frame_idx in frames.items():
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i, t in enumerate(templates):
+            if t["image"].shape[0] <= fh and t["image"].shape[1] <= fw:
+                groups.setdefault(t["image"].shape, []).append(i)
+        specs = {shape: np.conj(np.fft.rfft2(np.stack([templates[i]["stats"]["zero_mean"] for i in idx]),
+                                             s=(fh, fw)))
+                 for shape, idx in groups.items()}
+        for j in frame_idx:
+            t = templates[j]
+            frame = np.full((fh, fw), float(t["stats"]["background"]))
+            frame[shift:fh - shift, shift:fw - shift] = t["image"]
+            # float32 FFTs take half the time. The zero-mean templates ignore a constant offset, so
+            # correlating against frame - background keeps the numerator free of cancellation
+            spec = np.fft.rfft2((frame - t["stats"]["background"]).astype(np.float32))
+            for (th, tw), idx in groups.items():
+                num = np.fft.irfft2(spec[None] * specs[(th, tw)], s=(fh, fw))[:, :fh - th + 1, :fw - tw + 1]
+                s1, s2 = template_stats.window_sums(frame, th, tw)
+                den = np.sqrt(np.maximum(s2 - s1 * s1 / (th * tw), 0))[None] * norms[idx][:, None, None]
+                r = template_stats.coefficients(num, den)
+                M[idx, j] = r.reshape(len(idx), -1).max(axis=1)
+    return M
+
+def verify(templates: List[dict], M: "np.ndarray", shift: int, pairs: int) -> float:
+    """Largest |M[i, j] - cv2.matchTemplate peak| over `pairs` random (i, j), same frames."""
+    import cv2
+    rng = np.random.default_rng(0)
+    worst = 0.0
+    for i, j in rng.integers(0, len(templates), (pairs, 2)):
+        t = templates[j]
+        h, w = t["image"].shape
+        frame = np.full((h + 2 * shift, w + 2 * shift), t["stats"]["background"], dtype=np.uint8)
+        frame[shift:shift + h, shift:shift + w] = t["image"]
+        if frame.shape[0] < templates[i]["image"].shape[0] or frame.shape[1] < templates[i]["image"].shape[1]:
+            continue  # a larger template doesn't fit: M is NaN there
+        peak = float(cv2.matchTemplate(frame, templates[i]["image"], cv2.TM_CCOEFF_NORMED).max())
+        worst = max(worst, abs(peak - M[i, j]))
+    return worst
+
+# ---------- Clustering ----------
+
+def complete_linkage(sim: "np.ndarray", threshold: float) -> List[List[int]]:
+    """Agglomerative clusters in which every pair has sim >= threshold; largest first."""
+    clusters = [[i] for i in range(len(sim))]
+    link = sim.astype(np.float64).copy()
+    np.fill_diagonal(link, -np.inf)
+    while len(clusters) > 1:
+        a, b = np.unravel_index(np.argmax(link), link.shape)
+        if link[a, b] < threshold:
+            break
+        a, b = min(a, b), max(a, b)
+        clusters[a] += clusters.pop(b)
+        merged = np.minimum(link[a], link[b])  # complete linkage: the weakest pair
+        link[a], link[:, a] = merged, merged
+        link[a, a] = -np.inf
+        link = np.delete(np.delete(link, b, axis=0), b, axis=1)
+    return sorted((sorted(c) for c in clusters), key=lambda c: (-len(c), c[0]))
+
+def gate_bound(threshold: float, similarity: float) -> float:
+    """Lowest score of a template `similarity` alike to a match scoring `threshold`."""
+    angle = math.acos(max(-1.0, min(1.0, threshold))) + math.acos(max(-1.0, min(1.0, similarity)))
+    return math.cos(min(math.pi, angle))
+
+def representatives(clusters: List[List[int]], templates: List[dict], M: "np.ndarray",
+                    margin: float) -> List[dict]:
+    """For each cluster: the member with the highest gate, and that gate."""
+    out = []
+    for members in clusters:
+        if len(members) == 1:
+            out.append({"rep": members[0], "members": members, "gate": None})
+            continue
+        best = None
+        for r in members:
+            gate = min(gate_bound(templates[m]["threshold"], M[r, m]) for m in members if m != r) - margin
+            if best is None or gate > best[1]:
+                best = (r, gate)
+        out.append({"rep": best[0], "members": members, "gate": round(max(0.0, best[1]), 4)})
+    return out
+
+# ---------- Savings ----------
+
+def savings(groups: List[dict], M: "np.ndarray", n_scales: int) -> dict:
+    """Template x scale matches per frame: everything, the cascade with no gate open, and the
+    cascade averaged over frames showing each template (gates opened per M)."""
+    n = len(M)
+    closed = len(groups)
+    per_frame = []
+    for j in range(n):
+        extra = sum(len(g["members"]) - 1 for g in groups
+                    if g["gate"] is not None and M[g["rep"], j] >= g["gate"])
+        per_frame.append(closed + extra)
+    return {
+        "baseline": n * n_scales,
+        "gates_closed": closed * n_scales,
+        "one_pattern_mean": sum(per_frame) / n * n_scales,
+        "one_pattern_max": max(per_frame) * n_scales,
+    }
+
+# ---------- Output ----------
+
+def index(groups: List[dict], templates: List[dict], M: "np.ndarray",
+          threshold: float, shift: int, margin: float) -> dict:
+    clusters = []
+    for g in groups:
+        if g["gate"] is None:
+            continue
+        r = g["rep"]
+        clusters.append({
+            "representative": templates[r]["name"],
+            "file": templates[r]["file"],
+            "gate": g["gate"],
+            "members": [{"name": templates[m]["name"], "file": templates[m]["file"],
+                         "score": round(float(M[r, m]), 4)}
+                        for m in g["members"] if m != r],
+        })
+    return {"version": INDEX_VERSION, "threshold": threshold, "shift": shift, "margin": margin,
+            "templates": len(templates), "clusters": clusters}
+
+def write_matrix(path: str, templates: List[dict], M: "np.ndarray") -> None:
+    import csv
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f)
+        out.writerow([""] + [t["file"][:-5] for t in templates])
+        for t, row in zip(templates, M):
+            out.writerow([t["file"][:-5]] + [f"{v:.4f}" for v in row])
+
+def main():
+    ap = argparse.ArgumentParser(description="Pairwise template similarity, near-duplicate clusters and a cascade index.")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates", help="Template directory")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="Cluster when min(M[i,j], M[j,i]) >= this for every pair")
+    ap.add_argument("--shift", type=int, default=DEFAULT_SHIFT, help="Offsets searched, in pixels")
+    ap.add_argument("--margin", type=float, default=DEFAULT_MARGIN, help="Subtracted from every gate")
+    ap.add_argument("--index", default=INDEX_PATH, help="Cluster index JSON for the app ('' = don't write)")
+    ap.add_argument("--matrix", default=None, help="Also write the similarity matrix M as CSV")
+    ap.add_argument("--top", type=int, default=15, help="Most similar pairs to list")
+    ap.add_argument("--verify", type=int, default=0, metavar="PAIRS",
+                    help="Check PAIRS random matrix entries against cv2.matchTemplate")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    templates = load_templates(args.yaml_dir)
+    if len(templates) < 2:
+        print(f"[template_redundancy] {len(templates)} templates in {args.yaml_dir}: nothing to compare")
+        return 1
+    t1 = time.perf_counter()
+    M = similarity_matrix(templates, args.shift)
+    t2 = time.perf_counter()
+    n = len(templates)
+    print(f"[template_redundancy] {n}x{n} matrix (offsets +-{args.shift} px): "
+          f"load {(t1 - t0) * 1000:.0f} ms, match {(t2 - t1) * 1000:.0f} ms")
+
+    if args.verify:
+        worst = verify(templates, M, args.shift, args.verify)
+        print(f"[template_redundancy] verify: max |M - OpenCV| {worst:.2e} over {args.verify} pairs "
+              f"(tolerance {template_stats.NCC_TOLERANCE:g})")
+        if worst > template_stats.NCC_TOLERANCE:
+            return 1
+
+    sym = np.nan_to_num(np.minimum(M, M.T), nan=-1.0)
+    upper = np.triu_indices(n, 1)
+    order = np.argsort(-sym[upper])[:args.top]
+    print(f"[template_redundancy] most similar pairs, min(M[i,j], M[j,i]):")
+    for k in order:
+        i, j = upper[0][k], upper[1][k]
+        print(f"[template_redundancy]   {sym[i, j]:.3f}  {templates[i]['name']} ~ {templates[j]['name']}")
+
+    groups = representatives(complete_linkage(sym, args.threshold), templates, M, args.margin)
+    multi = [g for g in groups if g["gate"] is not None]
+    print(f"[template_redundancy] {len(multi)} clusters of near-duplicates at {args.threshold:g} "
+          f"({sum(len(g['members']) for g in multi)} templates), {len(groups) - len(multi)} singletons")
+    for g in multi:
+        others = ", ".join(templates[m]["name"] for m in g["members"] if m != g["rep"])
+        print(f"[template_redundancy]   {templates[g['rep']]['name']} (gate {g['gate']:.2f}): {others}")
+
+    scales = len(template_stats.app_scales())
+    s = savings(groups, M, scales)
+    print(f"[template_redundancy] matches per frame over {scales} scales: {s['baseline']} today, "
+          f"{s['gates_closed']} with every gate closed ({s['baseline'] - s['gates_closed']} saved, "
+          f"{100 * (1 - s['gates_closed'] / s['baseline']):.1f} %), "
+          f"{s['one_pattern_mean']:.0f} mean / {s['one_pattern_max']} max with one template on screen")
+
+    if args.index:
+        data = index(groups, templates, M, args.threshold, args.shift, args.margin)
+        import asset_encoders
+        os.makedirs(os.path.dirname(os.path.abspath(args.index)), exist_ok=True)
+        asset_encoders.write_bytes(args.index, (json.dumps(data, indent=2) + "\n").encode("utf-8"))
+        print(f"[template_redundancy] index → {args.index}")
+    if args.matrix:
+        write_matrix(args.matrix, templates, M)
+        print(f"[template_redundancy] matrix → {args.matrix}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
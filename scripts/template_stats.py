@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# QuantraVision: precomputed TM_CCOEFF_NORMED statistics per template (<stem>.tstats sidecars).
+#
+#   python scripts/template_stats.py --write          # (re)write every sidecar in the template dir
+#   python scripts/template_stats.py --verify         # sidecars vs images, reference NCC vs OpenCV
+#   python scripts/template_stats.py --benchmark 5    # per-frame cost with and without sidecars
+#
+# PatternDetector resizes the frame, never the template, and calls matchTemplate(TM_CCOEFF_NORMED)
+# for every template at every ScaleSpace scale on every frame. Each of those calls recomputes the
+# template's mean, its zero-mean plane and that plane's L2 norm, though they never change. The
+# sidecar stores them once, next to the YAML, with the template's foreground pixel count and
+# bounding box:
+#
+#   R(x, y) = sum(T' * I_window) / (|T'| * sqrt(sum(I_window^2) - sum(I_window)^2 / n))
+#
+# with T' = T - mean(T). Because sum(T') = 0 the window mean drops out of the numerator, so with
+# T' and |T'| known a frame needs one correlation plus integral images per scale (the integral
+# images are shared by every template of the same size). ncc() is that routine; --verify checks
+# it against cv2.matchTemplate, using OpenCV's handling of flat windows. --benchmark reports the
+# two savings apart: the statistics the sidecar removes are a fraction of a percent of a frame's
+# matching; sharing window sums between same-sized templates is the larger one and needs no sidecar.
+#
+# Sidecar layout (little-endian): HEADER (magic "QVTS", version, codec, width, height, mean, norm,
+# foreground count, bbox x/y/w/h, background level, SHA-256 of the image file, payload size), then
+# the zero-mean plane: float32, row-major, zlib-compressed (codec 1). The image hash ties a sidecar
+# to the exact file TemplateLibrary hashes as tplHash, so a stale sidecar is detectable.
+
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+MAGIC = b"QVTS"
+VERSION = 1
+CODEC_ZLIB_F32 = 1
+HEADER = struct.Struct("<4sHHIIddIIIIIB3x32sI")
+EXTENSION = ".tstats"
+FOREGROUND_DELTA = 32  # a pixel is foreground when it is this far from the background level
+NCC_TOLERANCE = 2e-3   # OpenCV correlates in float32
+MIN_WINDOW_STD = 1.0   # --verify skips near-flat windows: float32 leaves no significant digits there
+
+def sidecar_path(yaml_path: str) -> str:
+    return os.path.splitext(yaml_path)[0] + EXTENSION
+
+# ---------- Statistics ----------
+
+def compute(template) -> dict:
+    """mean, zero-mean plane (float32), its L2 norm, background level, foreground count and bbox."""
+    t = np.asarray(template, dtype=np.float64)
+    mean = float(t.mean())
+    zero_mean = t - mean
+    background = int(np.bincount(np.asarray(template, dtype=np.uint8).ravel(), minlength=256).argmax())
+    fg = np.abs(t - background) > FOREGROUND_DELTA
+    ys, xs = np.nonzero(fg)
+    bbox = (0, 0, 0, 0) if xs.size == 0 else (
+        int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))
+    return {
+        "width": t.shape[1],
+        "height": t.shape[0],
+        "mean": mean,
+        "norm": float(np.sqrt(np.square(zero_mean).sum())),
+        "background": background,
+        "foreground": int(fg.sum()),
+        "bbox": bbox,
+        "zero_mean": zero_mean.astype(np.float32),
+    }
+
+# ---------- Sidecar ----------
+
+def pack(stats: dict, image_sha256: str) -> bytes:
+    payload = zlib.compress(np.ascontiguousarray(stats["zero_mean"], dtype="<f4").tobytes(), 9)
+    header = HEADER.pack(MAGIC, VERSION, CODEC_ZLIB_F32, stats["width"], stats["height"], stats["mean"],
+                         stats["norm"], stats["foreground"], *stats["bbox"], stats["background"],
+                         bytes.fromhex(image_sha256), len(payload))
+    return header + payload
+
+def unpack(data: bytes) -> dict:
+    (magic, version, codec, w, h, mean, norm, fg, bx, by, bw, bh, background, sha,
+     size) = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or codec != CODEC_ZLIB_F32:
+        raise ValueError(f"not a v{VERSION} template stats sidecar ({magic!r} v{version} codec {codec})")
+    if len(data) != HEADER.size + size:
+        raise ValueError("truncated sidecar")
+    plane = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype="<f4").reshape(h, w)
+    return {"width": w, "height": h, "mean": mean, "norm": norm, "background": background,
+            "foreground": fg, "bbox": (bx, by, bw, bh), "zero_mean": plane, "image_sha256": sha.hex()}
+
+def write_sidecar(yaml_path: str, image_bytes: bytes) -> dict:
+    """Compute and atomically write the sidecar for the template image `image_bytes`."""
+    import asset_encoders
+    from template_bundle import decode_gray
+    stats = compute(decode_gray(image_bytes))
+    asset_encoders.write_bytes(sidecar_path(yaml_path), pack(stats, hashlib.sha256(image_bytes).hexdigest()))
+    return stats
+
+def read_sidecar(path: str) -> dict:
+    with open(path, "rb") as f:
+        return unpack(f.read())
+
+def template_files(yaml_dir: str) -> List[Tuple[str, str]]:
+    """(yaml path, image path) for every template in the directory, in file name order."""
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    out = []
+    for fn in sorted(f for f in os.listdir(yaml_dir) if f.endswith(".yaml")):
+        with open(os.path.join(yaml_dir, fn), "r", encoding="utf-8") as f:
+            image = yaml.load(f, Loader=loader)["image"].rsplit("/", 1)[-1]
+        out.append((os.path.join(yaml_dir, fn), os.path.join(yaml_dir, image)))
+    return out
+
+# ---------- Reference NCC ----------
+
+def window_sums(image, h: int, w: int):
+    """Sum and sum of squares of every h x w window (valid positions), from integral images."""
+    img = np.asarray(image, dtype=np.float64)
+    out = []
+    for a in (img, img * img):
+        ii = np.zeros((a.shape[0] + 1, a.shape[1] + 1))
+        np.cumsum(np.cumsum(a, axis=0), axis=1, out=ii[1:, 1:])
+        out.append(ii[h:, w:] - ii[:-h, w:] - ii[h:, :-w] + ii[:-h, :-w])
+    return out
+
+def ncc(image, zero_mean, norm: float, sums=None):
+    """TM_CCOEFF_NORMED of a 2-D image against a template given by its zero-mean plane and norm.
+
+    `sums` = window_sums(image, h, w) may be passed in to share it between same-sized templates.
+    Flat windows and |R| > 1 rounding follow OpenCV: R = +-1 up to 12.5 % over, else 0.
+    """
+    img = np.asarray(image, dtype=np.float64)
+    h, w = zero_mean.shape
+    H, W = img.shape
+    if H < h or W < w:
+        raise ValueError(f"image {W}x{H} is smaller than the template {w}x{h}")
+    # Circular correlation at the image size: the valid region (H-h+1 x W-w+1) never wraps
+    spec = np.fft.rfft2(img) * np.conj(np.fft.rfft2(zero_mean, s=img.shape))
+    num = np.fft.irfft2(spec, s=img.shape)[:H - h + 1, :W - w + 1]
+    s1, s2 = sums if sums is not None else window_sums(img, h, w)
+    den = np.sqrt(np.maximum(s2 - s1 * s1 / (h * w), 0)) * norm
+    return coefficients(num, den)
+
+def coefficients(num, den):
+    """num / den as float32, with OpenCV's rules: R = +-1 up to 12.5 % over, else 0 (flat windows)."""
+    out = np.zeros(np.broadcast_shapes(num.shape, den.shape), dtype=np.float32)
+    inside = np.abs(num) < den
+    np.divide(num, den, out=out, where=inside)
+    over = ~inside & (np.abs(num) < den * 1.125)
+    out[over] = np.sign(np.broadcast_to(num, out.shape)[over])
+    return out
+
+def ncc_template(image, template):
+    """The same without a sidecar: the template statistics are recomputed on every call."""
+    t = np.asarray(template, dtype=np.float64)
+    zero_mean = t - t.mean()
+    return ncc(image, zero_mean, float(np.sqrt(np.square(zero_mean).sum())))
+
+# ---------- Checks ----------
+
+def app_scales(min_scale=0.4, max_scale=2.5, fine=0.10, coarse=0.20, fine_start=0.8, fine_end=1.2) -> List[float]:
+    """ScaleSpace.scales() with its default ScaleConfig."""
+    out, s = [], min_scale
+    while s <= max_scale + 1e-9:
+        out.append(round(s * 100) / 100.0)
+        s += fine if fine_start <= s <= fine_end else coarse
+    return out
+
+def test_frame(template, other, seed: int = 0):
+    """A frame with `template` on a flat background, `other` beside it and noise in one corner,
+    so flat, partly flat and textured windows are all compared."""
+    h, w = template.shape
+    rng = np.random.default_rng(seed)
+    frame = np.full((2 * h, 2 * w), 255, dtype=np.uint8)
+    frame[h // 2:h // 2 + h, w // 3:w // 3 + w] = template
+    oh, ow = min(other.shape[0], h), min(other.shape[1], w // 2)
+    frame[-oh:, :ow] = other[:oh, :ow]
+    corner = frame[h + h // 2:, w + w // 2:]
+    corner[...] = rng.integers(0, 256, corner.shape, dtype=np.uint8)
+    return frame
+
+def verify(yaml_dir: str) -> int:
+    """Sidecars vs images (hash, statistics) and the reference NCC vs cv2.matchTemplate; returns failures."""
+    from template_bundle import decode_gray
+    try:
+        import cv2
+    except ImportError:
+        cv2 = None
+        print("[template_stats] OpenCV not installed: checking sidecars only, not NCC")
+    files = template_files(yaml_dir)
+    images = []
+    failures = 0
+    worst = 0.0
+    compared = skipped = 0
+    for yaml_path, image_path in files:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        images.append(decode_gray(data))
+    for i, (yaml_path, image_path) in enumerate(files):
+        name = os.path.basename(yaml_path)
+        try:
+            side = read_sidecar(sidecar_path(yaml_path))
+        except (OSError, ValueError) as e:
+            print(f"[template_stats] {name}: {e}")
+            failures += 1
+            continue
+        with open(image_path, "rb") as f:
+            sha = hashlib.sha256(f.read()).hexdigest()
+        ref = compute(images[i])
+        problems = []
+        if side["image_sha256"] != sha:
+            problems.append("stale (image hash differs)")
+        for k in ("width", "height", "background", "foreground", "bbox"):
+            if side[k] != ref[k]:
+                problems.append(f"{k} {side[k]} != {ref[k]}")
+        if abs(side["mean"] - ref["mean"]) > 1e-9 or abs(side["norm"] - ref["norm"]) > 1e-6 * ref["norm"]:
+            problems.append("mean/norm")
+        if not np.array_equal(side["zero_mean"], ref["zero_mean"]):
+            problems.append("zero-mean plane")
+        if cv2 is not None and not problems:
+            frame = test_frame(images[i], images[(i + 1) % len(images)], seed=i)
+            expected = cv2.matchTemplate(frame, images[i], cv2.TM_CCOEFF_NORMED)
+            got = ncc(frame, side["zero_mean"].astype(np.float64), side["norm"])
+            s1, s2 = window_sums(frame, *images[i].shape)
+            var = np.maximum(s2 - s1 * s1 / images[i].size, 0) / images[i].size
+            valid = (var >= MIN_WINDOW_STD ** 2) | (var == 0)  # flat windows must be 0 in both
+            skipped += int((~valid).sum())
+            compared += int(valid.sum())
+            err = float(np.abs(got - expected)[valid].max())
+            worst = max(worst, err)
+            if err > NCC_TOLERANCE:
+                problems.append(f"NCC differs from OpenCV by {err:.2e}")
+        if problems:
+            print(f"[template_stats] MISMATCH {name}: {', '.join(problems)}")
+            failures += 1
+    print(f"[template_stats] verify: {len(files) - failures}/{len(files)} sidecars OK"
+          + (f", max |NCC - OpenCV| {worst:.2e} (tolerance {NCC_TOLERANCE:g}) over {compared} positions; "
+             f"{skipped} near-flat windows (std < {MIN_WINDOW_STD:g}) skipped" if cv2 is not None else ""))
+    return failures
+
+def benchmark(yaml_dir: str, frames: int, frame_size: Tuple[int, int], limit: Optional[int]) -> None:
+    """Per-frame work of the detector loop (every template x every scale), with and without the
+    sidecar statistics and shared window sums."""
+    import statistics
+    from template_bundle import decode_gray
+    files = template_files(yaml_dir)[:limit]
+    templates = []
+    for yaml_path, image_path in files:
+        with open(image_path, "rb") as f:
+            templates.append((decode_gray(f.read()), read_sidecar(sidecar_path(yaml_path))))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (frame_size[1], frame_size[0]), dtype=np.uint8)
+    scaled = []
+    for s in app_scales():
+        h, w = int(base.shape[0] * s), int(base.shape[1] * s)
+        ys = (np.arange(h) / s).astype(int).clip(0, base.shape[0] - 1)
+        xs = (np.arange(w) / s).astype(int).clip(0, base.shape[1] - 1)
+        scaled.append(base[ys][:, xs])
+    pairs = sum(1 for f in scaled for t, _ in templates if f.shape[0] >= t.shape[0] and f.shape[1] >= t.shape[1])
+
+    def template_statistics(t):
+        # what the sidecar stores, in the same float32 form, so the runs differ by this work alone
+        z = t - t.mean()
+        return z.astype(np.float32), float(np.sqrt(np.square(z).sum()))
+
+    def stats_only():
+        for frame in scaled:
+            for t, _ in templates:
+                if frame.shape[0] >= t.shape[0] and frame.shape[1] >= t.shape[1]:
+                    template_statistics(t)
+
+    def without_sidecar():
+        for frame in scaled:
+            for t, _ in templates:
+                if frame.shape[0] >= t.shape[0] and frame.shape[1] >= t.shape[1]:
+                    ncc(frame, *template_statistics(t))
+
+    def sidecar_only():
+        for frame in scaled:
+            for _, side in templates:
+                shape = side["zero_mean"].shape
+                if frame.shape[0] >= shape[0] and frame.shape[1] >= shape[1]:
+                    ncc(frame, side["zero_mean"], side["norm"])
+
+    def with_sidecar():
+        for frame in scaled:
+            sums: Dict[tuple, object] = {}
+            for _, side in templates:
+                shape = side["zero_mean"].shape
+                if frame.shape[0] >= shape[0] and frame.shape[1] >= shape[1]:
+                    if shape not in sums:
+                        sums[shape] = window_sums(frame, *shape)
+                    ncc(frame, side["zero_mean"], side["norm"], sums[shape])
+
+    runs = {"template statistics only": stats_only, "NCC, statistics per call": without_sidecar,
+            "NCC, sidecar": sidecar_only, "NCC, sidecar + shared window sums": with_sidecar}
+    try:
+        import cv2
+
+        def opencv():
+            for frame in scaled:
+                for t, _ in templates:
+                    if frame.shape[0] >= t.shape[0] and frame.shape[1] >= t.shape[1]:
+                        cv2.matchTemplate(frame, t, cv2.TM_CCOEFF_NORMED)
+        runs["cv2.matchTemplate (the app today)"] = opencv
+    except ImportError:
+        pass
+    ms = {}
+    for label, fn in runs.items():
+        times = []
+        for _ in range(frames):
+            t0 = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t0) * 1000)
+        ms[label] = statistics.median(times)
+    print(f"[template_stats] {frame_size[0]}x{frame_size[1]} frame, {len(app_scales())} scales, "
+          f"{len(templates)} templates: {pairs} template x scale matches per frame (median of {frames})")
+    for label, v in ms.items():
+        print(f"[template_stats]   {label:<36} {v:9.1f} ms/frame")
+    # The sidecar removes exactly the statistics run, measured directly: the difference of the two
+    # NCC runs is of the same size as their run-to-run noise. Sharing window sums needs no sidecar
+    base = ms["NCC, statistics per call"]
+    saved = ms["template statistics only"]
+    shared = ms["NCC, sidecar"] - ms["NCC, sidecar + shared window sums"]
+    print(f"[template_stats]   saved per frame by the sidecar statistics: {saved:.1f} ms ({100 * saved / base:.1f} %)")
+    print(f"[template_stats]   saved per frame by sharing window sums (no sidecar needed): {shared:.1f} ms "
+          f"({100 * shared / base:.1f} %)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Write, verify and benchmark template statistics sidecars.")
+    ap.add_argument("--yaml-dir", default="app/src/main/assets/pattern_templates", help="Template directory")
+    ap.add_argument("--write", action="store_true", help="(Re)write the sidecar of every template")
+    ap.add_argument("--verify", action="store_true", help="Check sidecars and the reference NCC against OpenCV")
+    ap.add_argument("--benchmark", type=int, default=0, metavar="FRAMES", help="Time FRAMES frames of matching")
+    ap.add_argument("--frame", default="640x400", help="Benchmark frame size WxH (before scaling)")
+    ap.add_argument("--limit", type=int, default=None, help="Benchmark only the first N templates")
+    args = ap.parse_args()
+
+    if args.write:
+        files = template_files(args.yaml_dir)
+        for yaml_path, image_path in files:
+            with open(image_path, "rb") as f:
+                write_sidecar(yaml_path, f.read())
+        print(f"[template_stats] wrote {len(files)} sidecars to {args.yaml_dir}")
+    if args.verify and verify(args.yaml_dir):
+        return 1
+    if args.benchmark:
+        w, h = (int(v) for v in args.frame.lower().split("x"))
+        benchmark(args.yaml_dir, args.benchmark, (w, h), args.limit)
+    if not (args.write or args.verify or args.benchmark):
+        ap.print_help()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
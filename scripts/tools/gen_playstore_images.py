@@ -1,4 +1,5 @@
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+import numpy as np
 import os, math
 
 out_dir = "dist/playstore"
@@ -8,12 +9,13 @@ W, H = 1080, 1920
 font = ImageFont.load_default()
 
 def base_gradient():
-    img = Image.new("RGB", (W, H), "#0A0F14")
-    d = ImageDraw.Draw(img)
-    for y in range(H):
-        c = int(10 + (y / H) * 50)
-        d.line([(0, y), (W, y)], fill=(c, c+10, c+20))
-    return img
+    # Same pixels as one d.line per row with c = int(10 + (y / H) * 50), built as packed RGBX rows
+    # broadcast across the width; Pillow maps the buffer and convert() makes the one owned copy.
+    c = (10 + (np.arange(H) / H) * 50).astype(np.uint8)
+    rows = np.stack([c, c + 10, c + 20, np.full_like(c, 255)], axis=1)
+    px = np.empty((H, W), dtype=np.uint32)
+    px[:] = rows.view(np.uint32)
+    return Image.frombuffer("RGBX", (W, H), px, "raw", "RGBX", 0, 1).convert("RGB")
 
 def overlay_pattern(img, label, conf, tradeable):
     d = ImageDraw.Draw(img, "RGBA")